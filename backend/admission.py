@@ -0,0 +1,149 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Upstream-bound requests one worker process runs at once, across all priority classes
+ADMISSION_CAPACITY = int(os.environ.get('ADMISSION_CAPACITY', 64))
+# Seconds a shed client is told to wait before retrying
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 2))
+# Per-client explain-play requests per second, and how many may come at once. A game page
+# polls 5 PlayCards every 2 s while AI text is pending (2.5/s); this leaves room for a second tab
+CLIENT_RATE = float(os.environ.get('EXPLAIN_CLIENT_RATE', 5))
+CLIENT_BURST = int(os.environ.get('EXPLAIN_CLIENT_BURST', 30))
+MAX_TRACKED_CLIENTS = 10000
+
+# (name, share of capacity, queue size, max wait in seconds), highest priority first
+PRIORITY_CLASSES = (
+    ('live', 1.0, 128, 2.0),
+    ('explain', 0.5, 32, 1.0),
+    ('profile', 0.25, 16, 0.5),
+)
+SHED_REASONS = ('queue_full', 'timeout', 'rate_limited')
+
+
+class _Class:
+    __slots__ = ('name', 'limit', 'queue_size', 'max_wait', 'in_flight', 'waiting', 'admitted', 'degraded', 'shed')
+
+    def __init__(self, name, limit, queue_size, max_wait):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.degraded = 0
+        self.shed = dict.fromkeys(SHED_REASONS, 0)
+
+
+class AdmissionController:
+    """Caps concurrent upstream-bound requests, keeping the last slots for higher priorities.
+
+    A class may start a request only while the total in flight is below its
+    share of capacity, so under load profile lookups stop first, then
+    explanations, and live scores and plays keep the remaining slots.
+    A request that cannot start waits in its class's bounded queue for up to
+    max_wait seconds and is shed if the queue is full or the wait runs out.
+    """
+
+    def __init__(self, capacity: int = ADMISSION_CAPACITY, classes=PRIORITY_CLASSES):
+        self.capacity = capacity
+        self.classes = {
+            name: _Class(name, max(1, int(capacity * share)), queue_size, max_wait)
+            for name, share, queue_size, max_wait in classes
+        }
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, name: str):
+        """Start a request of class name. Returns None once admitted, else the shed reason."""
+        cls = self.classes[name]
+        with self._cond:
+            if self.in_flight >= cls.limit:
+                if cls.waiting >= cls.queue_size:
+                    cls.shed['queue_full'] += 1
+                    return 'queue_full'
+                cls.waiting += 1
+                deadline = time.monotonic() + cls.max_wait
+                try:
+                    while self.in_flight >= cls.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            cls.shed['timeout'] += 1
+                            return 'timeout'
+                        self._cond.wait(remaining)
+                finally:
+                    cls.waiting -= 1
+            self.in_flight += 1
+            cls.in_flight += 1
+            cls.admitted += 1
+            return None
+
+    def release(self, name: str):
+        with self._cond:
+            self.in_flight -= 1
+            self.classes[name].in_flight -= 1
+            self._cond.notify_all()
+
+    def record(self, name: str, outcome: str):
+        """Count a request turned away before acquire ('rate_limited') or answered from cache ('degraded')."""
+        with self._cond:
+            cls = self.classes[name]
+            if outcome == 'degraded':
+                cls.degraded += 1
+            else:
+                cls.shed[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'in_flight': self.in_flight,
+                'classes': {
+                    name: {
+                        'limit': cls.limit, 'in_flight': cls.in_flight, 'queue_depth': cls.waiting,
+                        'admitted': cls.admitted, 'degraded': cls.degraded, 'shed': dict(cls.shed),
+                    }
+                    for name, cls in self.classes.items()
+                },
+            }
+
+
+class ClientBuckets:
+    """A token bucket per client, refilled at rate tokens per second up to burst.
+
+    The least recently seen clients are forgotten past max_clients; a
+    forgotten client starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float = CLIENT_RATE, burst: int = CLIENT_BURST, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def take(self, client: str) -> int:
+        """Spend a token for client. Returns 0 if allowed, else whole seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.limited += 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return 0
+        return math.ceil((1 - tokens) / self.rate) if self.rate > 0 else ADMISSION_RETRY_AFTER
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'clients': len(self._buckets), 'limited': self.limited}
@@ -0,0 +1,239 @@
+"""Load test: latency percentiles and throughput per API route.
+
+Starts the fixture stand-in for ESPN and Groq (see fixtures.py), points the
+services in server.py at it, serves the app on a local port and runs N
+concurrent viewers against each route in turn. Results are written as JSON;
+with --baseline the run exits non-zero when a route's p99 or throughput is
+more than --tolerance worse than the baseline run.
+
+    python bench_routes.py --viewers 50 --requests 20 --latency 0.05 --output bench-results.json
+    python bench_routes.py --baseline main.json --output branch.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import requests
+
+os.environ.setdefault('GROQ_API_KEY', 'fixture')
+
+import fixtures
+import server
+from admission import AdmissionController, ClientBuckets
+from explanation_store import ExplanationStore, SQLiteBackend
+from game import GameService
+from play import PlayService
+from player import PlayerService
+from poller import LiveGamePoller
+from serialization import JSON_BACKEND
+from team import TeamService
+from user_store import SQLiteUserBackend, UserStore
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+# (name, method, path); the SSE stream is long-lived and not measured here
+ROUTES = [
+    ('api', 'GET', '/api'),
+    ('health', 'GET', '/api/health'),
+    ('games', 'GET', '/api/games'),
+    ('games_live', 'GET', '/api/games/live'),
+    ('game', 'GET', '/api/games/{game_id}'),
+    ('plays', 'GET', '/api/games/{game_id}/plays'),
+    ('plays_tail', 'GET', '/api/games/{game_id}/plays?tail=5&compact=1'),
+    ('explain_play', 'GET', '/api/games/{game_id}/explain-play?play_id={play_id}'),
+    ('explain_play_stream', 'GET', '/api/games/{game_id}/explain-play?play_id={play_id}&stream=1'),
+    ('teams', 'GET', '/api/teams'),
+    ('team', 'GET', '/api/teams/{team_id}'),
+    ('player', 'GET', '/api/players/{athlete_id}'),
+    ('players_bulk', 'GET', '/api/players?ids={roster_ids}'),
+    ('favorites', 'GET', '/api/users/bench/favorites?expand=1'),
+    ('notes', 'POST', '/api/users/bench/notes'),
+]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+SERVICES = (
+    'game_service', 'play_service', 'team_service', 'player_service', 'live_poller', 'user_store',
+    'admission', 'client_buckets',
+)
+
+
+def install_services(stand_in: fixtures.FixtureServer) -> dict:
+    """Replace the services in server.py with ones that fetch from stand_in.
+
+    Returns the replaced services so they can be put back afterwards.
+    """
+    previous = {name: getattr(server, name) for name in SERVICES}
+    fetch = stand_in.fetch_json
+    server.game_service = GameService(fetch_func=fetch)
+    server.team_service = TeamService(fetch_func=fetch)
+    server.play_service = PlayService(
+        fetch_func=fetch, explanation_store=ExplanationStore(SQLiteBackend(':memory:')), team_catalog=server.team_service.catalog,
+    )
+    server.play_service.groq_client = stand_in.groq_client()
+    server.player_service = PlayerService(fetch_func=fetch)
+    server.live_poller = LiveGamePoller(server.game_service, server.play_service)
+    server.user_store = UserStore(SQLiteUserBackend(':memory:'))
+    server.admission = AdmissionController()
+    # every viewer comes from 127.0.0.1, so the per-client limit would measure 429s
+    server.client_buckets = ClientBuckets(burst=sys.maxsize)
+    return previous
+
+
+def roster_ids(game: dict) -> list:
+    """Athlete ids from a fixture game's box score."""
+    boxscore = (game['game'].get('gamepackageJSON') or {}).get('boxscore') or {}
+    return list(dict.fromkeys(
+        str(a['athlete']['id']) for team in boxscore.get('players', []) for stat in team.get('statistics', [])
+        for a in stat.get('athletes', []) if (a.get('athlete') or {}).get('id')
+    ))
+
+
+def percentile(samples: list, q: float):
+    """Nearest-rank percentile of sorted samples."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+
+def run_route(base_url: str, method: str, path: str, viewers: int, requests_per_viewer: int) -> dict:
+    """Run viewers concurrent clients, each making requests_per_viewer requests."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(viewers + 1)
+
+    def viewer():
+        session = requests.Session()
+        mine, failed = [], 0
+        barrier.wait()
+        for _ in range(requests_per_viewer):
+            started = time.perf_counter()
+            try:
+                resp = session.request(method, base_url + path, json={'note': 'bench'} if method == 'POST' else None, timeout=30)
+                resp.content
+                ok = resp.status_code < 400
+            except requests.RequestException:
+                ok = False
+            mine.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=viewer, daemon=True) for _ in range(viewers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    ms = lambda s: round(s * 1000, 3) if s is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'p50_ms': ms(percentile(latencies, 0.5)),
+        'p90_ms': ms(percentile(latencies, 0.9)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+def run_benchmark(viewers: int = 20, requests_per_viewer: int = 10, latency: float = 0.0, jitter: float = 0.0,
+                  fixture: dict | None = None, routes=None, warmup: int = 1, replay: float | None = None) -> dict:
+    """Benchmark each route against a fresh fixture stand-in; returns the results document."""
+    stand_in = fixtures.FixtureServer(fixture, latency=latency, jitter=jitter, replay_seconds=replay).start()
+    previous = install_services(stand_in)
+    httpd = make_server('127.0.0.1', 0, server.app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=httpd.serve_forever, name='bench-server', daemon=True).start()
+    base_url = f'http://127.0.0.1:{httpd.server_port}'
+    game = stand_in.fixture
+    competitors = game['scoreboard']['events'][0]['competitions'][0]['competitors']
+    values = {
+        'game_id': game['game_id'],
+        'play_id': game['plays'][len(game['plays']) // 2]['id'],
+        'team_id': competitors[0]['team']['id'],
+        'athlete_id': ((game.get('athlete') or {}).get('athlete') or {}).get('id', '0'),
+        'roster_ids': ','.join(roster_ids(game)[:53]) or '0',
+    }
+    results = {}
+    try:
+        for name, method, path in routes or ROUTES:
+            path = path.format(**values)
+            if warmup:
+                run_route(base_url, method, path, 1, warmup)
+            results[name] = dict(run_route(base_url, method, path, viewers, requests_per_viewer), path=path)
+    finally:
+        httpd.shutdown()
+        stand_in.stop()
+        for name, service in previous.items():
+            setattr(server, name, service)
+    return {
+        'config': {
+            'viewers': viewers, 'requests_per_viewer': requests_per_viewer, 'upstream_latency': latency,
+            'upstream_jitter': jitter, 'replay_seconds': replay, 'game_id': values['game_id'], 'plays': len(game['plays']),
+            'json_backend': JSON_BACKEND, 'python': platform.python_version(),
+        },
+        'routes': results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions against a baseline run, as human-readable lines."""
+    regressions = []
+    for name, now in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        if before['p99_ms'] and now['p99_ms'] and now['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['p99_ms']}ms -> {now['p99_ms']}ms")
+        if before['throughput_rps'] and now['throughput_rps'] and now['throughput_rps'] < before['throughput_rps'] / (1 + tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {now['throughput_rps']} req/s")
+        if now['errors'] > before['errors']:
+            regressions.append(f"{name}: errors {before['errors']} -> {now['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--viewers', type=int, default=20, help='concurrent simulated viewers per route')
+    parser.add_argument('--requests', type=int, default=10, help='requests per viewer per route')
+    parser.add_argument('--latency', type=float, default=0.0, help='upstream latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='upstream latency jitter in seconds')
+    parser.add_argument('--replay', type=float, default=None, help='replay the game live over this many seconds')
+    parser.add_argument('--fixture', help='recorded fixture file (default: synthetic game)')
+    parser.add_argument('--routes', help='comma-separated route names to run (default: all)')
+    parser.add_argument('--output', default='-', help='results file, or - for stdout')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+    args = parser.parse_args()
+
+    routes = [r for r in ROUTES if not args.routes or r[0] in args.routes.split(',')]
+    results = run_benchmark(args.viewers, args.requests, args.latency, args.jitter, fixtures.load(args.fixture), routes, replay=args.replay)
+    text = json.dumps(results, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    for name, r in results['routes'].items():
+        print(f"{name:<14} p50 {r['p50_ms']:>9}ms  p99 {r['p99_ms']:>9}ms  {r['throughput_rps']:>8} req/s  errors {r['errors']}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
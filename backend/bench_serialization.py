@@ -0,0 +1,77 @@
+"""Micro-benchmark: response serialization time per endpoint.
+
+Compares Flask's default provider (what jsonify used before) with the
+configured fast backend, and with shared upstream payloads whose encoding
+is reused. Payloads are synthetic but shaped and sized like ESPN's.
+
+    python bench_serialization.py [repeats]
+"""
+import sys
+import time
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from serialization import JSON_BACKEND, EncodedCache, compress, dumps
+
+
+def _play(i):
+    return {
+        'id': str(400000000 + i), 'sequenceNumber': str(i), 'type': {'id': '24', 'text': 'Pass Reception'},
+        'text': f'J.Smith pass short right to K.Jones for {i % 20} yds to the KC {i % 50} (T.Brown).',
+        'period': {'number': 1 + i % 4}, 'clock': {'displayValue': '12:34'},
+        'start': {'down': 1 + i % 4, 'distance': 10, 'yardLine': 35, 'team': {'id': '12'}},
+        'end': {'down': 1, 'distance': 10, 'yardLine': 45, 'team': {'id': '12'}},
+        'statYardage': i % 20, 'scoringPlay': False, 'wallclock': '2025-10-12T17:05:00Z',
+    }
+
+
+def _game(i):
+    return {
+        'id': str(401547000 + i), 'name': 'Kansas City Chiefs at Buffalo Bills', 'status': 'STATUS_FINAL',
+        'start_time': '2025-10-12T17:00Z', 'home_team': {'id': '2', 'name': 'Buffalo Bills', 'score': '24'},
+        'away_team': {'id': '12', 'name': 'Kansas City Chiefs', 'score': '20'},
+    }
+
+
+PAYLOADS = {
+    '/api/games/<id>': {'game': {
+        'header': {'id': '401547000', 'competitions': [{'competitors': [_game(0)['home_team'], _game(0)['away_team']]}]},
+        'drives': {'previous': [{'id': str(d), 'plays': [_play(d * 12 + p) for p in range(12)]} for d in range(24)]},
+        'boxscore': {'players': [{'team': {'id': str(t)}, 'statistics': [{'athletes': [
+            {'athlete': {'id': str(a), 'displayName': f'Player {a}'}, 'stats': ['12', '85', '7.1', '1']}
+            for a in range(40)]}]} for t in range(2)]},
+    }},
+    '/api/games/<id>/plays': {'plays': [_play(i) for i in range(288)]},
+    '/api/teams/<id>': {'team': {'id': '12', 'displayName': 'Kansas City Chiefs', 'athletes': [
+        {'id': str(a), 'fullName': f'Player {a}', 'position': {'abbreviation': 'WR'}, 'jersey': str(a % 99)}
+        for a in range(90)]}},
+    '/api/games': {'games': [_game(i) for i in range(16)]},
+}
+
+
+def _time(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main(repeats=200):
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    print(f'backend: {JSON_BACKEND}, {repeats} repeats, times in ms per response')
+    print(f'{"endpoint":<26}{"bytes":>9}{"jsonify":>10}{"fast":>8}{"shared":>8}{"saved":>8}{"gzip":>9}')
+    for endpoint, payload in PAYLOADS.items():
+        cache = EncodedCache()
+        value = next(iter(payload.values()))
+        cache.share(value)
+        body = dumps(payload)
+        before = _time(lambda: default.dumps(payload).encode(), repeats)
+        fast = _time(lambda: dumps(payload), repeats)
+        shared = _time(lambda: cache.dumps(value), repeats)
+        gzipped = len(compress(body, 'gzip'))
+        print(f'{endpoint:<26}{len(body):>9}{before:>10.3f}{fast:>8.3f}{shared:>8.3f}'
+              f'{before - min(fast, shared):>8.3f}{gzipped:>9}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
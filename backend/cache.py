@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A single in-progress load that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTLs and single-flight loading.
+
+    Entries are evicted least-recently-used first once either max_entries or
+    max_bytes is exceeded. Concurrent misses on the same key share one call
+    to the loader instead of each hitting the upstream.
+
+    With a stale_ttl, expired entries are kept that much longer and served
+    (flagged as stale) while another caller is refreshing them or when the
+    refresh fails.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, stale_until)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_served = 0
+
+    def get(self, key, count_miss: bool = True):
+        """Return the cached value for key, or None if missing or expired.
+
+        Pass count_miss=False when the caller will load the key with
+        get_or_load on a miss, which counts it then.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.monotonic():
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """Return the stored value for key even if it has expired, without touching LRU order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def set(self, key, value, ttl: float, size: int = 1, stale_ttl: float = 0):
+        """Store value under key for ttl seconds, evicting LRU entries as needed."""
+        with self._lock:
+            self._store(key, value, ttl, size, stale_ttl)
+
+    def get_or_load(self, key, ttl: float, loader, stale_ttl: float = 0):
+        """Return the cached value for key, calling loader() on a miss.
+
+        loader must return a (value, size) tuple. Errors are not cached and are
+        re-raised to every caller that was waiting on the same load.
+        """
+        return self.get_or_load_with_status(key, ttl, loader, stale_ttl)[0]
+
+    def get_or_load_with_status(self, key, ttl: float, loader, stale_ttl: float = 0):
+        """Like get_or_load, but returns (value, stale)."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], False
+            stale = entry if entry is not None and entry[3] > now else None
+            flight = self._inflight.get(key)
+            if flight is not None:
+                if stale is not None:
+                    # someone is already refreshing; don't queue behind them
+                    self.stale_served += 1
+                    return stale[0], True
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, False
+
+        try:
+            value, size = loader()
+            flight.value = value
+            with self._lock:
+                self._store(key, value, ttl, size, stale_ttl)
+            return value, False
+        except Exception as e:
+            flight.error = e
+            if stale is not None:
+                with self._lock:
+                    self.stale_served += 1
+                return stale[0], True
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'stale_served': self.stale_served,
+                # how many requests were served per upstream call
+                'fan_in': round(lookups / self.misses, 2) if self.misses else None,
+            }
+
+    def _store(self, key, value, ttl, size, stale_ttl=0):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl
+        self._entries[key] = (value, size, expires_at, expires_at + stale_ttl)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, old_size, _, _) = self._entries.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
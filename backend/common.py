@@ -1,20 +1,322 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from breaker import BreakerRegistry
+from cache import TTLCache
+from metrics import Histogram, Timings
+from serialization import encoded_cache, loads
 
-def fetch_json(url: str, params: dict | None = None) -> dict:
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+
+# Upstream connection settings; pool sizes are per host, e.g. "cdn.espn.com=20,site.api.espn.com=20"
+CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3))
+READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 8))
+DEFAULT_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 10))
+POOL_SIZES = dict(
+    (host, int(size))
+    for host, _, size in (item.partition('=') for item in os.environ.get(
+        'UPSTREAM_POOL_SIZES',
+        'site.api.espn.com=20,site.web.api.espn.com=10,sports.core.api.espn.com=20,cdn.espn.com=20',
+    ).split(',') if item)
+)
+RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+
+# How services try alternative upstream endpoints (see fetch_first)
+FETCH_MODES = ('sequential', 'parallel', 'hedged')
+DEFAULT_HEDGE_DELAY = 0.25
+
+# Seconds to keep an upstream response, by endpoint family. The first matching
+# fragment wins; URLs that match nothing are not cached.
+CACHE_TTLS = [
+    ('/nfl/scoreboard', 15),
+    ('cdn.espn.com/core/nfl/game', 15),
+    ('cdn.espn.com/core/nfl/playbyplay', 10),
+    ('/plays', 10),
+    ('/teams', 3600),
+    ('/athletes', 3600),
+]
+
+# Seconds an expired response may still be served while ESPN is failing or being refreshed
+STALE_TTL = float(os.environ.get('STALE_TTL', 600))
+
+response_cache = TTLCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_ENTRIES', 2048)),
+    max_bytes=int(os.environ.get('RESPONSE_CACHE_MB', 128)) * 1024 * 1024,
+)
+
+
+def cache_ttl(url: str) -> float:
+    """Return how long responses from url may be cached (0 means never)."""
+    for fragment, ttl in CACHE_TTLS:
+        if fragment in url:
+            return ttl
+    return 0
+
+
+def cache_key(url: str, params: dict) -> tuple:
+    return (url, tuple(sorted((str(k), str(v)) for k, v in params.items())))
+
+
+class UpstreamStats:
+    """Per-host latency, error and connection-pool saturation counters."""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts.setdefault(host, {
+                'latency': Histogram(), 'in_flight': 0, 'peak_in_flight': 0, 'saturated': 0, 'errors': 0, 'not_modified': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0,
+            })
+        return stats
+
+    def start(self, host: str):
+        with self._lock:
+            stats = self._host(host)
+            stats['in_flight'] += 1
+            stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+            # more concurrent calls than pooled connections means new handshakes
+            if stats['in_flight'] > POOL_SIZES.get(host, DEFAULT_POOL_SIZE):
+                stats['saturated'] += 1
+
+    def not_modified(self, host: str):
+        with self._lock:
+            self._host(host)['not_modified'] += 1
+
+    def usage(self, host: str, prompt_tokens: int, completion_tokens: int):
+        """Count LLM tokens billed for a call to host."""
+        with self._lock:
+            stats = self._host(host)
+            stats['prompt_tokens'] += prompt_tokens or 0
+            stats['completion_tokens'] += completion_tokens or 0
+
+    def finish(self, host: str, elapsed: float, error: bool):
+        with self._lock:
+            stats = self._host(host)
+            stats['in_flight'] -= 1
+            if error:
+                stats['errors'] += 1
+        stats['latency'].observe(elapsed)
+
+    def items(self) -> list:
+        """(host, stats) pairs; stats['latency'] is the live Histogram."""
+        with self._lock:
+            return [(host, dict(stats, pool_size=POOL_SIZES.get(host, DEFAULT_POOL_SIZE))) for host, stats in self._hosts.items()]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                'latency': stats['latency'].snapshot(),
+                'in_flight': stats['in_flight'],
+                'peak_in_flight': stats['peak_in_flight'],
+                'pool_size': POOL_SIZES.get(host, DEFAULT_POOL_SIZE),
+                'saturated': stats['saturated'],
+                'errors': stats['errors'],
+                'not_modified': stats['not_modified'],
+                'prompt_tokens': stats['prompt_tokens'],
+                'completion_tokens': stats['completion_tokens'],
+            }
+            for host, stats in hosts.items()
+        }
+
+
+upstream_stats = UpstreamStats()
+breakers = BreakerRegistry()
+# fetch_json calls per host as the services see them, cache hits included
+fetch_timings = Timings(('host',))
+
+# Per-request list of upstream URLs answered from stale cache (see track_stale)
+_stale_urls = contextvars.ContextVar('stale_urls', default=None)
+
+
+def track_stale() -> list:
+    """Start recording stale upstream responses for the current request.
+
+    Returns the list that fetch_json appends stale URLs to.
     """
-    Fetch JSON from a URL with basic error handling.
+    urls = []
+    _stale_urls.set(urls)
+    return urls
+
+
+def stale_urls() -> list:
+    """Upstream URLs served from stale cache during the current request."""
+    return _stale_urls.get() or []
+
+
+def build_session() -> requests.Session:
+    """Keep-alive session with per-host connection pools and jittered GET retries.
+
+    Connection errors and retryable statuses are retried; read timeouts are
+    not, so a hung upstream costs one READ_TIMEOUT and counts against its breaker.
     """
-    params = params or {}
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
-    }
+    retry = Retry(
+        total=RETRIES,
+        read=0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        backoff_factor=0.2,
+        backoff_jitter=0.2,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+    for host, size in POOL_SIZES.items():
+        session.mount(f'https://{host}/', HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry))
+    session.mount('https://', HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE, max_retries=retry))
+    session.mount('http://', HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE, max_retries=retry))
+    return session
+
+
+session = build_session()
+
+
+class CachedResponse:
+    """An upstream JSON body plus the validators needed to revalidate it.
+
+    size is the body's length in bytes, charged against response_cache's byte cap.
+    """
+
+    __slots__ = ('data', 'etag', 'last_modified', 'size')
 
+    def __init__(self, data, etag=None, last_modified=None, size=0):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+
+
+def _get(url: str, params: dict, previous: CachedResponse | None = None):
+    """GET url, revalidating previous with a conditional request if given.
+
+    Returns (CachedResponse, size). On 304 Not Modified the previous
+    response is reused without downloading or parsing the body again.
+    """
+    host = urlsplit(url).hostname
+    headers = {}
+    if previous is not None:
+        if previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+    upstream_stats.start(host)
+    started = time.perf_counter()
+    failed = True
     try:
-        resp = requests.get(url, params=params, headers=headers, timeout=8)
+        resp = session.get(url, params=params, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        if resp.status_code == 304 and previous is not None:
+            failed = False
+            upstream_stats.not_modified(host)
+            # a 304 has no body; the reused one still takes its original size
+            return previous, previous.size
         resp.raise_for_status()
-        data = resp.json()
+        data = loads(resp.content)
+        failed = False
     except Exception as e:
-        print("Error fetching %s: %s", url, e)
+        print(f"Error fetching {url}: {e}")
         raise
+    finally:
+        upstream_stats.finish(host, time.perf_counter() - started, failed)
+
+    cached = CachedResponse(data, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), len(resp.content))
+    return cached, cached.size
+
+
+@fetch_timings.timed(lambda url, params=None: (urlsplit(url).hostname,))
+def fetch_json(url: str, params: dict | None = None) -> dict:
+    """
+    Fetch JSON from a URL with basic error handling.
+
+    Responses are shared through response_cache, so callers must treat the
+    returned data as read-only. Expired entries are revalidated with
+    If-None-Match / If-Modified-Since. Each upstream host has a circuit
+    breaker; while it is open, or while another request is refreshing an
+    expired entry, the last good response is returned and recorded in
+    stale_urls().
+    """
+    params = params or {}
+    breaker = breakers.get(urlsplit(url).hostname)
+    ttl = cache_ttl(url)
+    if not ttl:
+        return breaker.call(lambda: _get(url, params))[0].data
+    key = cache_key(url, params)
+    def load():
+        cached, size = breaker.call(lambda: _get(url, params, response_cache.peek(key)))
+        # every caller gets this same object until the next refresh, so encode it once
+        encoded_cache.share(cached.data)
+        return cached, size
+
+    cached, stale = response_cache.get_or_load_with_status(key, ttl, load, stale_ttl=STALE_TTL)
+    if stale:
+        urls = _stale_urls.get()
+        if urls is not None:
+            urls.append(url)
+    return cached.data
+
+
+_fanout_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('FANOUT_WORKERS', 32)), thread_name_prefix='fanout')
+
+
+def fetch_mode_for(service: str) -> tuple:
+    """Read a service's (mode, hedge_delay) from <SERVICE>_FETCH_MODE / <SERVICE>_HEDGE_DELAY."""
+    mode = os.environ.get(f'{service.upper()}_FETCH_MODE', 'hedged')
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode {mode!r} for {service}")
+    return mode, float(os.environ.get(f'{service.upper()}_HEDGE_DELAY', DEFAULT_HEDGE_DELAY))
+
+
+def fetch_first(calls: list, mode: str = 'hedged', hedge_delay: float = DEFAULT_HEDGE_DELAY):
+    """Return the result of the first of several alternative calls to succeed.
+
+    calls are zero-argument callables in order of preference.
+    - sequential: try each in turn after the previous one fails
+    - parallel: start them all at once
+    - hedged: start the next one as soon as the previous fails or hedge_delay
+      seconds pass without an answer
+
+    Calls that have not started yet are cancelled once one succeeds; calls
+    already running are left to finish in the background and their results
+    discarded. If every call fails the last error is raised.
+    """
+    if mode == 'sequential':
+        last_error = None
+        for call in calls:
+            try:
+                return call()
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    queued = list(calls)
+    pending = set()
+    last_error = None
+    def launch():
+        # run in a copy of the caller's context so stale tracking carries over
+        pending.add(_fanout_executor.submit(contextvars.copy_context().run, queued.pop(0)))
 
-    return data
\ No newline at end of file
+    for _ in range(len(queued) if mode == 'parallel' else 1):
+        launch()
+    while pending:
+        done, pending = wait(pending, timeout=hedge_delay if queued else None, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            last_error = future.exception()
+        # either the hedge timer fired or a call failed: bring in the next one
+        if queued:
+            launch()
+    raise last_error
@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrent Groq calls, and the most calls started per minute across them
+EXPLAIN_WORKERS = int(os.environ.get('EXPLAIN_WORKERS', 4))
+EXPLAIN_RPM = int(os.environ.get('EXPLAIN_RPM', 30))
+# Seconds before a play whose generation failed is tried again
+RETRY_AFTER_FAILURE = 60
+
+
+class RateLimiter:
+    """Spaces out call starts so no more than per_minute begin in any minute."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class GenerationInterrupted(Exception):
+    """A streamed generation failed after some of its chunks were sent."""
+
+
+class TokenStream:
+    """Chunks of one generation, readable by any number of viewers while it is written.
+
+    failed is set when the generation stopped partway; the chunks are then incomplete.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._done = False
+        self.failed = False
+        self._cond = threading.Condition()
+
+    def write(self, chunk: str):
+        with self._cond:
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def fail(self):
+        with self._cond:
+            self.failed = True
+        self.close()
+
+    def __iter__(self):
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self._chunks) and not self._done:
+                    self._cond.wait()
+                chunks = self._chunks[seen:]
+                done = self._done
+            seen += len(chunks)
+            yield from chunks
+            if done:
+                return
+
+
+class ExplanationPool:
+    """Generates AI explanations off the request thread.
+
+    Requests for a play that is already queued or running share the same
+    job, concurrency is capped by the number of workers, and call starts are
+    rate limited to stay inside the Groq quota. Finished text is written to
+    the cache that explain_play_obj reads from.
+
+    When generate_stream is given, stream() runs a job that publishes its
+    chunks as they arrive, so viewers can read the text while it is written.
+    """
+
+    def __init__(self, generate, cache, max_workers: int = EXPLAIN_WORKERS, per_minute: int = EXPLAIN_RPM, generate_stream=None):
+        self.generate = generate
+        self.generate_stream = generate_stream
+        self.cache = cache
+        self.limiter = RateLimiter(per_minute)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='explain')
+        self._inflight = {}
+        self._streams = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduped = 0
+
+    def submit(self, key, play_obj: dict):
+        """Queue generation for a play unless it is cached, in flight, or recently failed.
+
+        key identifies the explanation in the cache (see PlayService.explanation_key).
+
+        Returns the Future for the job, or None if nothing was queued.
+        """
+        with self._lock:
+            if key in self._inflight:
+                self.deduped += 1
+                return self._inflight[key]
+            if time.monotonic() - self._failed.get(key, float('-inf')) < RETRY_AFTER_FAILURE:
+                return None
+        # may read the persistent store, so not under the pool lock
+        if key in self.cache:
+            return None
+        with self._lock:
+            if key in self._inflight:
+                self.deduped += 1
+                return self._inflight[key]
+            future = self._inflight[key] = self._executor.submit(self._run, key, play_obj)
+            self.submitted += 1
+            return future
+
+    def stream(self, key, play_obj):
+        """Yield a play's AI explanation in chunks as it is generated.
+
+        Viewers of the same play share one streamed job. A play already queued
+        by submit() is yielded whole once that job finishes, and cached text is
+        yielded at once. Yields nothing if generation fails before any chunk,
+        and raises GenerationInterrupted after the chunks if it fails partway.
+        """
+        text = self.cache.get(key)
+        if text is not None:
+            yield text
+            return
+        with self._lock:
+            tokens = self._streams.get(key)
+            future = self._inflight.get(key)
+            if future is not None:
+                self.deduped += 1
+            elif time.monotonic() - self._failed.get(key, float('-inf')) < RETRY_AFTER_FAILURE:
+                return
+            else:
+                tokens = self._streams[key] = TokenStream() if self.generate_stream else None
+                future = self._inflight[key] = self._executor.submit(self._run, key, play_obj, tokens)
+                self.submitted += 1
+        if tokens is not None:
+            yield from tokens
+            if tokens.failed:
+                raise GenerationInterrupted(key)
+            return
+        text = future.result()
+        if text:
+            yield text
+
+    def status(self, key) -> str:
+        """'ready', 'pending' or 'unavailable' for a play's AI explanation."""
+        with self._lock:
+            if key in self._inflight:
+                return 'pending'
+            if key in self._failed:
+                return 'unavailable'
+        return 'ready' if key in self.cache else 'pending'
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._inflight),
+                'submitted': self.submitted,
+                'deduped': self.deduped,
+                'failed': len(self._failed),
+            }
+
+    def _run(self, key, play_obj, tokens=None):
+        try:
+            self.limiter.acquire()
+            if tokens is None:
+                text = self.generate(play_obj)
+            else:
+                text = self._generate_streamed(play_obj, tokens)
+            if text:
+                self.cache[key] = text
+            with self._lock:
+                self._failed.pop(key, None)
+                if not text:
+                    now = self._failed[key] = time.monotonic()
+                    # entries are in failure order, so drop the expired ones from the front
+                    for old, failed_at in list(self._failed.items()):
+                        if now - failed_at < RETRY_AFTER_FAILURE:
+                            break
+                        del self._failed[old]
+            return text
+        finally:
+            if tokens is not None:
+                tokens.close()
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._streams.pop(key, None)
+
+    def _generate_streamed(self, play_obj, tokens: TokenStream):
+        chunks = []
+        try:
+            for chunk in self.generate_stream(play_obj):
+                chunks.append(chunk)
+                tokens.write(chunk)
+        except Exception as e:
+            print(f"Error streaming AI explanation: {e}")
+            # a partial answer is never cached, and viewers are told to drop it
+            tokens.fail()
+            return None
+        return ''.join(chunks)
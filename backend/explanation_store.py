@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+EXPLANATION_DB_PATH = os.environ.get('EXPLANATION_DB_PATH', 'explanations.sqlite3')
+EXPLANATION_MEMORY_ENTRIES = int(os.environ.get('EXPLANATION_MEMORY_ENTRIES', 5000))
+
+
+class SQLiteBackend:
+    """Explanations persisted in a SQLite file.
+
+    WAL mode lets several worker processes or replicas on the same node share
+    one file. Any object with the same get/put/count methods (e.g. a Redis
+    client wrapper) can be used instead.
+    """
+
+    def __init__(self, path: str = EXPLANATION_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS explanations ('
+                ' game_id TEXT NOT NULL, play_id TEXT NOT NULL, prompt_version TEXT NOT NULL,'
+                " text TEXT NOT NULL, created_at INTEGER DEFAULT (strftime('%s', 'now')),"
+                ' PRIMARY KEY (game_id, play_id, prompt_version))'
+            )
+            self._conn.commit()
+
+    def get(self, key: tuple):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT text FROM explanations WHERE game_id = ? AND play_id = ? AND prompt_version = ?', key
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: tuple, text: str):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO explanations (game_id, play_id, prompt_version, text) VALUES (?, ?, ?, ?)', (*key, text))
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM explanations').fetchone()[0]
+
+
+class ExplanationStore:
+    """Size-capped LRU of AI explanations in front of a persistent backend.
+
+    Keys are (game_id, play_id, prompt_version) tuples, so bumping the prompt
+    version regenerates explanations without clearing the store. Supports the
+    dict operations the explanation pool uses (in, get, item assignment).
+    """
+
+    def __init__(self, backend=None, max_entries: int = EXPLANATION_MEMORY_ENTRIES):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        text = None
+        if self.backend is not None:
+            try:
+                text = self.backend.get(key)
+            except Exception as e:
+                print(f"Error reading explanation store: {e}")
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return default
+            self.backend_hits += 1
+            self._remember(key, text)
+        return text
+
+    def __contains__(self, key) -> bool:
+        """Whether key has an explanation; a membership check, not counted as a lookup in stats."""
+        with self._lock:
+            if key in self._memory:
+                return True
+        if self.backend is None:
+            return False
+        try:
+            text = self.backend.get(key)
+        except Exception as e:
+            print(f"Error reading explanation store: {e}")
+            return False
+        if text is None:
+            return False
+        with self._lock:
+            self._remember(key, text)
+        return True
+
+    def __setitem__(self, key, text: str):
+        with self._lock:
+            self._remember(key, text)
+        if self.backend is not None:
+            try:
+                self.backend.put(key, text)
+            except Exception as e:
+                print(f"Error writing explanation store: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.backend_hits + self.misses
+            stats = {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'backend_hits': self.backend_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.backend_hits) / lookups, 3) if lookups else None,
+            }
+        if self.backend is not None:
+            try:
+                stats['backend_entries'] = self.backend.count()
+            except Exception:
+                stats['backend_entries'] = None
+        return stats
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,356 @@
+"""Recorded ESPN and Groq responses served from a local HTTP server.
+
+Stands in for every upstream the services call, so benchmarks and tests can
+run against full-game payloads without the network:
+
+    python fixtures.py record 401671789 fixtures/401671789.json
+    python fixtures.py serve [fixtures/401671789.json] --latency 0.05
+
+Without a recorded file a synthetic game of the same shape and size is used.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from serialization import dumps
+
+SCOREBOARD_URL = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
+TEAMS_URL = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams'
+GAME_URL = 'https://cdn.espn.com/core/nfl/game'
+CORE_EVENTS = 'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/events'
+ATHLETE_URL = 'https://site.web.api.espn.com/apis/common/v3/sports/football/nfl/athletes'
+
+_CORE_PLAYS = re.compile(r'^sports\.core\.api\.espn\.com/.*/events/\d+/competitions/\d+/plays$')
+_TEAM = re.compile(r'^site\.api\.espn\.com/.*/nfl/teams/\d+$')
+_ATHLETE = re.compile(r'/athletes/\d+')
+_COMPLETION = 'The offense threw a short pass to move the chains.'
+
+
+def synthesize_game(game_id: str = '401547000', drives: int = 24, plays_per_drive: int = 12) -> dict:
+    """A deterministic fixture shaped like a recorded full game (see record)."""
+    rng = random.Random(game_id)
+    home, away = {'id': '2', 'displayName': 'Buffalo Bills', 'abbrev': 'BUF'}, {'id': '12', 'displayName': 'Kansas City Chiefs', 'abbrev': 'KC'}
+    plays, score = [], {'2': 0, '12': 0}
+    for d in range(drives):
+        team = (home, away)[d % 2]
+        yard_line = 25
+        for p in range(plays_per_drive):
+            n = len(plays)
+            gained = rng.randint(-3, 15)
+            scoring = p == plays_per_drive - 1 and d % 3 == 0
+            if scoring:
+                score[team['id']] += 7
+            play_id = f'{game_id}{n:05d}'
+            plays.append({
+                '$ref': f'{CORE_EVENTS}/{game_id}/competitions/{game_id}/plays/{play_id}',
+                'id': play_id,
+                'sequenceNumber': str(n * 100),
+                'type': {'id': '67' if scoring else '24', 'text': 'Passing Touchdown' if scoring else 'Pass Reception'},
+                'text': f"(12:{n % 60:02d}) P.Mahomes pass short right to T.Kelce for {gained} yards to the {team['abbrev']} {yard_line}.",
+                'shortText': f'Mahomes pass to Kelce for {gained} yds',
+                'period': {'number': 1 + n * 4 // (drives * plays_per_drive)},
+                'clock': {'value': 900 - n % 60 * 15, 'displayValue': f'{14 - n % 15}:{n % 60:02d}'},
+                'start': {
+                    'down': 1 + p % 4, 'distance': 10 - p % 10, 'yardLine': yard_line, 'yardsToEndzone': 100 - yard_line,
+                    'team': {'$ref': f'{CORE_EVENTS[:-7]}/seasons/2025/teams/{team["id"]}'},
+                },
+                'end': {'down': 1, 'distance': 10, 'yardLine': yard_line + gained},
+                'statYardage': gained,
+                'homeScore': score['2'],
+                'awayScore': score['12'],
+                'scoringPlay': scoring,
+                'scoreValue': 7 if scoring else 0,
+                'scoringType': {'displayName': 'Touchdown'} if scoring else None,
+                'wallclock': f'2025-10-12T17:{n % 60:02d}:00Z',
+            })
+            yard_line = max(1, min(99, yard_line + gained))
+    competitors = [
+        {'homeAway': side, 'score': str(score[t['id']]), 'team': t} for side, t in (('home', home), ('away', away))
+    ]
+    event = {
+        'id': game_id, 'date': '2025-10-12T17:00Z', 'name': f"{away['displayName']} at {home['displayName']}",
+        'status': {'type': {'name': 'STATUS_FINAL'}}, 'competitions': [{'competitors': competitors}],
+    }
+    athletes = [
+        {'athlete': {'id': str(3000000 + a), 'displayName': f'Player {a}'}, 'stats': [str(rng.randint(0, 99)) for _ in range(6)]}
+        for a in range(45)
+    ]
+    return {
+        'game_id': game_id,
+        'plays': plays,
+        'scoreboard': {'events': [event]},
+        'game': {'gamepackageJSON': {
+            'header': {'id': game_id, 'competitions': [{'competitors': competitors, 'status': event['status']}]},
+            'drives': {'previous': [{'id': str(d), 'plays': plays[d * plays_per_drive:(d + 1) * plays_per_drive]} for d in range(drives)]},
+            'boxscore': {'players': [{'team': t, 'statistics': [{'athletes': athletes}]} for t in (home, away)]},
+        }},
+        'teams': {'sports': [{'leagues': [{'teams': [{'team': t} for t in (home, away)]}]}]},
+        'team': {'team': dict(home, athletes=[a['athlete'] for a in athletes])},
+        'athlete': {'athlete': {'id': '3000000', 'fullName': 'Player 0', 'position': {'abbreviation': 'QB'}}},
+    }
+
+
+def load(path: str | None = None) -> dict:
+    """A recorded fixture file, or the synthetic game if path is None."""
+    if path is None:
+        return synthesize_game()
+    with open(path) as f:
+        return json.load(f)
+
+
+def record(game_id: str, path: str):
+    """Download one real game's responses from ESPN into a fixture file."""
+    from common import fetch_json
+
+    game = fetch_json(GAME_URL, {'xhr': 1, 'gameId': game_id})
+    header = (game.get('gamepackageJSON') or {}).get('header') or {}
+    competition = (header.get('competitions') or [{}])[0]
+    plays, page = [], 1
+    while True:
+        data = fetch_json(f'{CORE_EVENTS}/{game_id}/competitions/{game_id}/plays', {'limit': 1000, 'page': page})
+        plays.extend(data.get('items', []))
+        if page >= (data.get('pageCount') or 1):
+            break
+        page += 1
+    date = (competition.get('date') or '')[:10].replace('-', '')
+    team_id = ((competition.get('competitors') or [{}])[0].get('team') or {}).get('id')
+    boxscore = (game.get('gamepackageJSON') or {}).get('boxscore') or {}
+    athlete_ids = [
+        a['athlete']['id'] for team in boxscore.get('players', []) for stat in team.get('statistics', [])
+        for a in stat.get('athletes', []) if (a.get('athlete') or {}).get('id')
+    ]
+    fixture = {
+        'game_id': str(game_id),
+        'plays': plays,
+        'scoreboard': fetch_json(SCOREBOARD_URL, {'dates': date} if date else {}),
+        'game': game,
+        'teams': fetch_json(TEAMS_URL),
+        'team': fetch_json(f'{TEAMS_URL}/{team_id}', {'enable': 'roster'}) if team_id else None,
+        'athlete': fetch_json(f'{ATHLETE_URL}/{athlete_ids[0]}/overview') if athlete_ids else None,
+    }
+    with open(path, 'w') as f:
+        json.dump(fixture, f)
+
+
+class FixtureServer:
+    """Local HTTP stand-in for ESPN and Groq serving one fixture game.
+
+    Pass fetch_json as a service's fetch_func: it rewrites ESPN URLs to this
+    server and goes through common.fetch_json, so caching, revalidation and
+    breakers behave as in production. latency (+/- jitter) seconds is added
+    to every response. With replay_seconds the game is replayed as if live:
+    plays appear evenly over that many seconds, then the game goes final.
+    """
+
+    def __init__(self, fixture: dict | None = None, latency: float = 0.0, jitter: float = 0.0,
+                 replay_seconds: float | None = None, clock=time.monotonic):
+        self.fixture = fixture or synthesize_game()
+        self.latency = latency
+        self.jitter = jitter
+        self.replay_seconds = replay_seconds
+        self.clock = clock
+        self.requests = 0
+        self._started = None
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, port: int = 0) -> 'FixtureServer':
+        self._started = self.clock()
+        server = self
+
+        class Handler(_Handler):
+            fixtures = server
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name='fixture-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def rewrite(self, url: str) -> str:
+        """https://<host>/<path> on ESPN becomes <self.url>/<host>/<path>."""
+        parts = urlsplit(url)
+        return f'{self.url}/{parts.hostname}{parts.path}'
+
+    def fetch_json(self, url: str, params: dict | None = None) -> dict:
+        from common import fetch_json
+        return fetch_json(self.rewrite(url), params)
+
+    def groq_client(self):
+        """Groq client whose chat completions are answered by this server."""
+        from groq import Groq
+        return Groq(api_key='fixture', base_url=self.url, max_retries=0)
+
+    def visible_plays(self) -> int:
+        plays = len(self.fixture['plays'])
+        if not self.replay_seconds:
+            return plays
+        elapsed = self.clock() - self._started
+        return min(plays, int(plays * elapsed / self.replay_seconds))
+
+    def response(self, method: str, path: str, query: dict):
+        """(status, body bytes) for a request, or (404, None)."""
+        visible = self.visible_plays()
+        live = visible < len(self.fixture['plays'])
+        key = (path, tuple(sorted(query.items())), visible)
+        with self._lock:
+            self.requests += 1
+            body = self._bodies.get(key)
+        if body is None:
+            data = self._route(method, path, query, visible, live)
+            if data is None:
+                return 404, None
+            body = dumps(data)
+            with self._lock:
+                if len(self._bodies) > 4096:
+                    self._bodies.clear()
+                self._bodies[key] = body
+        return 200, body
+
+    def _route(self, method, path, query, visible, live):
+        fixture = self.fixture
+        plays = fixture['plays'][:visible]
+        if path == 'openai/v1/chat/completions' and method == 'POST':
+            return {
+                'id': 'chatcmpl-fixture', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'fixture',
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                    'role': 'assistant', 'content': _COMPLETION,
+                }}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            }
+        if path.endswith('/nfl/scoreboard'):
+            return self._with_status(fixture['scoreboard'], live)
+        if path == 'cdn.espn.com/core/nfl/game':
+            return fixture['game']
+        if path == 'cdn.espn.com/core/nfl/playbyplay':
+            return {'plays': plays}
+        if _CORE_PLAYS.match(path):
+            limit = int(query.get('limit', 25))
+            page = int(query.get('page', 1))
+            return {
+                'count': len(plays), 'pageIndex': page, 'pageSize': limit,
+                'pageCount': max(1, -(-len(plays) // limit)),
+                'items': plays[(page - 1) * limit:page * limit],
+            }
+        if path.endswith('/nfl/teams'):
+            return fixture['teams']
+        if _TEAM.match(path):
+            return fixture.get('team')
+        if _ATHLETE.search(path):
+            return fixture.get('athlete')
+        return None
+
+    def _with_status(self, scoreboard: dict, live: bool) -> dict:
+        if not live:
+            return scoreboard
+        events = [
+            dict(ev, status={'type': {'name': 'STATUS_IN_PROGRESS'}}) if ev.get('id') == self.fixture['game_id'] else ev
+            for ev in scoreboard.get('events', [])
+        ]
+        return dict(scoreboard, events=events)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fixtures = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._respond('GET')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path.lstrip('/') == 'openai/v1/chat/completions' and json.loads(body or b'{}').get('stream'):
+            self._stream_completion()
+            return
+        self._respond('POST')
+
+    def _stream_completion(self):
+        """A chat completion as server-sent chunks, one word each, like Groq with stream=True."""
+        if self.fixtures.latency > 0:
+            time.sleep(self.fixtures.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        words = _COMPLETION.split(' ')
+        for i, word in enumerate(words):
+            chunk = {
+                'id': 'chatcmpl-fixture', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': 'fixture',
+                'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word}, 'finish_reason': None}],
+            }
+            if i == len(words) - 1:
+                chunk['x_groq'] = {'id': 'fixture', 'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)}}
+            self.wfile.write(b'data: ' + dumps(chunk) + b'\n\n')
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+
+    def _respond(self, method):
+        fixtures = self.fixtures
+        delay = fixtures.latency + random.uniform(-fixtures.jitter, fixtures.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        status, body = fixtures.response(method, parts.path.lstrip('/'), query)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    rec = commands.add_parser('record', help='download a game from ESPN into a fixture file')
+    rec.add_argument('game_id')
+    rec.add_argument('path')
+    serve = commands.add_parser('serve', help='run the stand-in server')
+    serve.add_argument('path', nargs='?')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--latency', type=float, default=0.0)
+    serve.add_argument('--jitter', type=float, default=0.0)
+    serve.add_argument('--replay', type=float, default=None, help='replay the game live over this many seconds')
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.game_id, args.path)
+        return
+    server = FixtureServer(load(args.path), args.latency, args.jitter, args.replay).start(args.port)
+    print(f'Serving game {server.fixture["game_id"]} on {server.url}')
+    threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,41 @@
 from common import fetch_json
+from scoreboard import CURRENT, ScoreboardStore, day_key, parse_day
+
+
+def _score(competitor: dict):
+    try:
+        return int(competitor['score'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def live_state(event: dict, competition: dict, home: dict, away: dict) -> dict:
+    """Score, clock, possession, down and distance and last play from a scoreboard event."""
+    status = event.get('status') or {}
+    situation = competition.get('situation') or {}
+    last = situation.get('lastPlay') or {}
+    # ESPN reports down -1 between possessions
+    down = situation.get('down') if (situation.get('down') or 0) > 0 else None
+    return {
+        'score': {'home': _score(home), 'away': _score(away)},
+        'period': status.get('period'),
+        'clock': status.get('displayClock'),
+        'detail': (status.get('type') or {}).get('shortDetail'),
+        'possession': situation.get('possession'),
+        'down': down,
+        'distance': situation.get('distance') if down else None,
+        'yard_line': situation.get('yardLine'),
+        'down_distance': situation.get('shortDownDistanceText') if down else None,
+        'red_zone': situation.get('isRedZone'),
+        'last_play': {'id': last.get('id'), 'text': last.get('text'), 'type': (last.get('type') or {}).get('text')} if last else None,
+    }
+
 
 class GameService:
     def __init__(self, fetch_func=None):
         self.fetch_json = fetch_func or fetch_json
+        # Pre-encoded scoreboards per day, refreshed in the background
+        self.snapshots = ScoreboardStore(self._fetch_games)
 
     def list_games(self, request):
         """List recent/upcoming games.
@@ -13,9 +46,36 @@ class GameService:
         Response (sample): {games: [ {id, home_team, away_team, status, start_time}, ... ]}
         """
         date = request.args.get('date')
+        return self.snapshots.get(day_key(parse_day(date)) if date else CURRENT).games
+
+    def games_json(self, request) -> bytes:
+        """Encoded {games: [...]} body for /api/games, served from snapshots.
+
+        Query params:
+        - date (YYYY-MM-DD) optional
+        - start, end (YYYY-MM-DD) optional inclusive range, up to a month
+
+        Raises InvalidDate for malformed dates or ranges.
+        """
+        start, end = request.args.get('start'), request.args.get('end')
+        if start or end:
+            return self.snapshots.range_body(parse_day(start or end), parse_day(end or start))
+        date = request.args.get('date')
+        return self.snapshots.get(day_key(parse_day(date)) if date else CURRENT).body
+
+    def live_games_json(self) -> tuple:
+        """(body, etag) for /api/games/live, served from the current scoreboard snapshot.
+
+        Response (sample): {games: [{id, home_team, away_team, status, start_time, score, period, clock,
+        possession, down, distance, yard_line, down_distance, red_zone, last_play: {id, text, type}}, ...]}
+        """
+        return self.snapshots.get(CURRENT).live_body()
+
+    def _fetch_games(self, dates=None):
+        """Fetch and flatten the ESPN scoreboard for dates (None for the current week)."""
         params = {}
-        if date:
-            params['dates'] = date
+        if dates:
+            params['dates'] = dates
         url = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
         try:
             data = self.fetch_json(url, params=params)
@@ -36,6 +96,7 @@ class GameService:
                         'away_team': {'id': away.get('team', {}).get('id'), 'name': away.get('team', {}).get('displayName'), 'abbr': away.get('team', {}).get('abbrev')},
                         'status': ev.get('status', {}).get('type', {}).get('name'),
                         'start_time': ev.get('date'),
+                        'live': live_state(ev, comp, home, away),
                     })
             return games
         except Exception as e:
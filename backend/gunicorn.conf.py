@@ -0,0 +1,36 @@
+"""Gunicorn settings for running the API in production.
+
+Every value can be overridden from the environment, e.g.
+WEB_CONCURRENCY=4 GUNICORN_WORKER_CLASS=gthread gunicorn -c gunicorn.conf.py server:app
+"""
+import importlib.util
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+
+# Worker processes. Each one keeps its own response cache and live poller.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# gevent runs each request in a greenlet, so one worker can hold thousands of
+# requests that are waiting on ESPN or Groq (and long-lived SSE streams).
+# gthread is the fallback when gevent is not installed.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent' if importlib.util.find_spec('gevent') else 'gthread')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 2000))
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then so slow leaks cannot build up over a season
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_worker_init(worker):
+    # load teams and rosters now rather than on the first /api/teams request
+    from server import team_service
+    team_service.catalog.start()
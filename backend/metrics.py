@@ -0,0 +1,179 @@
+import bisect
+import functools
+import threading
+import time
+
+# Latency bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram of observed values."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float):
+        """Approximate quantile: the upper bound of the bucket holding it."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, n in zip(self.buckets, self.counts):
+                seen += n
+                if seen >= rank:
+                    return bound
+        return f'>{self.buckets[-1]}'
+
+    def cumulative(self) -> tuple:
+        """(bound, cumulative count) pairs ending with +Inf, plus count and sum."""
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        running, buckets = 0, []
+        for bound, n in zip(self.buckets + ('+Inf',), counts):
+            running += n
+            buckets.append((bound, running))
+        return buckets, count, total
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, total = self.count, self.sum
+        return {
+            'count': count,
+            'avg': round(total / count, 4) if count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Timings:
+    """Call counts, errors, an in-flight gauge and a latency histogram per key.
+
+    Keys are tuples of label values, e.g. (method, route) for API requests.
+    Each call costs one lock round-trip at start and one at finish.
+    """
+
+    def __init__(self, labels: tuple):
+        self.labels = labels
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        stats = self._keys.get(key)
+        if stats is None:
+            stats = self._keys.setdefault(key, {'latency': Histogram(), 'in_flight': 0, 'errors': 0, 'statuses': {}})
+        return stats
+
+    def start(self, key: tuple) -> float:
+        with self._lock:
+            self._key(key)['in_flight'] += 1
+        return time.perf_counter()
+
+    def finish(self, key: tuple, started: float, error: bool = False, status=None):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats = self._key(key)
+            stats['in_flight'] -= 1
+            if error:
+                stats['errors'] += 1
+            if status is not None:
+                stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+        stats['latency'].observe(elapsed)
+
+    def timed(self, key_func):
+        """Decorator timing each call under key_func(*args, **kwargs)."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = key_func(*args, **kwargs)
+                started = self.start(key)
+                failed = True
+                try:
+                    result = func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self.finish(key, started, failed)
+            return wrapper
+        return decorate
+
+    def items(self) -> list:
+        with self._lock:
+            return [(key, dict(stats, statuses=dict(stats['statuses']))) for key, stats in self._keys.items()]
+
+    def snapshot(self) -> dict:
+        return {
+            '|'.join(map(str, key)): {
+                'count': stats['latency'].count,
+                'errors': stats['errors'],
+                'in_flight': stats['in_flight'],
+                'statuses': stats['statuses'],
+                'latency': stats['latency'].snapshot(),
+            }
+            for key, stats in self.items()
+        }
+
+
+def _labels(names, values) -> str:
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    pairs = ','.join(f'{n}="{escape(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}' if pairs else ''
+
+
+class PrometheusWriter:
+    """Builds the Prometheus text exposition format, one metric family at a time."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+
+    def sample(self, name: str, value, label_names=(), label_values=()):
+        if value is None:
+            return
+        value = value if isinstance(value, int) else repr(float(value))
+        self.lines.append(f'{name}{_labels(label_names, label_values)} {value}')
+
+    def histogram(self, name: str, histogram: Histogram, label_names=(), label_values=()):
+        buckets, count, total = histogram.cumulative()
+        for bound, n in buckets:
+            self.sample(f'{name}_bucket', n, (*label_names, 'le'), (*label_values, bound))
+        self.sample(f'{name}_sum', total, label_names, label_values)
+        self.sample(f'{name}_count', count, label_names, label_values)
+
+    def timings(self, prefix: str, help_text: str, timings: Timings):
+        """Counter, error counter, in-flight gauge and latency histogram for every key."""
+        items = timings.items()
+        self.family(f'{prefix}_total', 'counter', f'{help_text}, by outcome')
+        for key, stats in items:
+            for status, n in sorted(stats['statuses'].items()):
+                self.sample(f'{prefix}_total', n, (*timings.labels, 'status'), (*key, status))
+            if not stats['statuses'] and stats['latency'].count:
+                self.sample(f'{prefix}_total', stats['latency'].count, timings.labels, key)
+        self.family(f'{prefix}_errors_total', 'counter', f'{help_text} that failed')
+        for key, stats in items:
+            self.sample(f'{prefix}_errors_total', stats['errors'], timings.labels, key)
+        self.family(f'{prefix}_in_flight', 'gauge', f'{help_text} in progress')
+        for key, stats in items:
+            self.sample(f'{prefix}_in_flight', stats['in_flight'], timings.labels, key)
+        self.family(f'{prefix}_seconds', 'histogram', f'{help_text}, latency in seconds')
+        for key, stats in items:
+            self.histogram(f'{prefix}_seconds', stats['latency'], timings.labels, key)
+
+    def text(self) -> str:
+        return '\n'.join(self.lines) + '\n'
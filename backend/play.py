@@ -1,45 +1,92 @@
-from common import fetch_json
+from common import fetch_json, fetch_first, fetch_mode_for, upstream_stats
 import os
+import time
 from groq import Groq
+from play_store import PlayStore
+from play_record import PlayRecord, parse_fields
+from play_rules import RuleExplainer, alternatives, situation
+from play_signature import (
+    EXPLAIN_BY_SIGNATURE, SIGNATURE_PROMPT_VERSION, SignatureStats, describe, personalize, personalize_stream,
+    player_name, signature,
+)
+from explainer import ExplanationPool, GenerationInterrupted
+from explanation_store import ExplanationStore, SQLiteBackend
+
+# Page size used when topping up the play index for explain-play lookups
+INDEX_PAGE_SIZE = 100
+# Newest plays per update whose AI explanations are generated ahead of time
+PREFETCH_RECENT = int(os.environ.get('EXPLAIN_PREFETCH_RECENT', 5))
+# Bump when the prompt changes so stored explanations are regenerated
+PROMPT_VERSION = 'v1'
+EXPLAIN_MODEL = 'llama-3.3-70b-versatile'
+PLAY_NOT_FOUND = {
+    'what_happened': 'Play not found',
+    'why_the_play_happened': '',
+    'ai_explanation': None,
+    'ai_status': None,
+    'possible_alternatives': [],
+    'numbers_explained': {},
+}
+
+
+class InvalidQuery(ValueError):
+    """A play endpoint query parameter could not be used."""
+
+
+def parse_tail(request):
+    """The tail query param as an int, or None if absent. Raises InvalidQuery unless it is a whole number."""
+    tail = request.args.get('tail')
+    if tail is None:
+        return None
+    if not str(tail).isdigit():
+        raise InvalidQuery(f"tail must be a whole number, got {tail!r}")
+    return int(tail)
 
 class PlayService:
-    def __init__(self, fetch_func=None):
+    def __init__(self, fetch_func=None, explanation_store=None, fetch_mode=None, hedge_delay=None, team_catalog=None,
+                 season_stats=None, prefetch_explanations=True):
         self.fetch_json = fetch_func or fetch_json
+        # How the core and CDN play-by-play endpoints are tried (see common.fetch_first)
+        default_mode, default_delay = fetch_mode_for('plays')
+        self.fetch_mode = fetch_mode or default_mode
+        self.hedge_delay = default_delay if hedge_delay is None else hedge_delay
         # Initialize Groq client
         self.groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-        # Cache for AI explanations to avoid re-generating on refresh
-        self.ai_explanation_cache = {}
-
-    def _generate_ai_explanation(self, play_obj):
-        """Generate AI explanation for a play using Groq."""
-        # Extract play details
-        what = (
-            play_obj.get('text')
-            or play_obj.get('shortText')
-            or play_obj.get('alternativeText')
-            or play_obj.get('shortAlternativeText')
-            or 'Unknown play'
+        # Cache for AI explanations to avoid re-generating on refresh or restart
+        self.ai_explanation_cache = explanation_store or ExplanationStore(SQLiteBackend())
+        # Generates AI explanations in the background, deduped per play
+        self.explanation_pool = ExplanationPool(
+            lambda play: self._generate_ai_explanation(play), self.ai_explanation_cache,
+            generate_stream=lambda play: self._stream_ai_explanation(play),
         )
-        
-        start = play_obj.get('start', {})
-        down = start.get('down')
-        distance = start.get('distance')
-        yardline = start.get('yardLine')
-        quarter = play_obj.get('period', {}).get('number')
-        clock = play_obj.get('clock', {}).get('displayValue')
-        yards = play_obj.get('statYardage')
-        
+        # Shared TeamCatalog (see TeamService) for team names; None leaves names to the play data
+        self.team_catalog = team_catalog
+        # Template answers for routine plays so they never reach the LLM
+        self.rules = RuleExplainer()
+        # SeasonStore for league and team tendencies; None leaves them out
+        self.season_stats = season_stats
+        # Off for bulk ingest (see season_store), which should not spend Groq calls
+        self.prefetch_explanations = prefetch_explanations
+        # Plays in the same situation share one generic AI explanation (see play_signature)
+        self.explain_by_signature = EXPLAIN_BY_SIGNATURE
+        self.signature_stats = SignatureStats()
+        # Per-game play index shared by game_plays and explain_play
+        self.play_store = PlayStore(teams=team_catalog)
+
+    def _explanation_messages(self, play_obj) -> list:
+        """Chat messages asking Groq to explain a play, or every play sharing its signature."""
+        play = self._record(play_obj)
+
         # Build context for the LLM
-        context = f"Play description: {what}\n"
-        if down and distance:
-            context += f"Situation: {down} down and {distance} yards to go at the {yardline} yard line\n"
-        if quarter:
-            context += f"Quarter: {quarter}\n"
-        if clock:
-            context += f"Time remaining: {clock}\n"
-        if yards is not None:
-            context += f"Result: {yards} yards gained\n"
-        
+        sig = signature(play) if self.explain_by_signature else None
+        if sig is not None:
+            # shared by every play with this signature, so only the situation class is described
+            context = f"Situation: {describe(sig)}\n"
+            context += ("Write {team} wherever you name the team with the ball and {player} for the player who "
+                        "threw or ran with it, exactly like that with the braces. Do not mention exact yard lines or scores.\n")
+        else:
+            context = self._play_context(play)
+
         prompt = f"""You are explaining an NFL play to someone new to football. Keep it concise (2-3 sentences max).
 
 {context}
@@ -50,118 +97,228 @@ Explain:
 3. What the team was trying to accomplish
 
 Be conversational and educational. Avoid jargon unless you explain it. the "END GAME" play means the game is over, not that a play happened to end the game."""
+        return [
+            {
+                "role": "system",
+                "content": "You are a friendly NFL coach explaining plays to beginners. Be concise, clear, and educational."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    @staticmethod
+    def _play_context(play) -> str:
+        """Prompt context describing one specific play."""
+        # Extract play details
+        what = play.text or 'Unknown play'
+        down = play.down
+        distance = play.distance
+        yardline = play.yard_line
+        quarter = play.period
+        clock = play.clock
+        yards = play.yards
 
+        context = f"Play description: {what}\n"
+        if down and distance:
+            context += f"Situation: {down} down and {distance} yards to go at the {yardline} yard line\n"
+        if quarter:
+            context += f"Quarter: {quarter}\n"
+        if clock:
+            context += f"Time remaining: {clock}\n"
+        if yards is not None:
+            context += f"Result: {yards} yards gained\n"
+        return context
+
+    def _generate_ai_explanation(self, play_obj):
+        """Generate AI explanation for a play using Groq."""
+        self.rules.record_llm()
+        messages = self._explanation_messages(play_obj)
+        host = self.groq_client.base_url.host
+        upstream_stats.start(host)
+        started = time.perf_counter()
+        failed = True
         try:
             chat_completion = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a friendly NFL coach explaining plays to beginners. Be concise, clear, and educational."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
+                messages=messages,
+                model=EXPLAIN_MODEL,
                 temperature=0.7,
                 max_tokens=200,
             )
-            
+            failed = False
+            usage = chat_completion.usage
+            if usage is not None:
+                upstream_stats.usage(host, usage.prompt_tokens, usage.completion_tokens)
             return chat_completion.choices[0].message.content
         except Exception as e:
             print(f"Error generating AI explanation: {e}")
             return None
+        finally:
+            upstream_stats.finish(host, time.perf_counter() - started, failed)
+
+    def _stream_ai_explanation(self, play_obj):
+        """Yield the AI explanation for a play in chunks as Groq produces them.
+
+        Errors are raised to the caller, which decides what to do with the
+        text already sent.
+        """
+        self.rules.record_llm()
+        messages = self._explanation_messages(play_obj)
+        host = self.groq_client.base_url.host
+        upstream_stats.start(host)
+        started = time.perf_counter()
+        failed = True
+        try:
+            stream = self.groq_client.chat.completions.create(
+                messages=messages,
+                model=EXPLAIN_MODEL,
+                temperature=0.7,
+                max_tokens=200,
+                stream=True,
+            )
+            for chunk in stream:
+                # Groq reports token usage on the last chunk
+                usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+                if usage is not None:
+                    upstream_stats.usage(host, usage.prompt_tokens, usage.completion_tokens)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            failed = False
+        finally:
+            upstream_stats.finish(host, time.perf_counter() - started, failed)
+
+    def _record(self, play_obj) -> PlayRecord:
+        return play_obj if isinstance(play_obj, PlayRecord) else PlayRecord.from_espn(play_obj, self.team_catalog)
+
+    def explanation_key(self, play_obj, game_id=None) -> tuple:
+        """Key of a play's AI explanation in ai_explanation_cache.
+
+        ('*', signature, SIGNATURE_PROMPT_VERSION) for a play that shares its
+        explanation with its situation class, else (game_id, play_id, PROMPT_VERSION).
+        """
+        play = self._record(play_obj)
+        if game_id is None:
+            # core-API plays link back to their event: .../events/<game_id>/...
+            game_id = play.game_id or ''
+        sig = signature(play) if self.explain_by_signature else None
+        self.signature_stats.record((str(game_id), play.id), sig)
+        if sig is not None:
+            return ('*', sig, SIGNATURE_PROMPT_VERSION)
+        return (str(game_id), play.id or '', PROMPT_VERSION)
+
+    def _team_name(self, play):
+        # name resolved from the catalog at ingest; the catalog may have loaded since
+        team = play.team_name
+        if team is None and play.team_id is not None and self.team_catalog is not None:
+            team = (self.team_catalog.lookup(play.team_id) or {}).get('name')
+        return team
+
+    def explain_play_obj(self, play_obj, game_id=None, queue_ai=True):
+        """Explain a play given as a raw ESPN play dict or a PlayRecord.
+
+        With queue_ai=False a missing AI explanation is not queued and
+        ai_status is "streaming"; stream_explain_play generates it instead.
+        """
+        play = self._record(play_obj)
 
-    def explain_play_obj(self, play_obj):
         # 1. What happened
-        what = (
-            play_obj.get('text')
-            or play_obj.get('shortText')
-            or play_obj.get('alternativeText')
-            or play_obj.get('shortAlternativeText')
-            or ''
-        )
-        if play_obj.get('scoringType', {}).get('displayName'):
-            what += f" ({play_obj['scoringType']['displayName']})"
+        what = play.text
+        if play.scoring_type:
+            what += f" ({play.scoring_type})"
 
         # 2. Why the play happened
-        start = play_obj.get('start', {})
-        down = start.get('down')
-        distance = start.get('distance')
-        yardline = start.get('yardLine')
-        quarter = play_obj.get('period', {}).get('number')
-        clock = play_obj.get('clock', {}).get('displayValue')
-        # Team: try to extract just the numeric id
-        offense_team_ref = play_obj.get('team', {}).get('$ref', '')
-        offense_team_id = None
-        if offense_team_ref:
-            # Extract just the numeric id (e.g., .../teams/23?lang=... -> 23)
-            import re
-            match = re.search(r'/teams/(\d+)', offense_team_ref)
-            if match:
-                offense_team_id = match.group(1)
-        # Optionally, you could look up the team name from a cache or mapping
-
-        # Format down/distance for natural language
-        if down is not None and distance is not None:
-            down_str = {1: "1st", 2: "2nd", 3: "3rd"}.get(down, f"{down}th")
-            down_distance = f"{down_str} & {distance}"
-        else:
-            down_distance = "Unknown down & distance"
-
-        why = f"It was {down_distance} at the {yardline} yard line"
-        if quarter:
-            suffix = {1: "st", 2: "nd", 3: "rd"}.get(quarter, "th")
-            why += f", in the {quarter}{suffix} quarter"
-        if clock:
-            why += f" with {clock} left"
+        team = self._team_name(play)
+        why = situation(play, team)
 
         # 3. Numbers explained
         numbers = {}
-        if play_obj.get('statYardage') is not None:
-            numbers['yards'] = play_obj['statYardage']
+        if play.yards is not None:
+            numbers['yards'] = play.yards
         score = {}
-        if play_obj.get('homeScore') is not None:
-            score['home'] = play_obj.get('homeScore')
-        if play_obj.get('awayScore') is not None:
-            score['away'] = play_obj.get('awayScore')
-        if play_obj.get('scoreValue') is not None:
-            score['change'] = play_obj.get('scoreValue')
+        if play.home_score is not None:
+            score['home'] = play.home_score
+        if play.away_score is not None:
+            score['away'] = play.away_score
+        if play.score_value is not None:
+            score['change'] = play.score_value
         if score:
             numbers['score'] = score
+        tendency = None
+        if self.season_stats is not None:
+            tendency = self.season_stats.tendency(play.down, play.distance, play.yards_to_endzone, play.team_id)
+        if tendency:
+            numbers['tendency'] = tendency
+            why += f". League-wide, teams pass {round(tendency['pass_rate'] * 100)}% of the time on {tendency['situation']}"
+            if team and tendency.get('team'):
+                why += f"; the {team} pass {round(tendency['team']['pass_rate'] * 100)}%"
 
-        # 4. Generate AI explanation (cached)
-        play_id = str(play_obj.get('id', ''))
-        ai_explanation = None
-        
-        if play_id and play_id not in self.ai_explanation_cache:
-            ai_explanation = self._generate_ai_explanation(play_obj)
-            if ai_explanation:
-                self.ai_explanation_cache[play_id] = ai_explanation
-        elif play_id:
-            ai_explanation = self.ai_explanation_cache.get(play_id)
+        # 4. AI explanation: routine plays from templates, others from cache or generated in the background
+        ai_explanation = self.rules.explain(play, team)
+        ai_status = 'ready' if ai_explanation is not None else None
+        if play.id and ai_explanation is None:
+            key = self.explanation_key(play, game_id)
+            ai_explanation = self.ai_explanation_cache.get(key)
+            if ai_explanation is not None and key[0] == '*':
+                ai_explanation = personalize(ai_explanation, team, player_name(play))
+            if ai_explanation is None and not queue_ai:
+                ai_status = 'streaming'
+            elif ai_explanation is None:
+                self.explanation_pool.submit(key, play)
+                ai_status = self.explanation_pool.status(key)
+            else:
+                ai_status = 'ready'
 
         return {
             'what_happened': what,
             'why_the_play_happened': why,
             'ai_explanation': ai_explanation,
+            'ai_status': ai_status,
+            'possible_alternatives': alternatives(play),
             'numbers_explained': numbers,
         }
 
+    def _plays_url(self, game_id: str) -> str:
+        return f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/events/{game_id}/competitions/{game_id}/plays'
+
+    def _load_new_pages(self, game_id: str, game):
+        """Fetch core-API pages from the first one that may hold unseen plays."""
+        page = game.next_page
+        while True:
+            data = self.fetch_json(self._plays_url(game_id), params={'limit': INDEX_PAGE_SIZE, 'page': page})
+            items = data.get('items') or data.get('plays') or []
+            game.ingest(items)
+            if len(items) < INDEX_PAGE_SIZE:
+                break
+            # a full page will not change any more, so never download it again
+            page += 1
+            game.next_page = page
+            if page > (data.get('pageCount') or page):
+                break
+
+    def _prefetch_explanations(self, game_id: str, new_plays: list):
+        if not self.prefetch_explanations:
+            return
+        game = self.play_store.game(game_id)
+        for play in new_plays[-PREFETCH_RECENT:]:
+            record = game.records[str(play['id'])]
+            if self.rules.classify(record) is not None:
+                continue
+            self.explanation_pool.submit(self.explanation_key(record, game_id), record)
+
     def game_plays(self, game_id: str, request):
         """Return play-by-play list for a given game_id.
 
         Query params:
         - limit (int) number of plays to return
+        - compact=1 or fields=a,b,c to return normalized PlayRecord fields instead of raw ESPN plays
 
         Response (sample): {plays: [ {id, clock, down, description, teams, stats}, ... ]}
         """
         limit = int(request.args.get('limit', 300))
-        url = f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/events/{game_id}/competitions/{game_id}/plays'
-        params = {'limit': limit}
-        try:
-            data = self.fetch_json(url, params=params)
+
+        def core_plays():
+            data = self.fetch_json(self._plays_url(game_id), params={'limit': limit})
             plays = data.get('items') or data.get('plays') or data.get('entries') or data.get('play', [])
             # some endpoints return items, some return plays
             if isinstance(plays, dict):
@@ -170,17 +327,52 @@ Be conversational and educational. Avoid jargon unless you explain it. the "END
                         plays = plays[key]
                         break
             return plays
-        except Exception:
-            # fallback to cdn playbyplay endpoint as alternative
-            try:
-                url2 = 'https://cdn.espn.com/core/nfl/playbyplay'
-                params2 = {'xhr': 1, 'gameId': game_id}
-                data2 = self.fetch_json(url2, params=params2)
-                plays2 = data2.get('play', []) or data2.get('plays', [])
-                return plays2
-            except Exception as e:
-                print("Error fetching CDN play-by-play for game %s: %s", game_id, e)
-                raise
+
+        def cdn_plays():
+            # cdn playbyplay endpoint as alternative
+            data = self.fetch_json('https://cdn.espn.com/core/nfl/playbyplay', params={'xhr': 1, 'gameId': game_id})
+            plays = data.get('play', data.get('plays'))
+            # raise rather than return [], so a hedged fetch keeps waiting for core
+            if not isinstance(plays, list):
+                raise ValueError(f'no play list in CDN play-by-play for game {game_id}')
+            return plays
+
+        try:
+            plays = fetch_first([core_plays, cdn_plays], self.fetch_mode, self.hedge_delay)
+        except Exception as e:
+            print(f"Error fetching play-by-play for game {game_id}: {e}")
+            raise
+        game = self.play_store.game(game_id)
+        self._prefetch_explanations(game_id, game.ingest(plays))
+        fields = parse_fields(request)
+        return game.project(plays, fields) if fields else plays
+
+    def play_delta(self, game_id: str, request, refresh: bool = True):
+        """Return only the plays a client has not seen yet.
+
+        Query params:
+        - since (cursor) opaque cursor from a previous response
+        - tail (int) return just the last N plays instead
+        - compact / fields as for game_plays
+
+        Response (sample): {plays: [...], cursor, reset}
+
+        refresh=False answers from the play index without calling ESPN.
+        Raises InvalidQuery for a malformed tail.
+        """
+        tail = parse_tail(request)
+        if refresh:
+            self.game_plays(game_id, request)
+        game = self.play_store.game(game_id)
+        if tail is not None:
+            plays, cursor = game.tail(tail)
+            reset = True
+        else:
+            plays, cursor, reset = game.since(request.args.get('since'))
+        fields = parse_fields(request)
+        if fields:
+            plays = game.project(plays, fields)
+        return {'plays': plays, 'cursor': cursor, 'reset': reset}
 
     def explain_play(self, game_id: str, play_id: str):
         """Explain a single play for beginners.
@@ -188,24 +380,88 @@ Be conversational and educational. Avoid jargon unless you explain it. the "END
         Query params:
         - play_id
 
-        Response (sample): {play_id, explanation: {what_happened, why_the_play_happened, ai_explanation, numbers_explained}}
+        Response (sample): {play_id, explanation: {what_happened, why_the_play_happened, ai_explanation, ai_status, numbers_explained}}
+
+        ai_status is "pending" while the AI explanation is being generated; the
+        client should ask again shortly, or use stream_explain_play.
         """
-        try:
-            url = f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/events/{game_id}/competitions/{game_id}/plays'
-            data = self.fetch_json(url, params={'limit': 500})
-            items = data.get('items') or data.get('plays') or []
-            for p in items:
-                if str(p.get('id')) == str(play_id) or str(p.get('displayId')) == str(play_id):
-                    play_obj = p
-                    break
-        except Exception:
-            play_obj = None
-        
+        play_obj = self._find_play(game_id, play_id)
         if play_obj:
-            return self.explain_play_obj(play_obj)
-        return {
-            'what_happened': 'Play not found',
-            'why_the_play_happened': '',
-            'ai_explanation': None,
-            'numbers_explained': {}
-        }
\ No newline at end of file
+            return self.explain_play_obj(play_obj, game_id)
+        return dict(PLAY_NOT_FOUND)
+
+    def cached_plays(self, game_id: str, request):
+        """The /plays response from the play index alone, or None if the game has no plays indexed.
+
+        For requests shed under load: no upstream calls, so it may be behind ESPN.
+        """
+        game = self.play_store.get(game_id)
+        if game is None or not game.plays:
+            return None
+        if request.args.get('since') is not None or request.args.get('tail') is not None:
+            return self.play_delta(game_id, request, refresh=False)
+        with game.lock:
+            plays = list(game.plays)
+        fields = parse_fields(request)
+        return {'plays': game.project(plays, fields) if fields else plays}
+
+    def cached_explanation(self, game_id: str, play_id: str):
+        """explain_play from the play index and explanation cache alone, or None if the play is not indexed.
+
+        A missing AI explanation is reported as ai_status "deferred" rather than queued.
+        """
+        game = self.play_store.get(game_id)
+        play_obj = game.find_record(play_id) if game is not None else None
+        if play_obj is None:
+            return None
+        explanation = self.explain_play_obj(play_obj, game_id, queue_ai=False)
+        if explanation['ai_status'] == 'streaming':
+            explanation['ai_status'] = 'deferred'
+        return explanation
+
+    def stream_explain_play(self, game_id: str, play_id: str):
+        """Explain a play, yielding (event, data) pairs for server-sent events.
+
+        The structured explanation comes first as an "explanation" event, then
+        the AI text as "token" events while the model writes it, then a "done"
+        event with the full text and its ai_status. The finished text is cached
+        like any other AI explanation. If generation fails partway, "done" has
+        ai_status "unavailable" and discard_tokens true: the tokens sent so far
+        are an incomplete answer.
+        """
+        play_obj = self._find_play(game_id, play_id)
+        if not play_obj:
+            yield 'explanation', dict(PLAY_NOT_FOUND)
+            yield 'done', {'ai_explanation': None, 'ai_status': None}
+            return
+        explanation = self.explain_play_obj(play_obj, game_id, queue_ai=False)
+        yield 'explanation', explanation
+        if explanation['ai_status'] != 'streaming':
+            yield 'done', {'ai_explanation': explanation['ai_explanation'], 'ai_status': explanation['ai_status']}
+            return
+        key = self.explanation_key(play_obj, game_id)
+        chunks = self.explanation_pool.stream(key, play_obj)
+        if key[0] == '*':
+            chunks = personalize_stream(chunks, self._team_name(play_obj), player_name(play_obj))
+        text = []
+        try:
+            for chunk in chunks:
+                text.append(chunk)
+                yield 'token', {'text': chunk}
+        except GenerationInterrupted:
+            yield 'done', {'ai_explanation': None, 'ai_status': 'unavailable', 'discard_tokens': True}
+            return
+        text = ''.join(text) or None
+        yield 'done', {'ai_explanation': text, 'ai_status': 'ready' if text else 'unavailable'}
+
+    def _find_play(self, game_id: str, play_id: str):
+        game = self.play_store.game(game_id)
+        play_obj = game.find_record(play_id)
+        if play_obj is None and not game.final:
+            # only a live game can have plays we have not downloaded yet
+            try:
+                self._load_new_pages(game_id, game)
+                play_obj = game.find_record(play_id)
+            except Exception as e:
+                print(f"Error refreshing plays for game {game_id}: {e}")
+        return play_obj
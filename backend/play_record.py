@@ -0,0 +1,87 @@
+import re
+
+_TEAM_REF = re.compile(r'/teams/(\d+)')
+_EVENT_REF = re.compile(r'/events/(\d+)')
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PlayRecord:
+    """Normalized play built once from an ESPN play object at ingest.
+
+    Holds only the fields we explain or serve, with nested ESPN dicts and
+    $ref links already resolved, so per-request code never re-parses the raw
+    JSON. Works for both core-API and CDN play shapes.
+    """
+
+    __slots__ = (
+        'id', 'display_id', 'game_id', 'text', 'type_id', 'type_text',
+        'down', 'distance', 'yard_line', 'yards_to_endzone', 'period', 'clock',
+        'yards', 'home_score', 'away_score', 'score_value', 'scoring_type', 'team_id',
+        'team_name', 'team_abbr',
+    )
+    FIELDS = __slots__
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_espn(cls, play: dict, teams=None) -> 'PlayRecord':
+        """teams, if given, is a TeamCatalog used to fill in the team's name."""
+        start = play.get('start') or {}
+        play_type = play.get('type') or {}
+        team = play.get('team') or start.get('team') or {}
+        team_id = _int(team.get('id'))
+        if team_id is None and team.get('$ref'):
+            match = _TEAM_REF.search(team['$ref'])
+            team_id = int(match.group(1)) if match else None
+        event = _EVENT_REF.search(play.get('$ref', ''))
+        team_info = (teams.lookup(team_id) if teams is not None and team_id is not None else None) or {}
+        return cls(
+            id=str(play['id']) if play.get('id') is not None else None,
+            display_id=str(play['displayId']) if play.get('displayId') is not None else None,
+            game_id=event.group(1) if event else None,
+            text=(
+                play.get('text')
+                or play.get('shortText')
+                or play.get('alternativeText')
+                or play.get('shortAlternativeText')
+                or ''
+            ),
+            type_id=_int(play_type.get('id')),
+            type_text=play_type.get('text'),
+            down=start.get('down'),
+            distance=start.get('distance'),
+            yard_line=start.get('yardLine'),
+            yards_to_endzone=start.get('yardsToEndzone'),
+            period=(play.get('period') or {}).get('number'),
+            clock=(play.get('clock') or {}).get('displayValue'),
+            yards=play.get('statYardage'),
+            home_score=play.get('homeScore'),
+            away_score=play.get('awayScore'),
+            score_value=play.get('scoreValue'),
+            scoring_type=(play.get('scoringType') or {}).get('displayName'),
+            team_id=team_id,
+            team_name=team_info.get('name') or team.get('displayName'),
+            team_abbr=team_info.get('abbr') or team.get('abbreviation'),
+        )
+
+    def to_dict(self, fields=None) -> dict:
+        """Plain dict of the record, optionally limited to the given field names."""
+        return {name: getattr(self, name) for name in (fields or self.__slots__)}
+
+
+def parse_fields(request) -> tuple | None:
+    """Projection requested with ?fields=a,b or ?compact=1, or None for raw ESPN plays."""
+    fields = request.args.get('fields')
+    if fields:
+        return tuple(f for f in fields.split(',') if f in PlayRecord.FIELDS) or ('id',)
+    if request.args.get('compact') in ('1', 'true'):
+        return PlayRecord.FIELDS
+    return None
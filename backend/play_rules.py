@@ -0,0 +1,197 @@
+import re
+import threading
+
+# Routine play kinds, checked in order against ESPN's type text and then the play text
+PLAY_KINDS = [
+    ('end_game', re.compile(r'end of game|end game', re.I)),
+    ('end_half', re.compile(r'end of half|end half|halftime', re.I)),
+    ('end_period', re.compile(r'end period|end of (?:the )?(?:\d\w* )?quarter|end quarter|end of regulation', re.I)),
+    ('two_minute_warning', re.compile(r'two[- ]minute warning', re.I)),
+    ('timeout', re.compile(r'\btimeout\b', re.I)),
+    ('coin_toss', re.compile(r'coin toss', re.I)),
+    ('kneel', re.compile(r'\bkneels?\b|\bkneel down\b', re.I)),
+    ('spike', re.compile(r'\bspik(?:e|ed|es)\b', re.I)),
+    ('extra_point', re.compile(r'extra point', re.I)),
+    ('field_goal', re.compile(r'field goal', re.I)),
+    ('kickoff', re.compile(r'kickoff|\bkicks \d+ yards?\b', re.I)),
+    ('punt', re.compile(r'\bpunts?\b', re.I)),
+]
+# Unusual versions of routine plays; these still go to the LLM
+UNUSUAL = re.compile(
+    r'onside|blocked|fake|muff|fumble|penalty|intercept|touchdown|safety|lateral|reversed|challenge|no play|aborted',
+    re.I,
+)
+_MISSED = re.compile(r'no good|missed|wide (?:left|right)|hit the (?:left |right )?upright', re.I)
+_KICK_DISTANCE = re.compile(r'(\d+)[- ]yard field goal|field goal .*?(\d+) yards?', re.I)
+_TIMEOUT_TEAM = re.compile(r'timeout #?\d* (?:by|called by) ([A-Za-z .]+?)(?: at |\.|$)', re.I)
+# Distinct plays remembered for the answered counts before they start over
+RULE_TRACK_MAX = 100000
+
+
+def ordinal(n: int) -> str:
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+
+def down_and_distance(play):
+    """'3rd & 5', or None when the play has no down (kickoffs, extra points, ...)."""
+    if not play.down or play.distance is None:
+        return None
+    return f"{ordinal(play.down)} & {play.distance}"
+
+
+def situation(play, team=None) -> str:
+    """Down, distance, field position and clock in plain words."""
+    why = f"It was {down_and_distance(play) or 'Unknown down & distance'}"
+    if team:
+        why += f" for the {team}"
+    why += f" at the {play.yard_line} yard line"
+    if play.period:
+        why += f", in the {ordinal(play.period)} quarter"
+    if play.clock:
+        why += f" with {play.clock} left"
+    return why
+
+
+def alternatives(play) -> list:
+    """What else the offense could reasonably have done in this situation."""
+    if play.down == 4:
+        options = ['Punt to push the other team back', 'Go for it to keep the drive alive']
+        # a kick from the 35 is about a 52-yarder, near the edge of most kickers' range
+        if play.yards_to_endzone is not None and play.yards_to_endzone <= 35:
+            options.insert(0, 'Kick a field goal for 3 points')
+        return options
+    if play.down == 3 and play.distance is not None and play.distance >= 7:
+        return ['Throw past the first-down marker', 'Run a safe play and set up a punt or field goal']
+    if play.down in (1, 2):
+        return ['Run the ball', 'Throw a pass']
+    return []
+
+
+class RuleExplainer:
+    """Deterministic explanations for routine plays, used ahead of the LLM.
+
+    Kneel-downs, spikes, kicks, timeouts and period markers are explained
+    the same way every time, so they are answered from templates in
+    microseconds. Anything unusual or not matched returns None and is left
+    to the AI explanation. Plays answered per kind (each play once, however
+    often it is polled) and generations actually sent to the LLM (see
+    record_llm) are kept for coverage reporting.
+    """
+
+    def __init__(self, max_plays: int = RULE_TRACK_MAX):
+        self._lock = threading.Lock()
+        self.max_plays = max_plays
+        self._answered = set()
+        self.by_kind = {}
+        self.llm_calls = 0
+
+    def classify(self, play):
+        """The routine kind of a PlayRecord, or None if it needs the LLM."""
+        text = play.text or ''
+        if UNUSUAL.search(text) or UNUSUAL.search(play.type_text or ''):
+            return None
+        for source in (play.type_text or '', text):
+            for kind, pattern in PLAY_KINDS:
+                if pattern.search(source):
+                    return kind
+        if play.type_id == 79:
+            return 'end_game'
+        return None
+
+    def explain(self, play, team=None):
+        """Template explanation for a routine play, or None."""
+        kind = self.classify(play)
+        if kind is None:
+            return None
+        with self._lock:
+            if play.id is None or play.id not in self._answered:
+                if len(self._answered) >= self.max_plays:
+                    self._answered.clear()
+                if play.id is not None:
+                    self._answered.add(play.id)
+                self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+        return getattr(self, f'_{kind}')(play, team or 'The offense', play.text or '')
+
+    def record_llm(self):
+        """Count one generation sent to the LLM."""
+        with self._lock:
+            self.llm_calls += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            answered = sum(self.by_kind.values())
+            total = answered + self.llm_calls
+            return {
+                'answered': answered,
+                'sent_to_llm': self.llm_calls,
+                'coverage': round(answered / total, 3) if total else None,
+                'by_kind': dict(self.by_kind),
+            }
+
+    def _end_game(self, play, team, text):
+        if play.home_score is not None and play.away_score is not None:
+            return f"The game is over. The final score was {play.home_score} for the home team, {play.away_score} for the visitors."
+        return "The game is over; the clock ran out with no more plays to run."
+
+    def _end_half(self, play, team, text):
+        return ("The first half is over and the teams head to the locker room for halftime. "
+                "The team that did not receive the opening kickoff usually receives the second-half kickoff.")
+
+    def _end_period(self, play, team, text):
+        if play.period == 4:
+            if play.home_score is None or play.away_score is None:
+                return "Regulation time is over. If the score is tied the game goes to overtime; otherwise it is final."
+            if play.home_score == play.away_score:
+                return "Regulation time is over with the score tied, so the game goes to overtime."
+            return self._end_game(play, team, text)
+        return ("The quarter ended. The teams switch ends of the field, but the same team keeps the ball "
+                "with the same down and distance.")
+
+    def _two_minute_warning(self, play, team, text):
+        return ("The clock stopped automatically for the two-minute warning, a built-in break with two minutes "
+                "left in each half. Teams use it to plan their final drives.")
+
+    def _timeout(self, play, team, text):
+        match = _TIMEOUT_TEAM.search(text)
+        who = match.group(1).strip() if match else 'A team'
+        return (f"{who} called a timeout, which stops the clock. Each team gets three per half and uses them "
+                "to save time late in a half, avoid a penalty, or regroup before a big play.")
+
+    def _coin_toss(self, play, team, text):
+        return ("The coin toss decides who gets the ball first. The winner usually defers, "
+                "choosing to receive the kickoff to start the second half instead.")
+
+    def _kneel(self, play, team, text):
+        return (f"{team} took a knee right after the snap. It loses a yard or so but keeps the clock running "
+                "with no risk of a fumble, so teams do it when they are ahead and want to run out the clock.")
+
+    def _spike(self, play, team, text):
+        return (f"{team} spiked the ball into the ground to stop the clock. It uses up a down, "
+                "but saves the seconds it would take to line up and run a real play.")
+
+    def _extra_point(self, play, team, text):
+        if _MISSED.search(text):
+            return ("The extra point kick after the touchdown missed, so the team stays at 6 points for the "
+                    "touchdown instead of 7.")
+        return ("After a touchdown the scoring team kicked the extra point through the uprights for 1 more point, "
+                "making the touchdown worth 7.")
+
+    def _field_goal(self, play, team, text):
+        match = _KICK_DISTANCE.search(text)
+        distance = f"{match.group(1) or match.group(2)}-yard " if match else ''
+        if _MISSED.search(text):
+            return (f"{team} tried a {distance}field goal and missed, so no points. The other team takes over "
+                    "where the kick was attempted.")
+        return (f"{team} kicked a {distance}field goal through the uprights for 3 points. Teams kick when they "
+                "are close enough to score but stalled before reaching the end zone.")
+
+    def _kickoff(self, play, team, text):
+        return ("A kickoff starts each half and follows every score. The kicking team sends the ball deep and "
+                "the other team tries to return it; if it is downed in the end zone, it is a touchback and the "
+                "receiving team starts from a set yard line instead.")
+
+    def _punt(self, play, team, text):
+        situation_text = f"on {down_and_distance(play)}" if play.down else "on fourth down"
+        return (f"{team} punted {situation_text}. Rather than risk turning the ball over where they stood, "
+                "they kicked it away to push the other team farther from a score.")
@@ -0,0 +1,154 @@
+import bisect
+import os
+import re
+import threading
+from play_rules import ordinal
+
+# Share one AI explanation between plays with the same situation signature
+EXPLAIN_BY_SIGNATURE = os.environ.get('EXPLAIN_BY_SIGNATURE', '1') == '1'
+# Bump when the generic prompt changes so stored explanations are regenerated
+SIGNATURE_PROMPT_VERSION = 's1'
+# Distinct plays tracked for the dedupe ratio before the counts start over
+SIGNATURE_TRACK_MAX = 100000
+
+# Buckets shared with season_store; a value below the first edge is bucket 0
+DISTANCE_BUCKETS = ('1-3', '4-6', '7+')
+DISTANCE_EDGES = (4, 7)
+ZONES = ('red zone', "opponent's territory", 'own territory', 'deep in own territory')
+ZONE_EDGES = (21, 50, 80)
+YARDS_BUCKETS = ('a loss', 'no gain', '1-3 yards', '4-9 yards', '10-19 yards', '20+ yards')
+YARDS_EDGES = (0, 1, 4, 10, 20)
+
+# Play type from the play text, first match wins
+PLAY_TYPES = [
+    ('sack', re.compile(r'\bsacked\b', re.I)),
+    ('interception', re.compile(r'\bintercepted\b', re.I)),
+    ('incomplete pass', re.compile(r'\bpass incomplete\b|\bincomplete\b', re.I)),
+    ('scramble', re.compile(r'\bscrambles\b', re.I)),
+    ('pass', re.compile(r'\bpass\b', re.I)),
+    ('run', re.compile(r'up the middle|\b(?:left|right) (?:end|tackle|guard)\b|\brush', re.I)),
+]
+# Plays whose details matter too much to share an explanation
+_SPECIFIC = re.compile(r'fumble|penalty|lateral|reversed|challenge|no play|aborted|muff|blocked|fake|safety', re.I)
+_PLAYER = re.compile(r"\b[A-Z][a-z]?\.\s?[A-Z][A-Za-z'-]+")
+_PLACEHOLDER = re.compile(r'\{(team|player)\}')
+_SENTENCE_START = re.compile(r'(^|[.!?]\s+)([a-z])')
+
+
+def distance_bucket(distance: int) -> int:
+    return bisect.bisect_right(DISTANCE_EDGES, distance)
+
+
+def field_zone(yards_to_endzone: int) -> int:
+    return bisect.bisect_right(ZONE_EDGES, yards_to_endzone)
+
+
+def _time_bucket(period, clock) -> str:
+    if period is None:
+        return 'at an unknown time'
+    if period > 4:
+        return 'overtime'
+    minutes, _, seconds = (clock or '').partition(':')
+    try:
+        left = int(minutes) * 60 + int(seconds)
+    except ValueError:
+        left = None
+    late = period in (2, 4) and left is not None and left <= 120
+    return f"{'late in ' if late else ''}the {ordinal(period)} quarter"
+
+
+def signature(play):
+    """The situation a beginner would see in a PlayRecord, as a string, or None.
+
+    Plays with the same play type, down, distance bucket, field zone, time
+    bucket and yardage bucket share a signature and so an AI explanation.
+    None for plays without a down, with an unrecognized type, or with a
+    detail (fumble, penalty, ...) that needs its own explanation.
+    """
+    text = play.text or ''
+    if not play.down or not play.distance or play.yards_to_endzone is None or _SPECIFIC.search(text):
+        return None
+    kind = next((name for name, pattern in PLAY_TYPES if pattern.search(text)), None)
+    if kind is None:
+        return None
+    if 'touchdown' in text.lower():
+        kind += ' for a touchdown'
+    yards = YARDS_BUCKETS[bisect.bisect_right(YARDS_EDGES, play.yards)] if play.yards is not None else 'unknown yards'
+    return '|'.join((
+        kind, ordinal(play.down), DISTANCE_BUCKETS[distance_bucket(play.distance)],
+        ZONES[field_zone(play.yards_to_endzone)], _time_bucket(play.period, play.clock), yards,
+    ))
+
+
+def describe(sig: str) -> str:
+    """Plain-English situation for a signature, used as the LLM prompt context."""
+    kind, down, distance, zone, time, yards = sig.split('|')
+    return f"A {kind} on {down} & {distance} yards to go, in {zone}, {time}, for {yards}."
+
+
+def player_name(play):
+    """First player named in the play text (the passer or runner), e.g. "P.Mahomes"."""
+    match = _PLAYER.search(play.text or '')
+    return match.group(0) if match else None
+
+
+def personalize(text: str, team=None, player=None) -> str:
+    """Fill a shared explanation's {team} and {player} placeholders for one play."""
+    names = {'team': f'the {team}' if team else 'the offense', 'player': player or 'the ball carrier'}
+    text = _PLACEHOLDER.sub(lambda m: names[m.group(1)], text)
+    return _SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+
+
+def personalize_stream(chunks, team=None, player=None):
+    """personalize() for text arriving in chunks; a placeholder split across chunks is held back until complete."""
+    pending, tail = '', ''
+    for chunk in chunks:
+        pending += chunk
+        cut = pending.rfind('{')
+        if cut == -1 or '}' in pending[cut:]:
+            cut = len(pending)
+        if cut:
+            ready, pending = pending[:cut], pending[cut:]
+            # the end of the previous piece decides whether this one starts a sentence
+            yield personalize(tail + ready, team, player)[len(tail):]
+            tail = ready[-2:]
+    if pending:
+        yield personalize(tail + pending, team, player)[len(tail):]
+
+
+class SignatureStats:
+    """How many distinct plays map to how many distinct signatures.
+
+    dedupe_ratio is the share of plays whose explanation was shared with an
+    earlier play, the LLM calls saved relative to one call per play.
+    """
+
+    def __init__(self, max_plays: int = SIGNATURE_TRACK_MAX):
+        self.max_plays = max_plays
+        self._plays = set()
+        self._signatures = set()
+        self._signed = 0
+        self._lock = threading.Lock()
+
+    def record(self, play_key, sig):
+        with self._lock:
+            if play_key in self._plays:
+                return
+            if len(self._plays) >= self.max_plays:
+                self._plays.clear()
+                self._signatures.clear()
+                self._signed = 0
+            self._plays.add(play_key)
+            if sig is not None:
+                self._signed += 1
+                self._signatures.add(sig)
+
+    def stats(self) -> dict:
+        with self._lock:
+            plays, signed, signatures = len(self._plays), self._signed, len(self._signatures)
+        return {
+            'plays': plays,
+            'signed_plays': signed,
+            'signatures': signatures,
+            'dedupe_ratio': round(1 - signatures / signed, 3) if signed else None,
+        }
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from play_record import PlayRecord
+
+# Recent plays whose edits a cursor can pick out individually; older edits reset the client
+CURSOR_WINDOW = 10
+# Hex characters of each recent play's hash kept in a cursor
+_WINDOW_HEX = 6
+
+
+def is_end_of_game(play: dict) -> bool:
+    """True if the play is ESPN's "End of Game" marker."""
+    play_type = play.get('type') or {}
+    if str(play_type.get('id')) == '79' or play_type.get('text') == 'End of Game':
+        return True
+    return 'END GAME' in (play.get('text') or '')
+
+
+class GamePlays:
+    """All plays seen so far for one game, indexed by id and displayId.
+
+    Clients ask for just the plays that changed since their last cursor.
+    A cursor is "<count>.<digest>.<window>": how many plays the client has,
+    a digest of all but the last CURSOR_WINDOW of them, and a short hash of
+    each of those last ones. Both are computed from the plays alone, so any
+    worker or replica that has the same plays accepts the same cursor. Edits
+    to a recent play are sent individually; an edit further back, or a
+    cursor from plays this index does not have, resets the client.
+    """
+
+    def __init__(self, teams=None):
+        # TeamCatalog used to put team names on PlayRecords
+        self.teams = teams
+        self.plays = []
+        self.by_id = {}
+        self.by_display_id = {}
+        # normalized PlayRecord per play id, rebuilt only when a play changes
+        self.records = {}
+        self._positions = {}
+        # content hash per play, and digests of every prefix of the play list (_prefix[i] covers plays[:i])
+        self._hashes = []
+        self._prefix = [b'']
+        # next core-API page that may contain plays we have not seen yet
+        self.next_page = 1
+        self.final = False
+        self.lock = threading.Lock()
+
+    def ingest(self, plays: list) -> list:
+        """Add or update plays in game order and return the ones not seen before."""
+        new = []
+        with self.lock:
+            changed_from = len(self.plays)
+            for play in plays:
+                if not isinstance(play, dict) or play.get('id') is None:
+                    continue
+                play_id = str(play['id'])
+                position = self._positions.get(play_id)
+                if position is not None:
+                    old = self.plays[position]
+                    if old is play or old == play:
+                        continue
+                    self.plays[position] = play
+                    self._hashes[position] = _play_hash(play)
+                    changed_from = min(changed_from, position)
+                else:
+                    self._positions[play_id] = len(self.plays)
+                    self.plays.append(play)
+                    self._hashes.append(_play_hash(play))
+                    new.append(play)
+                self.by_id[play_id] = play
+                self.records[play_id] = PlayRecord.from_espn(play, self.teams)
+                if play.get('displayId') is not None:
+                    self.by_display_id[str(play['displayId'])] = play
+                if is_end_of_game(play):
+                    self.final = True
+            del self._prefix[changed_from + 1:]
+            for digest in self._hashes[changed_from:]:
+                self._prefix.append(hashlib.blake2b(self._prefix[-1] + digest, digest_size=8).digest())
+        return new
+
+    def since(self, cursor: str | None):
+        """Return (plays, next_cursor, reset) for plays new or changed after cursor.
+
+        An unknown or missing cursor resets the client to the full play list.
+        """
+        count, digest, window = _parse_cursor(cursor)
+        with self.lock:
+            if count is not None and count > len(self.plays):
+                # a cursor from an index that is ahead of this one: nothing newer here yet
+                return [], cursor, False
+            start = count - len(window) if count is not None else 0
+            if count is None or self._prefix[start].hex() != digest:
+                return list(self.plays), self._cursor(), True
+            changed = [
+                self.plays[start + i] for i, seen in enumerate(window)
+                if self._hashes[start + i].hex()[:_WINDOW_HEX] != seen
+            ]
+            return changed + self.plays[count:], self._cursor(), False
+
+    def tail(self, n: int):
+        """Return (plays, next_cursor) for the last n plays in game order."""
+        with self.lock:
+            return (self.plays[-n:] if n > 0 else []), self._cursor()
+
+    def _cursor(self) -> str:
+        start = max(0, len(self.plays) - CURSOR_WINDOW)
+        window = ''.join(h.hex()[:_WINDOW_HEX] for h in self._hashes[start:])
+        return f'{len(self.plays)}.{self._prefix[start].hex()}.{window}'
+
+    def find(self, play_id):
+        """Look up a play by its id or displayId."""
+        play_id = str(play_id)
+        return self.by_id.get(play_id) or self.by_display_id.get(play_id)
+
+    def find_record(self, play_id):
+        """Look up a play's PlayRecord by its id or displayId."""
+        play = self.find(play_id)
+        return self.records.get(str(play['id'])) if play is not None else None
+
+    def project(self, plays: list, fields: tuple) -> list:
+        """Compact dicts of the given fields for plays that are in this game."""
+        records = (self.records.get(str(p.get('id'))) for p in plays if isinstance(p, dict))
+        return [r.to_dict(fields) for r in records if r is not None]
+
+
+def _play_hash(play: dict) -> bytes:
+    return hashlib.blake2b(json.dumps(play, sort_keys=True, separators=(',', ':'), default=str).encode(), digest_size=8).digest()
+
+
+def _parse_cursor(cursor):
+    """(count, digest hex, [recent play hashes]) from a cursor, or (None, None, None) if it is malformed."""
+    parts = (cursor or '').split('.')
+    if len(parts) != 3 or not parts[0].isdigit():
+        return None, None, None
+    count, digest, window = int(parts[0]), parts[1], parts[2]
+    if len(window) != _WINDOW_HEX * min(count, CURSOR_WINDOW):
+        return None, None, None
+    return count, digest, [window[i:i + _WINDOW_HEX] for i in range(0, len(window), _WINDOW_HEX)]
+
+
+class PlayStore:
+    """In-memory per-game play index shared by the play endpoints.
+
+    Games are kept LRU so a full season of traffic does not grow memory
+    without bound.
+    """
+
+    def __init__(self, max_games: int = 64, teams=None):
+        self.max_games = max_games
+        self.teams = teams
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, game_id: str):
+        """The index for game_id if it has one, without creating it."""
+        with self._lock:
+            return self._games.get(str(game_id))
+
+    def game(self, game_id: str) -> GamePlays:
+        """Return the index for game_id, creating an empty one if needed."""
+        game_id = str(game_id)
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None:
+                game = self._games[game_id] = GamePlays(self.teams)
+                while len(self._games) > self.max_games:
+                    self._games.popitem(last=False)
+            else:
+                self._games.move_to_end(game_id)
+            return game
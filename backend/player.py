@@ -1,8 +1,44 @@
-from common import fetch_json
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from cache import TTLCache
+from common import fetch_json, fetch_first, fetch_mode_for
+
+# Trimmed profiles for bulk lookups: how long to keep them, how many, and how many to fetch at once
+PLAYER_PROFILE_TTL = float(os.environ.get('PLAYER_PROFILE_TTL', 6 * 3600))
+PLAYER_PROFILE_ENTRIES = int(os.environ.get('PLAYER_PROFILE_ENTRIES', 5000))
+PLAYER_FETCH_CONCURRENCY = int(os.environ.get('PLAYER_FETCH_CONCURRENCY', 8))
+MAX_BULK_PLAYERS = 100
+
+
+def trim_profile(data: dict) -> dict:
+    """The fields we serve for a player, from any of the ESPN athlete payloads."""
+    athlete = data.get('athlete') or data
+    team = athlete.get('team') or {}
+    return {
+        'id': str(athlete['id']) if athlete.get('id') is not None else None,
+        'name': athlete.get('displayName') or athlete.get('fullName'),
+        'position': (athlete.get('position') or {}).get('abbreviation'),
+        'jersey': athlete.get('jersey'),
+        'team': {'id': team.get('id'), 'name': team.get('displayName'), 'abbr': team.get('abbreviation')} if team.get('id') else None,
+        'headshot': (athlete.get('headshot') or {}).get('href'),
+        'age': athlete.get('age'),
+        'height': athlete.get('displayHeight'),
+        'weight': athlete.get('displayWeight'),
+        'status': (athlete.get('status') or {}).get('name'),
+    }
+
 
 class PlayerService:
-    def __init__(self, fetch_func=None):
+    def __init__(self, fetch_func=None, fetch_mode=None, hedge_delay=None, profile_cache=None):
         self.fetch_json = fetch_func or fetch_json
+        # How the alternative athlete endpoints are tried (see common.fetch_first)
+        default_mode, default_delay = fetch_mode_for('player')
+        self.fetch_mode = fetch_mode or default_mode
+        self.hedge_delay = default_delay if hedge_delay is None else hedge_delay
+        # Trimmed profiles for get_players, and a capped pool for fetching the misses
+        self.profiles = profile_cache or TTLCache(max_entries=PLAYER_PROFILE_ENTRIES)
+        self._executor = ThreadPoolExecutor(max_workers=PLAYER_FETCH_CONCURRENCY, thread_name_prefix='players')
 
     def get_player(self, player_id: str):
         """Return player metadata and sample stats.
@@ -15,13 +51,50 @@ class PlayerService:
             f'https://site.web.api.espn.com/apis/common/v3/sports/football/nfl/athletes/{player_id}',
             f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/athletes/{player_id}',
         ]
-        last_err = None
-        for url in urls:
+        try:
+            return fetch_first([lambda url=url: self.fetch_json(url) for url in urls], self.fetch_mode, self.hedge_delay)
+        except Exception as e:
+            print(f'Failed to fetch player {player_id}: {e}')
+            raise Exception(f'Failed to fetch player {player_id}') from e
+
+    def get_profile(self, player_id: str) -> dict:
+        """Trimmed profile for one player, from cache when possible."""
+        def load():
+            # the overview endpoint has stats but no bio, so skip it here
+            urls = [
+                f'https://site.web.api.espn.com/apis/common/v3/sports/football/nfl/athletes/{player_id}',
+                f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/athletes/{player_id}',
+            ]
+            data = fetch_first([lambda url=url: self.fetch_json(url) for url in urls], self.fetch_mode, self.hedge_delay)
+            profile = trim_profile(data or {})
+            # an empty or error payload is not kept for the full TTL
+            if profile['id'] is None or profile['name'] is None:
+                raise LookupError(f'No profile for player {player_id}')
+            return profile, 1
+
+        return self.profiles.get_or_load(str(player_id), PLAYER_PROFILE_TTL, load)
+
+    def get_players(self, player_ids: list) -> dict:
+        """Trimmed profiles for several players in one call.
+
+        Cached profiles are returned directly; misses are fetched concurrently,
+        at most PLAYER_FETCH_CONCURRENCY at a time across all requests.
+
+        Response (sample): {players: [{id, name, position, jersey, team, headshot, ...}, ...], missing: [ids]}
+        """
+        ids = list(dict.fromkeys(str(i) for i in player_ids))
+        # misses are counted when get_profile loads them
+        found = {i: self.profiles.get(i, count_miss=False) for i in ids}
+        # copy the request context so stale upstream responses are still reported
+        futures = {
+            i: self._executor.submit(contextvars.copy_context().run, self.get_profile, i)
+            for i, profile in found.items() if profile is None
+        }
+        missing = []
+        for player_id, future in futures.items():
             try:
-                data = self.fetch_json(url)
-                return data
+                found[player_id] = future.result()
             except Exception as e:
-                last_err = e
-                continue
-        print('Failed to fetch player %s: %s', player_id, last_err)
-        raise Exception(f'Failed to fetch player {player_id}')
\ No newline at end of file
+                print(f'Failed to fetch player {player_id}: {e}')
+                missing.append(player_id)
+        return {'players': [found[i] for i in ids if found[i] is not None], 'missing': missing}
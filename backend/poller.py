@@ -0,0 +1,164 @@
+import os
+import queue
+import threading
+from serialization import dumps
+
+LIVE_STATUSES = {'STATUS_IN_PROGRESS', 'STATUS_HALFTIME', 'STATUS_END_PERIOD'}
+FINAL_STATUS = 'STATUS_FINAL'
+
+# Seconds between polls while any game is live, and while none are
+POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', 15))
+IDLE_POLL_INTERVAL = float(os.environ.get('IDLE_POLL_INTERVAL', 120))
+# Plays sent to subscribers when a game's log is (re)started
+RESET_TAIL = 5
+
+
+class _Request:
+    """Minimal stand-in for a Flask request when calling services directly."""
+
+    def __init__(self, **args):
+        self.args = args
+
+
+def format_sse(event: str, data) -> str:
+    return f'event: {event}\ndata: {dumps(data).decode()}\n\n'
+
+
+class Broker:
+    """Fans events for a game out to every subscribed stream.
+
+    Each subscriber gets a bounded queue. A subscriber that falls behind has
+    its queue replaced with a single "resync" event so it can refetch state
+    instead of blocking the poller.
+    """
+
+    def __init__(self, max_queue: int = 50):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id: str) -> queue.Queue:
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(str(game_id), set()).add(q)
+        return q
+
+    def unsubscribe(self, game_id: str, q: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(str(game_id), set())
+            subscribers.discard(q)
+            if not subscribers:
+                self._subscribers.pop(str(game_id), None)
+
+    def has_subscribers(self) -> bool:
+        with self._lock:
+            return bool(self._subscribers)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, game_id: str, event: str, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(game_id), ()))
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(('resync', {}))
+
+
+class LiveGamePoller:
+    """Polls the scoreboard and live games once per interval for all viewers.
+
+    Upstream traffic scales with the number of live games rather than the
+    number of open tabs. Pre-game games are skipped, final games get one last
+    poll, and the whole loop drops to IDLE_POLL_INTERVAL while nothing is
+    live or nobody is subscribed.
+    """
+
+    def __init__(self, game_service, play_service, broker=None, interval=POLL_INTERVAL, idle_interval=IDLE_POLL_INTERVAL):
+        self.game_service = game_service
+        self.play_service = play_service
+        self.broker = broker or Broker()
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self.statuses = {}
+        self.headers = {}
+        self.cursors = {}
+        self._thread = None
+        self._idle = True
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the background thread, or wake it early if it is idling."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                if self._idle:
+                    self._wake.set()
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-game-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            live = False
+            if self.broker.has_subscribers():
+                try:
+                    live = self.poll_once()
+                except Exception as e:
+                    print(f"Error polling live games: {e}")
+            self._idle = not live
+            self._wake.wait(self.interval if live else self.idle_interval)
+            self._wake.clear()
+
+    def poll_once(self) -> bool:
+        """Poll every game that needs it and publish changes. Returns True if any game is live."""
+        any_live = False
+        for game in self.game_service.list_games(_Request()):
+            game_id = game.get('id')
+            status = game.get('status')
+            previous = self.statuses.get(game_id)
+            self.statuses[game_id] = status
+            if status in LIVE_STATUSES:
+                any_live = True
+            elif not (status == FINAL_STATUS and previous in LIVE_STATUSES):
+                continue
+            try:
+                self._poll_game(game_id)
+            except Exception as e:
+                print(f"Error polling game {game_id}: {e}")
+        return any_live
+
+    def _poll_game(self, game_id: str):
+        game = self.game_service.get_game(game_id)
+        header = (game.get('gamepackageJSON') or {}).get('header')
+        if header and header != self.headers.get(game_id):
+            self.headers[game_id] = header
+            self.broker.publish(game_id, 'game', {'header': header})
+
+        delta = self.play_service.play_delta(game_id, _Request(since=self.cursors.get(game_id)))
+        self.cursors[game_id] = delta['cursor']
+        if delta['reset']:
+            delta['plays'] = delta['plays'][-RESET_TAIL:]
+        if delta['plays']:
+            self.broker.publish(game_id, 'plays', delta)
+
+    def snapshot(self, game_id: str, tail: int = RESET_TAIL) -> list:
+        """Events that bring a new subscriber up to date before live updates."""
+        events = []
+        if game_id in self.headers:
+            events.append(('game', {'header': self.headers[game_id]}))
+        plays, cursor = self.play_service.play_store.game(game_id).tail(tail)
+        if plays:
+            events.append(('plays', {'plays': plays, 'cursor': cursor, 'reset': True}))
+        return events
@@ -0,0 +1,223 @@
+import datetime
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from serialization import dumps
+
+try:
+    from zoneinfo import ZoneInfo
+    EASTERN = ZoneInfo('America/New_York')
+except Exception:
+    EASTERN = datetime.timezone(datetime.timedelta(hours=-5))
+
+# Seconds between background refreshes of a snapshot with live games, and of one without
+SNAPSHOT_LIVE_REFRESH = float(os.environ.get('SNAPSHOT_LIVE_REFRESH', 15))
+SNAPSHOT_IDLE_REFRESH = float(os.environ.get('SNAPSHOT_IDLE_REFRESH', 3600))
+# A scheduled game counts as live from this many seconds before kickoff
+SNAPSHOT_PREGAME_WINDOW = float(os.environ.get('SNAPSHOT_PREGAME_WINDOW', 1800))
+# Snapshots not read for this many seconds stop being refreshed and are dropped
+SNAPSHOT_UNREAD_TTL = float(os.environ.get('SNAPSHOT_UNREAD_TTL', 1800))
+# Statuses of games that will not change again
+DONE_STATUSES = ('STATUS_FINAL', 'STATUS_POSTPONED', 'STATUS_CANCELED', 'STATUS_FORFEIT')
+MAX_RANGE_DAYS = 31
+CURRENT = 'current'
+
+
+class InvalidDate(ValueError):
+    """A date or date range in a request could not be used."""
+
+
+def parse_day(value: str) -> datetime.date:
+    """Parse YYYY-MM-DD or YYYYMMDD."""
+    try:
+        return datetime.datetime.strptime(value.replace('-', ''), '%Y%m%d').date()
+    except ValueError as e:
+        raise InvalidDate(f"invalid date {value!r}, expected YYYY-MM-DD") from e
+
+
+def day_key(day: datetime.date) -> str:
+    return day.strftime('%Y%m%d')
+
+
+def game_start(game: dict):
+    """Kickoff time of a game as an aware datetime, or None."""
+    try:
+        return datetime.datetime.fromisoformat(game['start_time'].replace('Z', '+00:00'))
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return None
+
+
+def game_day(game: dict):
+    """Scoreboard day of a game: ESPN groups games by US Eastern date, not UTC."""
+    start = game_start(game)
+    return day_key(start.astimezone(EASTERN).date()) if start is not None else None
+
+
+def refresh_interval(games: list) -> float:
+    """Seconds between refreshes of a snapshot of games.
+
+    The live interval while a game is in progress or about to kick off;
+    otherwise the idle interval, cut short so the refresh lands when the
+    next scheduled game's pregame window opens.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    interval = SNAPSHOT_IDLE_REFRESH
+    for game in games:
+        status = game.get('status')
+        if status in DONE_STATUSES:
+            continue
+        if status != 'STATUS_SCHEDULED':
+            return SNAPSHOT_LIVE_REFRESH
+        start = game_start(game)
+        if start is not None:
+            until_window = (start - now).total_seconds() - SNAPSHOT_PREGAME_WINDOW
+            interval = min(interval, max(SNAPSHOT_LIVE_REFRESH, until_window))
+    return interval
+
+
+class Snapshot:
+    """A scoreboard's games plus their pre-encoded JSON.
+
+    A game's "live" entry (score, situation, last play) is taken out of the
+    summary and only served by live_body.
+    """
+
+    __slots__ = ('games', 'live', 'fragment', 'body', 'fetched_at', 'refresh_every', '_live_body')
+
+    def __init__(self, games: list):
+        self.live = {str(g.get('id')): g.pop('live') for g in games if 'live' in g}
+        self.games = games
+        # comma-joined game objects, so ranges can be served by concatenation
+        self.fragment = b','.join(dumps(g) for g in games)
+        self.body = b'{"games":[' + self.fragment + b']}'
+        self.fetched_at = time.monotonic()
+        self.refresh_every = refresh_interval(games)
+        self._live_body = None
+
+    def live_body(self) -> tuple:
+        """(body, etag) of every game merged with its live state, encoded on first use."""
+        if self._live_body is None:
+            body = dumps({'games': [dict(g, **self.live.get(str(g.get('id')), {})) for g in self.games]})
+            self._live_body = (body, hashlib.sha1(body).hexdigest())
+        return self._live_body
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class ScoreboardStore:
+    """Ready-to-serve scoreboard snapshots keyed by day ('YYYYMMDD') or CURRENT.
+
+    A background thread re-materializes snapshots as they come due, so a
+    request is normally a dict lookup plus writing the stored bytes. A
+    request only fetches when its snapshot is missing or the refresher has
+    fallen more than one interval behind.
+
+    Only reads count as use: snapshots are kept in least recently read
+    order, and ones nobody has read for unread_ttl seconds are dropped
+    instead of refreshed.
+    """
+
+    def __init__(self, fetch_games, max_snapshots: int = 128, unread_ttl: float = SNAPSHOT_UNREAD_TTL):
+        # fetch_games(dates) -> flattened games; dates is None, 'YYYYMMDD' or 'YYYYMMDD-YYYYMMDD'
+        self.fetch_games = fetch_games
+        self.max_snapshots = max_snapshots
+        self.unread_ttl = unread_ttl
+        self._snapshots = OrderedDict()
+        self._read_at = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, key: str) -> Snapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            self._touch(key)
+        if snapshot is None or snapshot.age() > 2 * snapshot.refresh_every:
+            snapshot = self.refresh(key)
+        return snapshot
+
+    def find_game(self, game_id: str):
+        """A game from any stored snapshot, newest first, without fetching."""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        for snapshot in reversed(snapshots):
+            for game in snapshot.games:
+                if str(game.get('id')) == str(game_id):
+                    return game
+        return None
+
+    def refresh(self, key: str) -> Snapshot:
+        snapshot = Snapshot(self.fetch_games(None if key == CURRENT else key))
+        self._put(key, snapshot)
+        return snapshot
+
+    def range_body(self, start: datetime.date, end: datetime.date) -> bytes:
+        """JSON body with every game from start to end inclusive."""
+        days = (end - start).days + 1
+        if days < 1 or days > MAX_RANGE_DAYS:
+            raise InvalidDate(f"date range must cover 1-{MAX_RANGE_DAYS} days")
+        keys = [day_key(start + datetime.timedelta(days=i)) for i in range(days)]
+        with self._lock:
+            found = {k: self._snapshots.get(k) for k in keys}
+            for k in keys:
+                self._touch(k)
+        missing = [k for k, s in found.items() if s is None or s.age() > 2 * s.refresh_every]
+        if missing:
+            # one upstream call for the whole gap instead of one per day
+            by_day = {k: [] for k in missing}
+            for game in self.fetch_games(f'{missing[0]}-{missing[-1]}' if len(missing) > 1 else missing[0]):
+                day = game_day(game)
+                if day in by_day:
+                    by_day[day].append(game)
+            for k, games in by_day.items():
+                found[k] = Snapshot(games)
+                self._put(k, found[k])
+        return b'{"games":[' + b','.join(found[k].fragment for k in keys if found[k].fragment) + b']}'
+
+    def start(self, interval: float = 5):
+        """Start the background refresher if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='scoreboard-refresher', daemon=True)
+            self._thread.start()
+
+    def drop_unread(self) -> list:
+        """Forget snapshots nobody has read for unread_ttl seconds; returns their keys."""
+        cutoff = time.monotonic() - self.unread_ttl
+        with self._lock:
+            unread = [k for k in self._snapshots if self._read_at.get(k, 0) < cutoff]
+            for k in unread:
+                del self._snapshots[k]
+                self._read_at.pop(k, None)
+        return unread
+
+    def _run(self, interval):
+        while True:
+            self.drop_unread()
+            with self._lock:
+                due = [k for k, s in self._snapshots.items() if s.age() >= s.refresh_every]
+            for key in due:
+                try:
+                    self.refresh(key)
+                except Exception as e:
+                    print(f"Error refreshing scoreboard {key}: {e}")
+            time.sleep(interval)
+
+    def _put(self, key, snapshot):
+        # replacing a snapshot keeps its place: a background refresh is not a read
+        with self._lock:
+            if key not in self._snapshots:
+                self._read_at[key] = time.monotonic()
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._read_at.pop(evicted, None)
+
+    def _touch(self, key):
+        """Record a read of key; call with the lock held."""
+        if key in self._snapshots:
+            self._read_at[key] = time.monotonic()
+            self._snapshots.move_to_end(key)
@@ -0,0 +1,245 @@
+"""Season play-by-play stored as memory-mapped NumPy columns, for league and team tendencies.
+
+Build a season once, offline, through the same PlayService.game_plays path the API uses:
+
+    python season_store.py build 2024 season_data --workers 8
+    python season_store.py query season_data --by down,dist_bucket --where call=pass
+
+The server opens SEASON_STORE_PATH at startup when it exists.
+"""
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from play_rules import ordinal
+from play_signature import DISTANCE_BUCKETS, DISTANCE_EDGES, ZONE_EDGES, ZONES, distance_bucket, field_zone
+
+SEASON_STORE_PATH = os.environ.get('SEASON_STORE_PATH', 'season_data')
+SCOREBOARD_URL = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
+# Fewest plays in a situation before its tendency is worth quoting
+MIN_SAMPLE = 20
+
+# Play call codes; DISTANCE_BUCKETS and ZONES (see play_signature) label the other bucket columns
+CALLS = ('pass', 'run', 'punt', 'field_goal', 'other')
+_CALL_PATTERNS = [
+    ('pass', re.compile(r'pass|sack|interception', re.I)),
+    ('run', re.compile(r'rush|run', re.I)),
+    ('punt', re.compile(r'punt', re.I)),
+    ('field_goal', re.compile(r'field goal', re.I)),
+]
+
+# Column name -> dtype; -1 marks a missing value
+COLUMNS = {
+    'game_id': np.int64,
+    'team_id': np.int16,
+    'down': np.int8,
+    'distance': np.int16,
+    'yards_to_endzone': np.int16,
+    'period': np.int8,
+    'yards': np.int16,
+    'call': np.int8,
+    'dist_bucket': np.int8,
+    'zone': np.int8,
+}
+
+
+def play_call(type_text) -> int:
+    """CALLS code for an ESPN play type such as "Pass Reception" or "Rush"."""
+    for code, (_, pattern) in enumerate(_CALL_PATTERNS):
+        if type_text and pattern.search(type_text):
+            return code
+    return CALLS.index('other')
+
+
+def to_columns(plays: list) -> dict:
+    """Columns for normalized play dicts (PlayRecord.to_dict), bucket columns included."""
+    def column(name):
+        return np.array([-1 if p.get(name) is None else p[name] for p in plays], dtype=COLUMNS[name])
+
+    columns = {name: column(name) for name in ('game_id', 'team_id', 'down', 'distance', 'yards_to_endzone', 'period', 'yards')}
+    columns['call'] = np.array([play_call(p.get('type_text')) for p in plays], dtype=np.int8)
+    columns['dist_bucket'] = np.where(columns['distance'] > 0, np.digitize(columns['distance'], DISTANCE_EDGES), -1).astype(np.int8)
+    columns['zone'] = np.where(columns['yards_to_endzone'] >= 0, np.digitize(columns['yards_to_endzone'], ZONE_EDGES), -1).astype(np.int8)
+    return columns
+
+
+class SeasonStore:
+    """A season's plays as one array per column, memory-mapped from disk.
+
+    Every column has one entry per play, so a query is a boolean mask and a
+    np.unique or np.bincount over whole columns. Pass/run counts for every
+    (team, down, distance bucket, field zone) are computed once on open,
+    which makes tendency() a handful of array lookups.
+    """
+
+    def __init__(self, columns: dict, meta: dict | None = None):
+        self.columns = columns
+        self.meta = meta or {}
+        self.plays = len(columns['down'])
+        self.team_ids, team_index = np.unique(columns['team_id'], return_inverse=True)
+        # counts[team + 1, down, dist_bucket, zone, call]; team slot 0 is the whole league
+        shape = (len(self.team_ids) + 1, 5, len(DISTANCE_BUCKETS), len(ZONES), len(CALLS))
+        down, bucket, zone, call = (columns[c] for c in ('down', 'dist_bucket', 'zone', 'call'))
+        valid = (down >= 1) & (down <= 4) & (bucket >= 0) & (zone >= 0)
+        index = np.ravel_multi_index((team_index[valid] + 1, down[valid], bucket[valid], zone[valid], call[valid]), shape)
+        counts = np.bincount(index, minlength=int(np.prod(shape))).reshape(shape)
+        counts[0] = counts[1:].sum(axis=0)
+        self.counts = counts
+
+    @classmethod
+    def open(cls, path: str) -> 'SeasonStore':
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+        return cls(columns, meta)
+
+    @classmethod
+    def build(cls, plays: list, meta: dict | None = None) -> 'SeasonStore':
+        return cls(to_columns(plays), meta)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(path, f'{name}.npy'), np.asarray(self.columns[name]))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(dict(self.meta, plays=self.plays), f)
+
+    def group_counts(self, by: tuple, where: dict | None = None) -> list:
+        """Play counts per distinct combination of the by columns.
+
+        where maps column names to a required value; call, dist_bucket and zone
+        also accept their labels ("pass", "7+", "red zone").
+
+        Returns [(key tuple, count), ...] with the most common keys first.
+        """
+        mask = np.ones(self.plays, dtype=bool)
+        for name, value in (where or {}).items():
+            mask &= self.columns[name] == self._code(name, value)
+        keys = np.stack([np.asarray(self.columns[name])[mask] for name in by], axis=1)
+        if not len(keys):
+            return []
+        unique, counts = np.unique(keys, axis=0, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        return [(tuple(int(v) for v in unique[i]), int(counts[i])) for i in order]
+
+    def tendency(self, down, distance, yards_to_endzone, team_id=None) -> dict | None:
+        """How often the league, and the team if given, pass or run in this situation.
+
+        Response (sample): {situation: "3rd & 7+", zone, plays, pass_rate, run_rate, team: {plays, pass_rate, run_rate}}
+
+        None if the situation has no down or fewer than MIN_SAMPLE league plays;
+        team is left out below MIN_SAMPLE team plays.
+        """
+        if not down or not 1 <= down <= 4 or not distance or distance <= 0 or yards_to_endzone is None or yards_to_endzone < 0:
+            return None
+        bucket = distance_bucket(distance)
+        zone = field_zone(yards_to_endzone)
+        league = self._rates(self.counts[0, down, bucket, zone])
+        if league is None:
+            return None
+        result = dict(league, situation=f'{ordinal(down)} & {DISTANCE_BUCKETS[bucket]}', zone=ZONES[zone])
+        slot = np.searchsorted(self.team_ids, team_id) if team_id is not None else len(self.team_ids)
+        if slot < len(self.team_ids) and self.team_ids[slot] == team_id:
+            team = self._rates(self.counts[slot + 1, down, bucket, zone])
+            if team is not None:
+                result['team'] = team
+        return result
+
+    def stats(self) -> dict:
+        return {'plays': self.plays, 'games': self.meta.get('games'), 'season': self.meta.get('season')}
+
+    @staticmethod
+    def _rates(calls) -> dict | None:
+        plays = int(calls.sum())
+        if plays < MIN_SAMPLE:
+            return None
+        return {
+            'plays': plays,
+            'pass_rate': round(int(calls[CALLS.index('pass')]) / plays, 3),
+            'run_rate': round(int(calls[CALLS.index('run')]) / plays, 3),
+        }
+
+    @staticmethod
+    def _code(name: str, value):
+        labels = {'call': CALLS, 'dist_bucket': DISTANCE_BUCKETS, 'zone': ZONES}.get(name)
+        if labels and isinstance(value, str) and value in labels:
+            return labels.index(value)
+        return int(value)
+
+
+def open_default():
+    """The store at SEASON_STORE_PATH, or None if it has not been built."""
+    if not os.path.isdir(SEASON_STORE_PATH):
+        return None
+    try:
+        return SeasonStore.open(SEASON_STORE_PATH)
+    except Exception as e:
+        print(f"Error opening season store {SEASON_STORE_PATH}: {e}")
+        return None
+
+
+def season_game_ids(fetch_json, season: int, weeks: int = 18, postseason: bool = False) -> list:
+    """Ids of a season's games, one scoreboard request per week."""
+    schedule = [(2, week) for week in range(1, weeks + 1)] + ([(3, week) for week in range(1, 6)] if postseason else [])
+    ids = []
+    for season_type, week in schedule:
+        data = fetch_json(SCOREBOARD_URL, params={'dates': season, 'seasontype': season_type, 'week': week})
+        ids.extend(str(ev['id']) for ev in data.get('events', []) if ev.get('id') is not None)
+    return list(dict.fromkeys(ids))
+
+
+def ingest_season(play_service, game_ids: list, workers: int = 8) -> list:
+    """Normalized plays of every game, downloaded workers games at a time."""
+    class Request:
+        args = {'compact': '1', 'limit': '500'}
+
+    def game(game_id):
+        try:
+            return [dict(p, game_id=int(game_id)) for p in play_service.game_plays(game_id, Request())]
+        except Exception as e:
+            print(f"Error ingesting game {game_id}: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest') as executor:
+        return [play for plays in executor.map(game, game_ids) for play in plays]
+
+
+def build_season(play_service, fetch_json, season: int, path: str, workers: int = 8, weeks: int = 18, postseason: bool = False) -> SeasonStore:
+    game_ids = season_game_ids(fetch_json, season, weeks, postseason)
+    store = SeasonStore.build(ingest_season(play_service, game_ids, workers), {'season': season, 'games': len(game_ids)})
+    store.save(path)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="download a season's plays into a store")
+    build.add_argument('season', type=int)
+    build.add_argument('path', nargs='?', default=SEASON_STORE_PATH)
+    build.add_argument('--workers', type=int, default=8)
+    build.add_argument('--weeks', type=int, default=18)
+    build.add_argument('--postseason', action='store_true')
+    query = commands.add_parser('query', help='count plays grouped by columns')
+    query.add_argument('path', nargs='?', default=SEASON_STORE_PATH)
+    query.add_argument('--by', default='down,dist_bucket,call')
+    query.add_argument('--where', action='append', default=[], help='column=value, e.g. call=pass or zone="red zone"')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from common import fetch_json
+        from play import PlayService
+        store = build_season(PlayService(prefetch_explanations=False), fetch_json, args.season, args.path, args.workers, args.weeks, args.postseason)
+        print(f'Stored {store.plays} plays from {store.meta["games"]} games in {args.path}')
+        return
+    store = SeasonStore.open(args.path)
+    by = tuple(args.by.split(','))
+    where = dict(w.split('=', 1) for w in args.where)
+    for key, count in store.group_counts(by, where):
+        print(' '.join(f'{name}={value}' for name, value in zip(by, key)), count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from flask.json.provider import DefaultJSONProvider, _default
+from cache import TTLCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# JSON library for upstream parsing and our responses: 'orjson' when installed, else the stdlib
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson' if orjson is not None else 'json')
+
+# Responses smaller than this go out uncompressed; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+if JSON_BACKEND == 'orjson' and orjson is not None:
+    loads = orjson.loads
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    JSON_BACKEND = 'json'
+
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+class EncodedCache:
+    """Encoded JSON for shared read-only objects, keyed by identity.
+
+    fetch_json hands every caller the same dict until the upstream entry is
+    refreshed, so those objects are registered with share() and encoded at
+    most once per refresh instead of once per request. Entries keep a
+    reference to their object, so its id cannot be reused while cached.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # id(obj) -> [obj, encoded bytes or None]
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def share(self, obj):
+        """Mark obj as shared and never mutated, so its encoding may be reused."""
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            if entry is None or entry[0] is not obj:
+                self._pop(id(obj))
+                self._entries[id(obj)] = [obj, None]
+            self._entries.move_to_end(id(obj))
+            self._evict()
+
+    def is_shared(self, obj) -> bool:
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            return entry is not None and entry[0] is obj
+
+    def dumps(self, obj) -> bytes:
+        """Encode obj, reusing the stored bytes if it is a shared object."""
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            if entry is None or entry[0] is not obj:
+                return dumps(obj)
+            if entry[1] is not None:
+                self.hits += 1
+                return entry[1]
+        body = dumps(obj)
+        with self._lock:
+            if self._entries.get(id(obj)) is entry and entry[1] is None:
+                entry[1] = body
+                self.bytes += len(body)
+                self.misses += 1
+                self._evict()
+        return body
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[1] is not None:
+            self.bytes -= len(entry[1])
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+
+encoded_cache = EncodedCache()
+
+# Compressed bodies keyed by (ETag, encoding), so polled responses are compressed once
+compressed_cache = TTLCache(max_entries=256, max_bytes=16 * 1024 * 1024)
+
+
+def encode_response(obj) -> bytes:
+    """Encode a response object, splicing in stored bytes for shared values.
+
+    Routes wrap upstream payloads, e.g. jsonify(game=data), so the top-level
+    dict is new on every request while its values are the shared objects.
+    """
+    if isinstance(obj, dict) and any(encoded_cache.is_shared(v) for v in obj.values()):
+        return b'{' + b','.join(dumps(str(k)) + b':' + encoded_cache.dumps(v) for k, v in obj.items()) + b'}'
+    return encoded_cache.dumps(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with the configured backend straight to bytes."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(encode_response(obj), mimetype=self.mimetype)
+
+
+def negotiate_encoding(accept_encodings, size: int) -> str | None:
+    """Pick 'br' or 'gzip' from a request's Accept-Encoding, or None to send the body as is."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str, etag: str | None = None) -> bytes:
+    """Compress body, reusing an earlier result for the same ETag."""
+    def load():
+        if encoding == 'br':
+            data = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            data = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        return data, len(data)
+
+    if etag is None:
+        return load()[0]
+    return compressed_cache.get_or_load((etag, encoding), 300, load)
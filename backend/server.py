@@ -2,23 +2,181 @@
 
 import os
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, abort
+import queue
+import time
+from admission import ADMISSION_RETRY_AFTER, AdmissionController, ClientBuckets
+from flask import Flask, Response, g, jsonify, request, abort
 from flask_cors import CORS
 import requests
+from werkzeug.middleware.proxy_fix import ProxyFix
 from game import GameService
-from play import PlayService
+from play import InvalidQuery, PlayService
 from team import TeamService
-from player import PlayerService
+from player import MAX_BULK_PLAYERS, PlayerService
+from common import breakers, fetch_timings, response_cache, stale_urls, track_stale, upstream_stats
+from metrics import Histogram, PrometheusWriter, Timings
+from poller import LiveGamePoller, format_sse
+from scoreboard import InvalidDate
+from season_store import open_default as open_season_store
+from user_store import FAVORITE_TYPES, UserStore
+from serialization import FastJSONProvider, compress, compressed_cache, encoded_cache, negotiate_encoding
 
 load_dotenv()
 
+# Reverse proxies in front of the app (the ingress); their X-Forwarded-For entries are trusted
+PROXY_HOPS = int(os.environ.get('PROXY_HOPS', 0))
+
 app = Flask(__name__)
-CORS(app)
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS, x_proto=PROXY_HOPS)
+app.json = FastJSONProvider(app)
+# Retry-After is read by the frontend to back off from 429/503
+CORS(app, expose_headers=['Retry-After'])
 
 game_service = GameService()
-play_service = PlayService()
 team_service = TeamService()
+season_store = open_season_store()
+play_service = PlayService(team_catalog=team_service.catalog, season_stats=season_store)
 player_service = PlayerService()
+live_poller = LiveGamePoller(game_service, play_service)
+user_store = UserStore()
+# API requests by (method, route rule)
+route_timings = Timings(('method', 'route'))
+# Seconds from a streamed explain-play request to its first AI token
+explain_first_token = Histogram()
+# Concurrency limits by priority class, and per-client limits on explain-play (which can call Groq)
+admission = AdmissionController()
+client_buckets = ClientBuckets()
+# Route rule -> admission class; routes not listed (teams, health, SSE streams, users) are never queued
+ROUTE_CLASSES = {
+    '/api/games': 'live',
+    '/api/games/live': 'live',
+    '/api/games/<game_id>': 'live',
+    '/api/games/<game_id>/plays': 'live',
+    '/api/games/<game_id>/explain-play': 'explain',
+    '/api/players': 'profile',
+    '/api/players/<player_id>': 'profile',
+}
+
+
+@app.before_request
+def start_request_timing():
+    g.timing_key = (request.method, request.url_rule.rule if request.url_rule else 'unmatched')
+    g.timing_started = route_timings.start(g.timing_key)
+
+
+@app.after_request
+def finish_request_timing(response):
+    """Registered first so it runs last, after compression and ETags."""
+    if 'timing_started' in g:
+        route_timings.finish(g.pop('timing_key'), g.pop('timing_started'), response.status_code >= 500, response.status_code)
+    return response
+
+
+@app.before_request
+def start_stale_tracking():
+    track_stale()
+
+
+@app.before_request
+def admit_request():
+    """Queue or shed upstream-bound requests so cheap routes stay fast under load.
+
+    A shed request gets a cached answer when one exists (X-Degraded: 1),
+    else a 503 with Retry-After. A client over its explain-play rate gets a 429.
+    """
+    name = ROUTE_CLASSES.get(request.url_rule.rule) if request.url_rule else None
+    if name is None:
+        return None
+    if name == 'explain':
+        # remote_addr is the peer, or with PROXY_HOPS the address the ingress saw, never a client-set header
+        wait = client_buckets.take(request.remote_addr or 'unknown')
+        if wait:
+            admission.record(name, 'rate_limited')
+            response = jsonify(error='Too many explanation requests')
+            response.status_code = 429
+            response.headers['Retry-After'] = str(wait)
+            return response
+    if admission.acquire(name) is None:
+        g.admission_class = name
+        return None
+    response = degraded_response(request.url_rule.rule)
+    if response is not None:
+        admission.record(name, 'degraded')
+        response.headers['X-Degraded'] = '1'
+        return response
+    response = jsonify(error='Server busy, try again shortly')
+    response.status_code = 503
+    response.headers['Retry-After'] = str(ADMISSION_RETRY_AFTER)
+    return response
+
+
+def degraded_response(rule: str):
+    """An answer built only from in-memory state for a shed request, or None."""
+    game_id = (request.view_args or {}).get('game_id')
+    if rule == '/api/games/<game_id>/plays':
+        try:
+            plays = play_service.cached_plays(game_id, request)
+        except InvalidQuery as e:
+            abort(400, description=str(e))
+        return jsonify(**plays) if plays is not None else None
+    if rule == '/api/games/<game_id>/explain-play' and request.args.get('play_id'):
+        explanation = play_service.cached_explanation(game_id, request.args['play_id'])
+        return jsonify(play_id=request.args['play_id'], explanation=explanation) if explanation is not None else None
+    return None
+
+
+@app.after_request
+def hold_admission_while_streaming(response):
+    """A streamed body (an SSE explanation) keeps its slot until it has been sent, not just until the view returns."""
+    name = g.get('admission_class')
+    if name is not None and response.is_streamed:
+        g.admission_class = None
+        controller = admission
+        response.call_on_close(lambda: controller.release(name))
+    return response
+
+
+@app.teardown_request
+def release_admission(exc):
+    name = g.pop('admission_class', None)
+    if name is not None:
+        admission.release(name)
+
+
+@app.after_request
+def mark_stale_responses(response):
+    """Flag responses built from stale upstream data because ESPN was failing."""
+    if stale_urls():
+        response.headers['Warning'] = '110 - "Response is Stale"'
+        response.headers['X-Upstream-Stale'] = '1'
+    return response
+
+
+@app.after_request
+def conditional_get(response):
+    """Strong content-hash ETag on JSON GET responses, then gzip/brotli if the client accepts it.
+
+    If-None-Match gets a 304. Each encoding has its own ETag ("<hash>-gzip")
+    since the bytes differ; compressed bodies are cached by ETag.
+    """
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.is_streamed or response.mimetype != 'application/json'):
+        return response
+    response.add_etag()
+    # let browsers keep the body but revalidate it on every poll
+    response.headers.setdefault('Cache-Control', 'no-cache')
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings, response.content_length or 0)
+    etag, _ = response.get_etag()
+    if encoding:
+        etag = f'{etag}-{encoding}'
+        response.set_etag(etag)
+    response = response.make_conditional(request)
+    if encoding and response.status_code == 200:
+        response.set_data(compress(response.get_data(), encoding, etag))
+        response.headers['Content-Encoding'] = encoding
+    return response
 
 
 @app.route('/api')
@@ -33,23 +191,165 @@ def hello_world():
         version="0.1",
         endpoints=[
             "/api/games",
+            "/api/games/live",
             "/api/games/<game_id>",
             "/api/games/<game_id>/plays",
+            "/api/games/<game_id>/stream",
             "/api/games/<game_id>/explain-play",
             "/api/teams",
+            "/api/players?ids=<id>,<id>",
             "/api/players/<player_id>",
             "/api/users/<uid>/favorites",
             "/api/health",
+            "/api/metrics",
         ],
     )
 
+@app.route('/api/health')
+def health():
+    """Liveness check plus upstream response cache counters."""
+    return jsonify(
+        status="ok",
+        cache=response_cache.stats(),
+        upstream=upstream_stats.snapshot(),
+        breakers=breakers.stats(),
+        explanations=play_service.explanation_pool.stats(),
+        explanation_store=play_service.ai_explanation_cache.stats(),
+        explanation_rules=play_service.rules.stats(),
+        explanation_signatures=play_service.signature_stats.stats(),
+        explain_first_token=explain_first_token.snapshot(),
+        season_store=season_store.stats() if season_store is not None else None,
+        stream_subscribers=live_poller.broker.subscriber_count(),
+        team_catalog=team_service.catalog.stats(),
+        player_profiles=player_service.profiles.stats(),
+        user_store=user_store.stats(),
+        admission=admission.stats(),
+        client_limits=client_buckets.stats(),
+    )
+
+@app.route('/api/metrics')
+def metrics():
+    """Prometheus text-format metrics for routes, upstream calls, caches and LLM usage."""
+    out = PrometheusWriter()
+    out.timings('rookieplay_http_requests', 'API requests', route_timings)
+    out.timings('rookieplay_fetch_json_calls', 'fetch_json calls (cache hits included)', fetch_timings)
+
+    hosts = upstream_stats.items()
+    out.family('rookieplay_upstream_calls_total', 'counter', 'Calls that reached an upstream host (ESPN or Groq)')
+    for host, stats in hosts:
+        out.sample('rookieplay_upstream_calls_total', stats['latency'].count, ('host',), (host,))
+    for name, kind, help_text in (
+        ('errors', 'counter', 'Upstream calls that failed'),
+        ('not_modified', 'counter', 'Upstream revalidations answered 304'),
+        ('saturated', 'counter', 'Upstream calls made with the connection pool exhausted'),
+        ('in_flight', 'gauge', 'Upstream calls in progress'),
+        ('pool_size', 'gauge', 'Pooled connections per upstream host'),
+    ):
+        metric = f'rookieplay_upstream_{name}' + ('_total' if kind == 'counter' else '')
+        out.family(metric, kind, help_text)
+        for host, stats in hosts:
+            out.sample(metric, stats[name], ('host',), (host,))
+    out.family('rookieplay_upstream_seconds', 'histogram', 'Upstream call latency in seconds')
+    for host, stats in hosts:
+        out.histogram('rookieplay_upstream_seconds', stats['latency'], ('host',), (host,))
+    out.family('rookieplay_llm_tokens_total', 'counter', 'LLM tokens used, by kind')
+    for host, stats in hosts:
+        if stats['prompt_tokens'] or stats['completion_tokens']:
+            out.sample('rookieplay_llm_tokens_total', stats['prompt_tokens'], ('host', 'kind'), (host, 'prompt'))
+            out.sample('rookieplay_llm_tokens_total', stats['completion_tokens'], ('host', 'kind'), (host, 'completion'))
+
+    caches = {
+        'response': response_cache.stats(),
+        'compressed': compressed_cache.stats(),
+        'encoded': encoded_cache.stats(),
+        'player_profile': player_service.profiles.stats(),
+    }
+    out.family('rookieplay_cache_lookups_total', 'counter', 'Cache lookups, by result')
+    for cache, stats in caches.items():
+        for result in ('hits', 'misses', 'coalesced', 'stale_served'):
+            out.sample('rookieplay_cache_lookups_total', stats.get(result), ('cache', 'result'), (cache, result))
+    explanations = play_service.ai_explanation_cache.stats()
+    for result in ('memory_hits', 'backend_hits', 'misses'):
+        out.sample('rookieplay_cache_lookups_total', explanations[result], ('cache', 'result'), ('explanation', result))
+    out.family('rookieplay_cache_hit_ratio', 'gauge', 'Share of cache lookups answered without loading')
+    for cache, stats in caches.items():
+        lookups = stats['hits'] + stats['misses'] + stats.get('coalesced', 0)
+        if lookups:
+            out.sample('rookieplay_cache_hit_ratio', 1 - stats['misses'] / lookups, ('cache',), (cache,))
+    out.sample('rookieplay_cache_hit_ratio', explanations['hit_rate'], ('cache',), ('explanation',))
+    out.family('rookieplay_cache_bytes', 'gauge', 'Bytes held per cache')
+    for cache, stats in caches.items():
+        out.sample('rookieplay_cache_bytes', stats['bytes'], ('cache',), (cache,))
+
+    pool = play_service.explanation_pool.stats()
+    out.family('rookieplay_explanations_in_flight', 'gauge', 'AI explanations queued or generating')
+    out.sample('rookieplay_explanations_in_flight', pool['in_flight'])
+    admitted = admission.stats()['classes']
+    for name, kind, help_text in (
+        ('in_flight', 'gauge', 'Admitted upstream-bound requests in progress, by priority class'),
+        ('queue_depth', 'gauge', 'Requests waiting for admission, by priority class'),
+        ('admitted', 'counter', 'Requests admitted, by priority class'),
+        ('degraded', 'counter', 'Shed requests answered from cached data, by priority class'),
+    ):
+        metric = f'rookieplay_admission_{name}' + ('_total' if kind == 'counter' else '')
+        out.family(metric, kind, help_text)
+        for cls, stats in admitted.items():
+            out.sample(metric, stats[name], ('class',), (cls,))
+    out.family('rookieplay_admission_shed_total', 'counter', 'Requests refused a slot or rate limited, degraded answers included, by priority class and reason')
+    for cls, stats in admitted.items():
+        for reason, count in stats['shed'].items():
+            out.sample('rookieplay_admission_shed_total', count, ('class', 'reason'), (cls, reason))
+
+    signatures = play_service.signature_stats.stats()
+    out.family('rookieplay_explanation_signatures', 'gauge', 'Distinct situation signatures among explained plays')
+    out.sample('rookieplay_explanation_signatures', signatures['signatures'])
+    if signatures['dedupe_ratio'] is not None:
+        out.family('rookieplay_explanation_dedupe_ratio', 'gauge', 'Share of signed plays whose AI explanation was shared with another play')
+        out.sample('rookieplay_explanation_dedupe_ratio', signatures['dedupe_ratio'])
+    rules = play_service.rules.stats()
+    out.family('rookieplay_rule_explanations_total', 'counter', 'Explanations answered by the rule engine, by play kind')
+    for kind, count in sorted(rules['by_kind'].items()):
+        out.sample('rookieplay_rule_explanations_total', count, ('kind',), (kind,))
+    out.family('rookieplay_rule_sent_to_llm_total', 'counter', 'Explanations the rule engine left to the LLM')
+    out.sample('rookieplay_rule_sent_to_llm_total', rules['sent_to_llm'])
+    if rules['coverage'] is not None:
+        out.family('rookieplay_rule_coverage', 'gauge', 'Share of explanations answered without the LLM')
+        out.sample('rookieplay_rule_coverage', rules['coverage'])
+    out.family('rookieplay_stream_subscribers', 'gauge', 'Open SSE streams')
+    out.sample('rookieplay_stream_subscribers', live_poller.broker.subscriber_count())
+    out.family('rookieplay_explain_first_token_seconds', 'histogram', 'Time from a streamed explain-play request to its first AI token')
+    out.histogram('rookieplay_explain_first_token_seconds', explain_first_token)
+    return Response(out.text(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/games')
 def list_games():
+    """Games for the current week, a date, or a start/end range."""
+    game_service.snapshots.start()
     try:
-        games = game_service.list_games(request)
-        return jsonify(games=games)
+        body = game_service.games_json(request)
+    except InvalidDate as e:
+        abort(400, description=str(e))
     except Exception:
         abort(502, description='Failed to fetch games')
+    return Response(body, mimetype='application/json')
+
+
+@app.route('/api/games/live')
+def live_games():
+    """Every game on the current scoreboard with its score, situation and last play.
+
+    Built from the shared scoreboard refresh, so it costs no upstream calls
+    per viewer; the ETag is computed once per refresh and idle clients get a 304.
+    """
+    game_service.snapshots.start()
+    try:
+        body, etag = game_service.live_games_json()
+    except Exception:
+        abort(502, description='Failed to fetch games')
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
 
 
 @app.route('/api/games/<game_id>')
@@ -62,18 +362,56 @@ def get_game(game_id: str):
 
 @app.route('/api/games/<game_id>/plays')
 def game_plays(game_id: str):
+    """Play-by-play for a game.
+
+    Query params:
+      - since (cursor) only plays added or changed after this cursor
+      - tail (int) only the last N plays
+    """
     try:
+        if 'since' in request.args or 'tail' in request.args:
+            return jsonify(**play_service.play_delta(game_id, request))
         plays = play_service.game_plays(game_id, request)
         return jsonify(plays=plays)
+    except InvalidQuery as e:
+        abort(400, description=str(e))
     except Exception:
         abort(502, description='Failed to fetch plays')
 
+@app.route('/api/games/<game_id>/stream')
+def game_stream(game_id: str):
+    """Server-Sent Events feed of score and play updates for a game.
+
+    Events: game {header}, plays {plays, cursor, reset}, resync {}
+    """
+    live_poller.start()
+    subscription = live_poller.broker.subscribe(game_id)
+
+    def events():
+        try:
+            for event, data in live_poller.snapshot(game_id):
+                yield format_sse(event, data)
+            while True:
+                try:
+                    event, data = subscription.get(timeout=15)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event, data)
+        finally:
+            live_poller.broker.unsubscribe(game_id, subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/games/<game_id>/explain-play')
 def explain_play(game_id: str):
     """Explain a single play for beginners.
 
     Query params:
       - play_id
+      - stream=1 (or Accept: text/event-stream) to receive server-sent events:
+        explanation {what_happened, ...}, token {text} per AI chunk, done {ai_explanation, ai_status}
+        (done has discard_tokens: true when generation failed partway)
 
     Response (sample): {play_id, explanation: {what_happened, why_the_play_happened, possible_alternatives, numbers_explained}}
     """
@@ -81,14 +419,41 @@ def explain_play(game_id: str):
     if not play_id:
         abort(400, description="play_id required in query params")
 
+    if request.args.get('stream') == '1' or request.accept_mimetypes.best == 'text/event-stream':
+        return stream_explanation(game_id, play_id)
     try:
         play_obj = play_service.explain_play(game_id, play_id)
         return jsonify(play_id=play_id, explanation=play_obj)
     except Exception:
         abort(502, description='Failed to explain play')
 
+def stream_explanation(game_id: str, play_id: str):
+    started = time.perf_counter()
+    stream = play_service.stream_explain_play(game_id, play_id)
+    try:
+        # build the structured part now so a failure can still be a 502
+        first = next(stream)
+    except Exception:
+        abort(502, description='Failed to explain play')
+
+    def events():
+        yield format_sse(*first)
+        waiting = True
+        try:
+            for event, data in stream:
+                if event == 'token' and waiting:
+                    explain_first_token.observe(time.perf_counter() - started)
+                    waiting = False
+                yield format_sse(event, data)
+        except Exception as e:
+            print(f"Error streaming explanation for play {play_id}: {e}")
+            yield format_sse('done', {'ai_explanation': None, 'ai_status': 'unavailable', 'discard_tokens': not waiting})
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/teams')
 def list_teams():
+    team_service.catalog.start()
     try:
         teams = team_service.list_teams()
         return jsonify(teams=teams)
@@ -97,12 +462,30 @@ def list_teams():
 
 @app.route('/api/teams/<team_id>')
 def get_team(team_id: str):
+    team_service.catalog.start()
     try:
         team = team_service.get_team(team_id)
         return jsonify(team=team)
     except Exception:
         abort(502, description='Failed to fetch team')
 
+@app.route('/api/players')
+def get_players():
+    """Trimmed profiles for several players at once.
+
+    Query params:
+      - ids (comma-separated player ids, up to MAX_BULK_PLAYERS)
+    """
+    ids = [i for i in request.args.get('ids', '').split(',') if i.strip()]
+    if not ids:
+        abort(400, description="ids required in query params")
+    if len(ids) > MAX_BULK_PLAYERS:
+        abort(400, description=f"at most {MAX_BULK_PLAYERS} ids per request")
+    try:
+        return jsonify(**player_service.get_players([i.strip() for i in ids]))
+    except Exception:
+        abort(502, description='Failed to fetch players')
+
 @app.route('/api/players/<player_id>')
 def get_player(player_id: str):
     try:
@@ -111,25 +494,41 @@ def get_player(player_id: str):
     except Exception:
         abort(502, description='Failed to fetch player')
 
+def favorite_summary(favorite: dict):
+    """Cached summary for a favorite, or None; never calls ESPN."""
+    if favorite['type'] == 'team':
+        return team_service.catalog.lookup(favorite['id'])
+    if favorite['type'] == 'game':
+        return game_service.snapshots.find_game(favorite['id'])
+    if favorite['type'] == 'player':
+        return player_service.profiles.get(str(favorite['id']))
+    return None
+
 @app.route('/api/users/<uid>/favorites', methods=['GET', 'POST', 'DELETE'])
 def user_favorites(uid: str):
     """GET returns favorites, POST adds a favorite, DELETE removes.
 
-    POST body: {type: "team|player|game", id: "..."}
+    GET query params:
+      - expand=1 to include each favorite's cached team/game/player summary
+
+    POST/DELETE body: {type: "team|player|game", id: "..."}
     Response: {success: true, favorites: [...]}
     """
     if request.method == 'GET':
-        # placeholder
-        return jsonify(favorites=[{"type": "team", "id": "10"}])
+        favorites = user_store.favorites(uid)
+        if request.args.get('expand') in ('1', 'true'):
+            favorites = [dict(f, summary=favorite_summary(f)) for f in favorites]
+        return jsonify(favorites=favorites)
     body = request.get_json(silent=True) or {}
+    if 'type' not in body or 'id' not in body:
+        abort(400, "body must include type and id")
+    if body['type'] not in FAVORITE_TYPES:
+        abort(400, f"type must be one of {', '.join(FAVORITE_TYPES)}")
     if request.method == 'POST':
-        if 'type' not in body or 'id' not in body:
-            abort(400, "body must include type and id")
-        # In prod: write to Firebase
+        user_store.add_favorite(uid, body['type'], body['id'])
         return jsonify(success=True, added=body), 201
-    if request.method == 'DELETE':
-        # In prod: remove from Firebase
-        return jsonify(success=True, removed=body)
+    user_store.remove_favorite(uid, body['type'], body['id'])
+    return jsonify(success=True, removed=body)
 
 @app.route('/api/users/<uid>/notes', methods=['GET', 'POST'])
 def user_notes(uid: str):
@@ -138,13 +537,17 @@ def user_notes(uid: str):
     POST body: {game_id, play_id(optional), note}
     """
     if request.method == 'GET':
-        return jsonify(notes=[])
-    body = request.get_json(silent=True) or {}
-    if 'note' not in body:
+        return jsonify(notes=user_store.notes(uid))
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or 'note' not in body:
         abort(400, "note required")
-    # In prod: persist to Firebase
-    return jsonify(success=True, note=body), 201
-
+    try:
+        note = user_store.add_note(uid, body)
+    except ValueError as e:
+        abort(400, str(e))
+    return jsonify(success=True, note=note), 201
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=3000)
\ No newline at end of file
+    team_service.catalog.start()
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=int(os.environ.get('PORT', 3000)), threaded=True)
\ No newline at end of file
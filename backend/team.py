@@ -1,31 +1,21 @@
 from common import fetch_json
+from team_catalog import TeamCatalog
 
 class TeamService:
-    def __init__(self, fetch_func=None):
+    def __init__(self, fetch_func=None, catalog=None):
         self.fetch_json = fetch_func or fetch_json
+        # Teams and rosters held in memory; share it with PlayService for team names
+        self.catalog = catalog or TeamCatalog(lambda *args, **kwargs: self.fetch_json(*args, **kwargs))
 
     def list_teams(self):
         """Return list of teams with ids, names, and logos.
 
         Response (sample): {teams: [{id,name,abbr,logo}, ...]}
         """
-        # Fetch teams catalog
-        url = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams'
         try:
-            data = self.fetch_json(url)
-            sports = data.get('sports', [])
-            if not sports:
-                return []
-            leagues = sports[0].get('leagues', [])
-            if not leagues:
-                return []
-            teams = []
-            for t in leagues[0].get('teams', []):
-                team = t.get('team') or t
-                teams.append({'id': team.get('id'), 'name': team.get('displayName') or team.get('name'), 'abbr': team.get('abbrev'), 'logo': team.get('logos')[0]['href'] if team.get('logos') else None})
-            return teams
+            return self.catalog.teams()
         except Exception as e:
-            print("Error fetching teams catalog: %s", e)
+            print(f"Error fetching teams catalog: {e}")
             raise
 
     def get_team(self, team_id: str):
@@ -33,10 +23,8 @@ class TeamService:
 
         Response (sample): {id, name, abbr, roster: [{id,name,position}, ...]}
         """
-        url = f'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams/{team_id}'
         try:
-            data = self.fetch_json(url)
-            return data
+            return self.catalog.team(team_id)
         except Exception as e:
-            print("Error fetching team %s: %s", team_id, e)
-            raise
\ No newline at end of file
+            print(f"Error fetching team {team_id}: {e}")
+            raise
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from serialization import encoded_cache
+
+TEAMS_URL = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams'
+# Seconds between background reloads; teams and rosters change at most weekly
+TEAM_CATALOG_REFRESH = float(os.environ.get('TEAM_CATALOG_REFRESH', 6 * 3600))
+
+
+def summarize(team: dict) -> dict:
+    """The {id, name, abbr, logo} summary served by /api/teams."""
+    return {
+        'id': team.get('id'),
+        'name': team.get('displayName') or team.get('name'),
+        'abbr': team.get('abbreviation') or team.get('abbrev'),
+        'logo': team.get('logos')[0]['href'] if team.get('logos') else None,
+    }
+
+
+class TeamCatalog:
+    """Every team and its roster payload, held in memory and shared by the services.
+
+    The team list is loaded once (at startup when start() is called, else on
+    first use) and reloaded every refresh_every seconds together with the
+    roster of each team, so team routes never wait on ESPN after warm-up.
+    Only rosters of teams in the list are kept; other ids go through the
+    bounded response cache of fetch_json. lookup() only reads memory, so play
+    normalization can resolve team ids without making upstream calls.
+    A failed reload, or one without team data, keeps the previous data.
+    """
+
+    def __init__(self, fetch_json, refresh_every: float = TEAM_CATALOG_REFRESH):
+        self.fetch_json = fetch_json
+        self.refresh_every = refresh_every
+        self._teams = None
+        self._by_id = {}
+        self._by_abbr = {}
+        self._rosters = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._thread = None
+        self.loaded_at = None
+
+    def teams(self) -> list:
+        """Summaries of all teams, loading them if this is the first use."""
+        if self._teams is None:
+            with self._load_lock:
+                if self._teams is None:
+                    self.load()
+        return self._teams
+
+    def team(self, team_id: str) -> dict:
+        """A team's detail and roster payload, fetched only the first time it is asked for."""
+        payload = self._rosters.get(str(team_id))
+        if payload is None:
+            payload = self.load_team(team_id)
+        return payload
+
+    def lookup(self, team_id):
+        """Summary for a team id or abbreviation, or None if it is not loaded."""
+        key = str(team_id)
+        return self._by_id.get(key) or self._by_abbr.get(key.upper())
+
+    def load(self):
+        data = self.fetch_json(TEAMS_URL)
+        sports = data.get('sports') or [{}]
+        leagues = sports[0].get('leagues') or [{}]
+        teams = [summarize(t.get('team') or t) for t in leagues[0].get('teams', [])]
+        # the list is replaced, never mutated, so its encoding can be reused
+        encoded_cache.share(teams)
+        with self._lock:
+            self._teams = teams
+            self._by_id = {str(t['id']): t for t in teams if t['id'] is not None}
+            self._by_abbr = {t['abbr'].upper(): t for t in teams if t['abbr']}
+            self.loaded_at = time.monotonic()
+
+    def load_team(self, team_id) -> dict:
+        payload = self.fetch_json(f'{TEAMS_URL}/{team_id}', params={'enable': 'roster'})
+        key = str(team_id)
+        # unknown ids and payloads without a team (ESPN answers bad ids with an error body) are not kept
+        if isinstance(payload, dict) and payload.get('team'):
+            with self._lock:
+                if key in self._by_id:
+                    self._rosters[key] = payload
+        return payload
+
+    def refresh(self):
+        """Reload the team list and every team's roster."""
+        self.load()
+        with self._lock:
+            self._rosters = {k: v for k, v in self._rosters.items() if k in self._by_id}
+        for team_id in list(self._by_id):
+            try:
+                self.load_team(team_id)
+            except Exception as e:
+                print(f"Error refreshing team {team_id}: {e}")
+
+    def start(self):
+        """Start the background loader if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='team-catalog', daemon=True)
+            self._thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'teams': len(self._by_id),
+                'rosters': len(self._rosters),
+                'age': round(time.monotonic() - self.loaded_at) if self.loaded_at is not None else None,
+            }
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing team catalog: {e}")
+            time.sleep(self.refresh_every)
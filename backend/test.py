@@ -1,9 +1,19 @@
+import json
+import os
 import unittest
+
+# the default stores are files in the working directory; keep test state out of them
+os.environ.setdefault('EXPLANATION_DB_PATH', ':memory:')
+os.environ.setdefault('USER_DB_PATH', ':memory:')
 from unittest.mock import MagicMock
 from game import GameService
 from play import PlayService
 from team import TeamService
 from player import PlayerService
+from cache import TTLCache
+from poller import Broker, LiveGamePoller
+from explainer import ExplanationPool
+from explanation_store import ExplanationStore, SQLiteBackend
 
 class TestGameService(unittest.TestCase):
     def setUp(self):
@@ -34,6 +44,80 @@ class TestGameService(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.service.list_games(DummyReq())
 
+    def test_list_games_served_from_snapshot(self):
+        self.service.fetch_json.return_value = {'events': [{'id': '1', 'competitions': [{'competitors': []}], 'date': '2025-10-26T20:00Z'}]}
+        class DummyReq: args = {'date': '2025-10-26'}
+        first = self.service.games_json(DummyReq())
+        second = self.service.games_json(DummyReq())
+        self.assertIs(first, second)
+        self.assertEqual(self.service.fetch_json.call_count, 1)
+        self.assertEqual(self.service.fetch_json.call_args.kwargs['params'], {'dates': '20251026'})
+
+    def test_games_range_uses_one_upstream_call(self):
+        import json
+        self.service.fetch_json.return_value = {'events': [
+            {'id': '1', 'competitions': [{'competitors': []}], 'date': '2025-10-26T17:00Z'},
+            # Monday night kickoff is Tuesday in UTC but Monday on the scoreboard
+            {'id': '2', 'competitions': [{'competitors': []}], 'date': '2025-10-28T00:15Z'},
+        ]}
+        class RangeReq: args = {'start': '2025-10-26', 'end': '2025-10-27'}
+        body = json.loads(self.service.games_json(RangeReq()))
+        self.assertEqual([g['id'] for g in body['games']], ['1', '2'])
+        self.assertEqual(self.service.fetch_json.call_args.kwargs['params'], {'dates': '20251026-20251027'})
+        class DayReq: args = {'start': '2025-10-27', 'end': '2025-10-27'}
+        body = json.loads(self.service.games_json(DayReq()))
+        self.assertEqual([g['id'] for g in body['games']], ['2'])
+        self.assertEqual(self.service.fetch_json.call_count, 1)
+
+    def test_live_games_from_one_scoreboard_fetch(self):
+        import json
+        self.service.fetch_json.return_value = {'events': [{
+            'id': '1', 'date': '2025-10-26T20:00Z',
+            'status': {'period': 3, 'displayClock': '5:32', 'type': {'name': 'STATUS_IN_PROGRESS', 'shortDetail': '5:32 - 3rd'}},
+            'competitions': [{
+                'competitors': [{'homeAway': 'home', 'score': '17', 'team': {'id': '10'}}, {'homeAway': 'away', 'score': '10', 'team': {'id': '20'}}],
+                'situation': {'down': 3, 'distance': 7, 'yardLine': 42, 'possession': '10', 'shortDownDistanceText': '3rd & 7',
+                              'lastPlay': {'id': '99', 'text': 'J.Love pass short left for 4 yards', 'type': {'text': 'Pass Reception'}}},
+            }],
+        }]}
+        body, etag = self.service.live_games_json()
+        game = json.loads(body)['games'][0]
+        self.assertEqual(game['score'], {'home': 17, 'away': 10})
+        self.assertEqual((game['possession'], game['down_distance'], game['last_play']['id']), ('10', '3rd & 7', '99'))
+        self.assertEqual(self.service.live_games_json(), (body, etag))
+        # /api/games keeps serving the plain summaries
+        self.assertNotIn('score', json.loads(self.service.games_json(type('Req', (), {'args': {}})))['games'][0])
+        self.assertEqual(self.service.fetch_json.call_count, 1)
+
+    def test_games_invalid_range(self):
+        from scoreboard import InvalidDate
+        class DummyReq: args = {'start': '2025-10-26', 'end': '2025-12-26'}
+        with self.assertRaises(InvalidDate):
+            self.service.games_json(DummyReq())
+
+    def test_snapshot_refresh_follows_kickoff(self):
+        import datetime
+        from scoreboard import SNAPSHOT_IDLE_REFRESH, SNAPSHOT_LIVE_REFRESH, refresh_interval
+        now = datetime.datetime.now(datetime.timezone.utc)
+        kickoff = lambda hours: (now + datetime.timedelta(hours=hours)).isoformat()
+        self.assertEqual(refresh_interval([{'status': 'STATUS_SCHEDULED', 'start_time': kickoff(72)}]), SNAPSHOT_IDLE_REFRESH)
+        self.assertAlmostEqual(refresh_interval([{'status': 'STATUS_SCHEDULED', 'start_time': kickoff(1)}]), 1800, delta=5)
+        self.assertEqual(refresh_interval([{'status': 'STATUS_SCHEDULED', 'start_time': kickoff(0.25)}]), SNAPSHOT_LIVE_REFRESH)
+        self.assertEqual(refresh_interval([{'status': 'STATUS_FINAL'}, {'status': 'STATUS_HALFTIME'}]), SNAPSHOT_LIVE_REFRESH)
+        self.assertEqual(refresh_interval([{'status': 'STATUS_FINAL'}, {'status': 'STATUS_POSTPONED'}]), SNAPSHOT_IDLE_REFRESH)
+
+    def test_unread_snapshots_are_evicted_not_refreshed(self):
+        from scoreboard import ScoreboardStore
+        store = ScoreboardStore(MagicMock(return_value=[]), max_snapshots=2, unread_ttl=60)
+        store.get('20251026')
+        store.get('20251027')
+        store.refresh('20251026')  # a background refresh does not count as a read
+        store.get('20251028')
+        self.assertEqual(list(store._snapshots), ['20251027', '20251028'])
+        store._read_at['20251027'] -= 120
+        self.assertEqual(store.drop_unread(), ['20251027'])
+        self.assertEqual(list(store._snapshots), ['20251028'])
+
     def test_get_game_normal(self):
         self.service.fetch_json.return_value = {'id': '1', 'teams': []}
         game = self.service.get_game('1')
@@ -41,7 +125,7 @@ class TestGameService(unittest.TestCase):
 
 class TestPlayService(unittest.TestCase):
     def setUp(self):
-        self.service = PlayService()
+        self.service = PlayService(explanation_store=ExplanationStore(SQLiteBackend(':memory:')))
         self.service.fetch_json = MagicMock()
 
     def test_explain_play_obj_normal(self):
@@ -71,6 +155,199 @@ class TestPlayService(unittest.TestCase):
         plays = self.service.game_plays('1', DummyReq())
         self.assertEqual(plays[0]['id'], 'p2')
 
+    def test_explain_play_uses_index(self):
+        self.service._generate_ai_explanation = MagicMock(return_value=None)
+        self.service.fetch_json.return_value = {'items': [{'id': 'p1', 'displayId': '7', 'text': 'Kneel'}]}
+        class DummyReq: args = {}
+        self.service.game_plays('1', DummyReq())
+        result = self.service.explain_play('1', '7')
+        self.assertEqual(result['what_happened'], 'Kneel')
+        self.assertEqual(self.service.fetch_json.call_count, 1)
+
+    def test_explain_play_miss_loads_new_pages(self):
+        self.service._generate_ai_explanation = MagicMock(return_value=None)
+        self.service.fetch_json.return_value = {'items': [{'id': 'p1', 'text': 'Run'}], 'pageCount': 1}
+        result = self.service.explain_play('1', 'p1')
+        self.assertEqual(result['what_happened'], 'Run')
+        self.assertEqual(self.service.fetch_json.call_args.kwargs['params']['page'], 1)
+
+    def test_explain_play_final_game_does_not_refetch(self):
+        self.service.play_store.game('1').ingest([{'id': 'p9', 'type': {'id': '79', 'text': 'End of Game'}}])
+        result = self.service.explain_play('1', 'missing')
+        self.assertEqual(result['what_happened'], 'Play not found')
+        self.service.fetch_json.assert_not_called()
+
+    def test_play_delta_since_cursor(self):
+        class FirstReq: args = {'since': ''}
+        self.service.fetch_json.return_value = {'items': [{'id': 'p1'}, {'id': 'p2'}]}
+        first = self.service.play_delta('1', FirstReq())
+        self.assertTrue(first['reset'])
+        self.assertEqual(len(first['plays']), 2)
+        class NextReq: args = {'since': first['cursor']}
+        self.service.fetch_json.return_value = {'items': [{'id': 'p1'}, {'id': 'p2', 'text': 'edited'}, {'id': 'p3'}]}
+        delta = self.service.play_delta('1', NextReq())
+        self.assertFalse(delta['reset'])
+        self.assertEqual([p['id'] for p in delta['plays']], ['p2', 'p3'])
+        self.assertNotEqual(delta['cursor'], first['cursor'])
+
+    def test_cursor_is_accepted_by_another_worker(self):
+        from play_store import CURSOR_WINDOW, GamePlays
+        plays = [{'id': f'p{i}', 'text': 'Run'} for i in range(30)]
+        mine, other = GamePlays(), GamePlays()
+        mine.ingest(plays)
+        # another process that saw the same plays in two polls
+        other.ingest(plays[:12])
+        other.ingest(plays)
+        cursor = mine.since(None)[1]
+        self.assertEqual(other.since(cursor), ([], cursor, False))
+        other.ingest([dict(plays[27], text='Run, PENALTY'), {'id': 'p30'}, {'id': 'p31'}])
+        changed, _, reset = other.since(cursor)
+        self.assertFalse(reset)
+        self.assertEqual([p['id'] for p in changed], ['p27', 'p30', 'p31'])
+        # an edit older than the cursor's window resets the client
+        other.ingest([dict(plays[30 - CURSOR_WINDOW - 5], text='Run, reversed')])
+        self.assertTrue(other.since(cursor)[2])
+        self.assertTrue(other.since('abc.1')[2])
+
+    def test_play_delta_rejects_bad_tail(self):
+        from play import InvalidQuery
+        class DummyReq: args = {'tail': 'five'}
+        with self.assertRaises(InvalidQuery):
+            self.service.play_delta('1', DummyReq())
+        self.service.fetch_json.assert_not_called()
+
+    def test_play_delta_tail(self):
+        self.service.fetch_json.return_value = {'items': [{'id': f'p{i}'} for i in range(50)]}
+        class DummyReq: args = {'tail': '5'}
+        delta = self.service.play_delta('1', DummyReq())
+        self.assertEqual([p['id'] for p in delta['plays']], ['p45', 'p46', 'p47', 'p48', 'p49'])
+
+    def test_game_plays_compact_projection(self):
+        self.service.fetch_json.return_value = {'items': [{'id': 'p1', 'text': 'Run', 'start': {'down': 2, 'distance': 7}, 'team': {'$ref': 'http://x/teams/12?lang=en'}, 'participants': [{}]}]}
+        class DummyReq: args = {'fields': 'id,down,team_id,bogus'}
+        plays = self.service.game_plays('1', DummyReq())
+        self.assertEqual(plays, [{'id': 'p1', 'down': 2, 'team_id': 12}])
+        class CompactReq: args = {'compact': '1'}
+        plays = self.service.game_plays('1', CompactReq())
+        self.assertEqual(plays[0]['text'], 'Run')
+        self.assertNotIn('participants', plays[0])
+
+    def test_hedged_plays_wait_for_core_when_cdn_has_no_plays(self):
+        import time
+
+        def fetch(url, params=None):
+            if 'cdn.espn.com' in url:
+                return {'gamepackageJSON': {}}
+            time.sleep(0.1)
+            return {'items': [{'id': '1', 'text': 'Kickoff'}]}
+
+        service = PlayService(fetch_func=fetch, explanation_store=ExplanationStore(), fetch_mode='hedged', hedge_delay=0.01,
+                              prefetch_explanations=False)
+        self.assertEqual(service.game_plays('1', MagicMock(args={})), [{'id': '1', 'text': 'Kickoff'}])
+
+class TestPlayRecord(unittest.TestCase):
+    def test_from_core_play(self):
+        from play_record import PlayRecord
+        record = PlayRecord.from_espn({
+            'id': '401', 'displayId': '9', '$ref': 'http://x/events/555/competitions/555/plays/401',
+            'shortText': 'Kickoff', 'type': {'id': '53', 'text': 'Kickoff'},
+            'start': {'down': 0, 'distance': 0, 'yardLine': 35, 'yardsToEndzone': 65},
+            'period': {'number': 1}, 'clock': {'displayValue': '15:00'},
+            'team': {'$ref': 'http://x/teams/23?lang=en'}, 'scoringType': {'displayName': 'Touchdown'},
+        })
+        self.assertEqual((record.id, record.display_id, record.game_id), ('401', '9', '555'))
+        self.assertEqual((record.team_id, record.type_id, record.period), (23, 53, 1))
+        self.assertEqual(record.scoring_type, 'Touchdown')
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_from_cdn_play(self):
+        from play_record import PlayRecord
+        record = PlayRecord.from_espn({'id': 7, 'text': 'Pass', 'start': {'team': {'id': '4'}}})
+        self.assertEqual((record.id, record.team_id, record.down), ('7', 4, None))
+
+class TestRuleExplainer(unittest.TestCase):
+    def setUp(self):
+        from play_rules import RuleExplainer
+        self.rules = RuleExplainer()
+
+    def record(self, **play):
+        from play_record import PlayRecord
+        return PlayRecord.from_espn(play)
+
+    def test_classifies_routine_plays(self):
+        cases = {
+            'kneel': self.record(text='P.Mahomes kneels to KC 44 for -1 yards.', type={'id': '2', 'text': 'Rush'}),
+            'timeout': self.record(text='Timeout #2 by BUF at 01:58.', type={'text': 'Timeout'}),
+            'end_game': self.record(type={'id': '79', 'text': 'End of Game'}),
+            'extra_point': self.record(text='H.Butker extra point is GOOD, Center-J.Winchester.'),
+        }
+        for kind, play in cases.items():
+            self.assertEqual(self.rules.classify(play), kind)
+        self.assertIn('BUF called a timeout', self.rules.explain(cases['timeout']))
+
+    def test_unusual_and_ordinary_plays_go_to_llm(self):
+        self.assertIsNone(self.rules.classify(self.record(text='J.Allen pass short right to S.Diggs for 12 yards')))
+        self.assertIsNone(self.rules.classify(self.record(text='T.Townsend punt is BLOCKED by J.Smith', type={'text': 'Blocked Punt'})))
+        self.assertIsNone(self.rules.explain(self.record(text='Fake field goal, run for 4 yards')))
+        warning = self.record(id='w1', text='Two-Minute Warning')
+        for _ in range(3):
+            self.rules.explain(warning)
+        self.rules.record_llm()
+        self.assertEqual(self.rules.stats(), {'answered': 1, 'sent_to_llm': 1, 'coverage': 0.5, 'by_kind': {'two_minute_warning': 1}})
+
+    def test_end_of_fourth_quarter_depends_on_score(self):
+        end = lambda home, away: self.rules.explain(self.record(text='END QUARTER 4', period={'number': 4}, homeScore=home, awayScore=away))
+        self.assertIn('overtime', end(17, 17))
+        self.assertEqual(end(24, 10), 'The game is over. The final score was 24 for the home team, 10 for the visitors.')
+
+    def test_polls_of_cached_plays_are_not_llm_calls(self):
+        service = PlayService(explanation_store=ExplanationStore(), prefetch_explanations=False)
+        play = {'id': 'f1', 'text': 'Fake field goal, run for 4 yards'}
+        service.ai_explanation_cache[service.explanation_key(play, game_id='1')] = 'A trick play.'
+        for _ in range(3):
+            service.explain_play_obj(play, game_id='1')
+        self.assertEqual(service.rules.stats()['sent_to_llm'], 0)
+
+    def test_routine_play_skips_the_llm(self):
+        service = PlayService(explanation_store=ExplanationStore(SQLiteBackend(':memory:')))
+        service.explanation_pool.submit = MagicMock()
+        result = service.explain_play_obj({'id': 'k1', 'text': 'P.Mahomes kneels to KC 44 for -1 yards.'}, game_id='1')
+        self.assertEqual(result['ai_status'], 'ready')
+        self.assertIn('took a knee', result['ai_explanation'])
+        service.explanation_pool.submit.assert_not_called()
+
+class TestPlaySignature(unittest.TestCase):
+    def play(self, play_id, text, team, yards=3):
+        return {'id': play_id, 'text': text, 'start': {'down': 3, 'distance': 2, 'yardLine': 50, 'yardsToEndzone': 50, 'team': {'displayName': team}},
+                'period': {'number': 2}, 'clock': {'displayValue': '9:12'}, 'statYardage': yards}
+
+    def test_same_situation_shares_one_generation(self):
+        service = PlayService(explanation_store=ExplanationStore())
+        service._generate_ai_explanation = MagicMock(return_value='{team} handed off to {player} to pick up the first down.')
+        bills = self.play('a1', 'J.Cook up the middle to KC 48 for 2 yards', 'Buffalo Bills', 2)
+        chiefs = self.play('b7', 'I.Pacheco left guard to BUF 47 for 3 yards', 'Kansas City Chiefs')
+        key = service.explanation_key(bills, game_id='1')
+        self.assertEqual(key, service.explanation_key(chiefs, game_id='2'))
+        self.assertEqual(key[0], '*')
+        service.explanation_pool.submit(key, bills).result(2)
+        self.assertEqual(service.explain_play_obj(chiefs, game_id='2')['ai_explanation'],
+                         'The Kansas City Chiefs handed off to I.Pacheco to pick up the first down.')
+        self.assertIn('J.Cook', service.explain_play_obj(bills, game_id='1')['ai_explanation'])
+        self.assertEqual(service._generate_ai_explanation.call_count, 1)
+        self.assertEqual(service.signature_stats.stats(), {'plays': 2, 'signed_plays': 2, 'signatures': 1, 'dedupe_ratio': 0.5})
+
+    def test_specific_plays_keep_their_own_explanation(self):
+        from play_record import PlayRecord
+        from play_signature import signature
+        self.assertIsNone(signature(PlayRecord.from_espn(self.play('c1', 'J.Cook up the middle, FUMBLES, recovered by KC', 'Bills'))))
+        self.assertIsNone(signature(PlayRecord.from_espn({'id': 'c2', 'text': 'J.Cook up the middle for 2 yards'})))
+        self.assertEqual(PlayService(explanation_store=ExplanationStore()).explanation_key({'id': 'c2'}, game_id='1'), ('1', 'c2', 'v1'))
+
+    def test_personalize_stream_holds_split_placeholders(self):
+        from play_signature import personalize_stream
+        chunks = ['{te', 'am} ran it. {play', 'er} got ', 'the first down.']
+        self.assertEqual(''.join(personalize_stream(chunks, 'Chiefs', 'I.Pacheco')), 'The Chiefs ran it. I.Pacheco got the first down.')
+
 class TestTeamService(unittest.TestCase):
     def setUp(self):
         self.service = TeamService()
@@ -101,6 +378,41 @@ class TestTeamService(unittest.TestCase):
         teams = self.service.list_teams()
         self.assertEqual(teams, [])
 
+    def test_catalog_serves_from_memory(self):
+        teams = {'sports': [{'leagues': [{'teams': [{'team': {'id': '10', 'displayName': 'Packers', 'abbreviation': 'GB'}}]}]}]}
+        self.service.fetch_json.side_effect = lambda url, params=None: teams if params is None else {'team': {'id': '10'}}
+        self.service.list_teams()
+        self.service.list_teams()
+        self.service.get_team('10')
+        self.service.get_team('10')
+        self.assertEqual(self.service.fetch_json.call_count, 2)
+        self.assertEqual(self.service.catalog.lookup('gb')['id'], '10')
+        self.assertEqual(self.service.catalog.lookup(10)['name'], 'Packers')
+
+    def test_catalog_keeps_only_listed_rosters(self):
+        teams = {'sports': [{'leagues': [{'teams': [{'team': {'id': '10', 'displayName': 'Packers'}}]}]}]}
+        self.service.fetch_json.side_effect = lambda url, params=None: teams if params is None else {'code': 404}
+        self.service.list_teams()
+        self.service.get_team('10')
+        self.service.get_team('not-a-team')
+        self.assertEqual(self.service.catalog.stats()['rosters'], 0)
+        self.service.fetch_json.side_effect = lambda url, params=None: teams if params is None else {'team': {'id': url.rsplit('/', 1)[1]}}
+        self.service.get_team('10')
+        self.service.get_team('not-a-team')
+        self.assertEqual(self.service.catalog.stats()['rosters'], 1)
+
+    def test_plays_get_team_names_from_catalog(self):
+        self.service.fetch_json.return_value = {'sports': [{'leagues': [{'teams': [{'team': {'id': '10', 'displayName': 'Packers', 'abbreviation': 'GB'}}]}]}]}
+        self.service.catalog.load()
+        plays = PlayService(explanation_store=ExplanationStore(), team_catalog=self.service.catalog)
+        plays.fetch_json = MagicMock(return_value={'items': [{'id': 'p1', 'start': {'down': 1, 'distance': 10, 'team': {'$ref': 'http://x/teams/10?lang=en'}}}]})
+        class DummyReq: args = {'compact': '1'}
+        self.assertEqual(plays.game_plays('1', DummyReq())[0]['team_abbr'], 'GB')
+        self.service.fetch_json.reset_mock()
+        result = plays.explain_play_obj(plays.play_store.game('1').find_record('p1'))
+        self.assertIn('for the Packers', result['why_the_play_happened'])
+        self.service.fetch_json.assert_not_called()
+
 class TestPlayerService(unittest.TestCase):
     def setUp(self):
         self.service = PlayerService()
@@ -126,15 +438,705 @@ class TestPlayerService(unittest.TestCase):
         player = self.service.get_player('999999999999')
         self.assertEqual(player['athlete']['id'], '999999999999')
 
+    def test_get_players_bulk(self):
+        def fetch(url):
+            player_id = url.rstrip('/').split('/')[-1]
+            if player_id == '3':
+                raise ValueError('not found')
+            return {'athlete': {'id': player_id, 'displayName': f'P{player_id}', 'position': {'abbreviation': 'WR'}, 'college': {'name': 'big'}}}
+        self.service.fetch_json = MagicMock(side_effect=fetch)
+        self.service.fetch_mode = 'sequential'
+        result = self.service.get_players(['1', '2', '2', '3'])
+        self.assertEqual([p['id'] for p in result['players']], ['1', '2'])
+        self.assertEqual(result['players'][0]['position'], 'WR')
+        self.assertNotIn('college', result['players'][0])
+        self.assertEqual(result['missing'], ['3'])
+        calls = self.service.fetch_json.call_count
+        self.service.get_players(['1', '2'])
+        self.assertEqual(self.service.fetch_json.call_count, calls)
+        stats = self.service.profiles.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+
+    def test_get_players_does_not_cache_empty_profiles(self):
+        self.service.fetch_json.return_value = {'code': 404, 'message': 'not found'}
+        self.service.fetch_mode = 'sequential'
+        self.assertEqual(self.service.get_players(['9'])['missing'], ['9'])
+        self.assertEqual(self.service.profiles.stats()['entries'], 0)
+
     def test_get_player_wrong_type(self):
         self.service.fetch_json.return_value = {'athlete': {'id': 12, 'displayName': 'Aaron Rodgers'}}
         player = self.service.get_player(12)
         self.assertEqual(str(player['athlete']['id']), '12')
 
+class TestResponseCache(unittest.TestCase):
+    def test_hit_after_load(self):
+        cache = TTLCache()
+        loader = MagicMock(return_value=({'id': '1'}, 10))
+        cache.get_or_load('k', 60, loader)
+        value = cache.get_or_load('k', 60, loader)
+        self.assertEqual(value['id'], '1')
+        self.assertEqual(loader.call_count, 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_expired_entry_reloads(self):
+        cache = TTLCache()
+        loader = MagicMock(return_value=({}, 1))
+        cache.get_or_load('k', 0, loader)
+        cache.get_or_load('k', 0, loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_lru_eviction_by_bytes(self):
+        cache = TTLCache(max_bytes=25)
+        cache.set('a', 1, 60, size=10)
+        cache.set('b', 2, 60, size=10)
+        cache.get('a')
+        cache.set('c', 3, 60, size=10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual((cache.stats()['hits'], cache.stats()['misses']), (2, 1))
+
+    def test_concurrent_misses_coalesce(self):
+        import threading, time
+        cache = TTLCache()
+        release = threading.Event()
+        calls = []
+        def loader():
+            calls.append(1)
+            release.wait(2)
+            return 'v', 1
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('k', 60, loader))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        while cache.stats()['coalesced'] < 4:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['v'] * 5)
+
+class TestSerialization(unittest.TestCase):
+    def test_shared_objects_are_encoded_once(self):
+        from serialization import EncodedCache, dumps
+        cache = EncodedCache()
+        data = {'events': [{'id': '1'}]}
+        cache.share(data)
+        self.assertEqual(cache.dumps(data), dumps(data))
+        self.assertEqual(cache.dumps(data), dumps(data))
+        self.assertEqual(cache.stats()['hits'], 1)
+        # unshared objects are always encoded fresh
+        cache.dumps({'other': 1})
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_response_splices_shared_values(self):
+        from serialization import encode_response, encoded_cache
+        data = {'header': {'id': '1'}}
+        encoded_cache.share(data)
+        self.assertEqual(json.loads(encode_response({'game': data, 'n': 2})), {'game': data, 'n': 2})
+
+
+class TestTimings(unittest.TestCase):
+    def test_timed_counts_calls_and_errors(self):
+        from metrics import Timings
+        timings = Timings(('host',))
+        @timings.timed(lambda ok: ('espn',))
+        def call(ok):
+            if not ok:
+                raise ValueError()
+        call(True)
+        with self.assertRaises(ValueError):
+            call(False)
+        stats = timings.snapshot()['espn']
+        self.assertEqual((stats['count'], stats['errors'], stats['in_flight']), (2, 1, 0))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_repeated_failures(self):
+        from breaker import CircuitBreaker, CircuitOpenError
+        breaker = CircuitBreaker('espn', failure_threshold=2, reset_timeout=60)
+        failing = MagicMock(side_effect=ConnectionError('down'))
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                breaker.call(failing)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(failing)
+        self.assertEqual(failing.call_count, 2)
+        self.assertEqual(breaker.stats()['state'], 'open')
+
+    def test_half_open_trial_closes_breaker(self):
+        from breaker import CircuitBreaker
+        breaker = CircuitBreaker('espn', failure_threshold=1, reset_timeout=0)
+        with self.assertRaises(ConnectionError):
+            breaker.call(MagicMock(side_effect=ConnectionError('down')))
+        self.assertEqual(breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(breaker.stats()['state'], 'closed')
+
+    def test_bad_request_does_not_count(self):
+        from breaker import CircuitBreaker
+        breaker = CircuitBreaker('espn', failure_threshold=1)
+        with self.assertRaises(ValueError):
+            breaker.call(MagicMock(side_effect=ValueError('not json')))
+        self.assertEqual(breaker.stats()['state'], 'closed')
+
+    def test_stale_entry_served_when_refresh_fails(self):
+        cache = TTLCache()
+        cache.set('k', 'old', 0, stale_ttl=60)
+        value, stale = cache.get_or_load_with_status('k', 10, MagicMock(side_effect=ConnectionError()), stale_ttl=60)
+        self.assertEqual((value, stale), ('old', True))
+        self.assertEqual(cache.stats()['stale_served'], 1)
+
+    def test_fetch_json_serves_stale_with_breaker_open(self):
+        import common
+        url = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
+        common.response_cache.set(common.cache_key(url, {'dates': 'stale-test'}), common.CachedResponse({'events': []}), 0, stale_ttl=60)
+        breaker = common.breakers.get('site.api.espn.com')
+        breaker.record_failure()
+        breaker.state, breaker.opened_at = 'open', float('inf')
+        try:
+            urls = common.track_stale()
+            self.assertEqual(common.fetch_json(url, {'dates': 'stale-test'}), {'events': []})
+            self.assertEqual(urls, [url])
+        finally:
+            breaker.record_success()
+
+class TestUpstreamClient(unittest.TestCase):
+    def test_session_uses_per_host_pools(self):
+        from common import build_session, POOL_SIZES
+        session = build_session()
+        adapter = session.get_adapter('https://cdn.espn.com/core/nfl/game')
+        self.assertEqual(adapter._pool_maxsize, POOL_SIZES['cdn.espn.com'])
+        self.assertIn('GET', adapter.max_retries.allowed_methods)
+        self.assertEqual(adapter.max_retries.read, 0)
+
+    def test_stats_track_saturation(self):
+        from common import UpstreamStats, DEFAULT_POOL_SIZE
+        stats = UpstreamStats()
+        for _ in range(DEFAULT_POOL_SIZE + 1):
+            stats.start('example.com')
+        stats.finish('example.com', 0.02, error=True)
+        snapshot = stats.snapshot()['example.com']
+        self.assertEqual(snapshot['saturated'], 1)
+        self.assertEqual(snapshot['errors'], 1)
+        self.assertEqual(snapshot['latency']['count'], 1)
+
+class TestFetchFirst(unittest.TestCase):
+    def slow(self, value, delay):
+        import time
+        def call():
+            time.sleep(delay)
+            return value
+        return call
+
+    def test_hedged_takes_faster_backup(self):
+        from common import fetch_first
+        result = fetch_first([self.slow('primary', 1), self.slow('backup', 0)], 'hedged', hedge_delay=0.05)
+        self.assertEqual(result, 'backup')
+
+    def test_failure_starts_next_immediately(self):
+        from common import fetch_first
+        import time
+        started = time.monotonic()
+        result = fetch_first([MagicMock(side_effect=Exception('down')), self.slow('ok', 0)], 'hedged', hedge_delay=5)
+        self.assertEqual(result, 'ok')
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_all_failing_raises(self):
+        from common import fetch_first
+        with self.assertRaises(ValueError):
+            fetch_first([MagicMock(side_effect=KeyError()), MagicMock(side_effect=ValueError())], 'sequential')
+        with self.assertRaises(ValueError):
+            fetch_first([MagicMock(side_effect=ValueError()), MagicMock(side_effect=ValueError())], 'parallel')
+
+    def test_preferred_source_wins_when_fast(self):
+        from common import fetch_first
+        backup = MagicMock(return_value='backup')
+        self.assertEqual(fetch_first([self.slow('primary', 0), backup], 'hedged', hedge_delay=1), 'primary')
+        backup.assert_not_called()
+
+class TestExplanationPool(unittest.TestCase):
+    def test_inflight_requests_are_deduped(self):
+        import threading
+        release = threading.Event()
+        generate = MagicMock(side_effect=lambda play: release.wait(2) and 'text')
+        cache = {}
+        pool = ExplanationPool(generate, cache, max_workers=2, per_minute=0)
+        first = pool.submit('p1', {'id': 'p1'})
+        second = pool.submit('p1', {'id': 'p1'})
+        self.assertIs(first, second)
+        self.assertEqual(pool.status('p1'), 'pending')
+        release.set()
+        self.assertEqual(first.result(2), 'text')
+        self.assertEqual(cache['p1'], 'text')
+        self.assertEqual(pool.status('p1'), 'ready')
+        self.assertEqual(generate.call_count, 1)
+
+    def test_failed_generation_is_not_retried_immediately(self):
+        pool = ExplanationPool(MagicMock(return_value=None), {}, per_minute=0)
+        pool.submit('p1', {'id': 'p1'}).result(2)
+        self.assertIsNone(pool.submit('p1', {'id': 'p1'}))
+        self.assertEqual(pool.status('p1'), 'unavailable')
+
+    def test_old_failures_are_pruned(self):
+        import time
+        from explainer import RETRY_AFTER_FAILURE
+        pool = ExplanationPool(MagicMock(return_value=None), {}, per_minute=0)
+        pool._failed = {f'old{i}': time.monotonic() - RETRY_AFTER_FAILURE - 1 for i in range(3)}
+        pool.submit('p1', {'id': 'p1'}).result(2)
+        self.assertEqual(list(pool._failed), ['p1'])
+
+    def test_explain_play_obj_returns_cached_text(self):
+        service = PlayService(explanation_store=ExplanationStore())
+        service.ai_explanation_cache[('1', 'p1', 'v1')] = 'Cached'
+        result = service.explain_play_obj({'id': 'p1'}, game_id='1')
+        self.assertEqual(result['ai_explanation'], 'Cached')
+        self.assertEqual(result['ai_status'], 'ready')
+
+    def test_stream_shares_one_generation(self):
+        import threading
+        release = threading.Event()
+        def generate_stream(play):
+            yield 'Short '
+            release.wait(2)
+            yield 'pass.'
+        cache = {}
+        pool = ExplanationPool(MagicMock(), cache, per_minute=0, generate_stream=MagicMock(side_effect=generate_stream))
+        first = pool.stream('p1', {'id': 'p1'})
+        self.assertEqual(next(first), 'Short ')
+        second = pool.stream('p1', {'id': 'p1'})
+        release.set()
+        self.assertEqual(list(second), ['Short ', 'pass.'])
+        self.assertEqual(list(first), ['pass.'])
+        self.assertEqual(cache['p1'], 'Short pass.')
+        self.assertEqual(pool.generate_stream.call_count, 1)
+        self.assertEqual(list(pool.stream('p1', {'id': 'p1'})), ['Short pass.'])
+
+    def test_stream_explain_play_sends_structured_fields_first(self):
+        service = PlayService(explanation_store=ExplanationStore())
+        service.play_store.game('1').ingest([{'id': 'p1', 'text': 'Pass complete'}])
+        service._stream_ai_explanation = MagicMock(return_value=iter(['A quick ', 'throw.']))
+        events = list(service.stream_explain_play('1', 'p1'))
+        self.assertEqual(events[0][0], 'explanation')
+        self.assertEqual(events[0][1]['ai_status'], 'streaming')
+        self.assertEqual([data['text'] for event, data in events if event == 'token'], ['A quick ', 'throw.'])
+        self.assertEqual(events[-1], ('done', {'ai_explanation': 'A quick throw.', 'ai_status': 'ready'}))
+        self.assertEqual(service.ai_explanation_cache.get(('1', 'p1', 'v1')), 'A quick throw.')
+
+    def test_stream_failing_partway_tells_viewer_to_discard(self):
+        service = PlayService(explanation_store=ExplanationStore())
+        service.play_store.game('1').ingest([{'id': 'p1', 'text': 'Pass complete'}])
+
+        def broken(play):
+            yield 'A quick '
+            raise ConnectionError('upstream closed')
+
+        service._stream_ai_explanation = broken
+        events = list(service.stream_explain_play('1', 'p1'))
+        self.assertEqual([data['text'] for event, data in events if event == 'token'], ['A quick '])
+        self.assertEqual(events[-1], ('done', {'ai_explanation': None, 'ai_status': 'unavailable', 'discard_tokens': True}))
+        self.assertIsNone(service.ai_explanation_cache.get(('1', 'p1', 'v1')))
+
+class TestExplanationStore(unittest.TestCase):
+    def test_backend_survives_restart(self):
+        import os, tempfile
+        path = os.path.join(tempfile.mkdtemp(), 'explanations.sqlite3')
+        ExplanationStore(SQLiteBackend(path))[('1', 'p1', 'v1')] = 'Saved'
+        store = ExplanationStore(SQLiteBackend(path))
+        self.assertEqual(store.get(('1', 'p1', 'v1')), 'Saved')
+        self.assertIsNone(store.get(('1', 'p1', 'v2')))
+        stats = store.stats()
+        self.assertEqual(stats['backend_hits'], 1)
+        self.assertEqual(stats['backend_entries'], 1)
+
+    def test_memory_is_bounded(self):
+        store = ExplanationStore(max_entries=2)
+        for i in range(3):
+            store[('1', str(i), 'v1')] = 'text'
+        self.assertEqual(store.stats()['memory_entries'], 2)
+        self.assertNotIn(('1', '0', 'v1'), store)
+
+    def test_explanation_key_from_play_ref(self):
+        service = PlayService(explanation_store=ExplanationStore())
+        play = {'id': '44', '$ref': 'http://sports.core.api.espn.com/v2/sports/football/leagues/nfl/events/401/competitions/401/plays/44'}
+        self.assertEqual(service.explanation_key(play), ('401', '44', 'v1'))
+
+    def test_membership_check_is_not_a_lookup(self):
+        store = ExplanationStore(SQLiteBackend(':memory:'))
+        self.assertIsNone(store.get(('1', 'p1', 'v1')))
+        self.assertNotIn(('1', 'p1', 'v1'), store)
+        store.backend.put(('1', 'p2', 'v1'), 'text')
+        self.assertIn(('1', 'p2', 'v1'), store)
+        self.assertEqual(store.stats()['misses'], 1)
+        self.assertEqual(store.stats()['backend_hits'], 0)
+
+class TestUserStore(unittest.TestCase):
+    def setUp(self):
+        from user_store import SQLiteUserBackend, UserStore
+        self.store = UserStore(SQLiteUserBackend(':memory:'), interval=60)
+
+    def test_burst_is_written_in_one_batch(self):
+        for uid in range(50):
+            self.store.add_favorite(str(uid), 'game', '401')
+        # queued writes are visible before they are flushed
+        self.assertEqual(self.store.favorites('7'), [{'type': 'game', 'id': '401'}])
+        self.store.flush()
+        self.assertEqual(self.store.stats()['batches'], 1)
+        self.assertEqual(self.store.favorite_count('game', '401'), 50)
+
+    def test_remove_and_notes(self):
+        self.store.add_favorite('u1', 'team', '10')
+        self.store.flush()
+        self.store.remove_favorite('u1', 'team', '10')
+        self.assertEqual(self.store.favorites('u1'), [])
+        note = self.store.add_note('u1', {'game_id': '1', 'note': 'great drive'})
+        self.store.flush()
+        self.assertEqual(self.store.favorites('u1'), [])
+        self.assertEqual(self.store.notes('u1'), [note])
+        self.assertEqual(self.store.notes('u2'), [])
+
+    def test_bad_write_does_not_block_others(self):
+        from user_store import USER_WRITE_ATTEMPTS
+        self.store.add_favorite('u1', 'team', '10')
+        # a write the backend can never apply, as a dict note body once was
+        self.store._queue(('note', {'id': 'n1', 'uid': 'u1', 'note': {'text': 'x'}, 'created_at': 1.0}))
+        self.store.add_favorite('u2', 'team', '11')
+        self.store.flush()
+        self.assertEqual(self.store.favorite_count('team', '10'), 1)
+        self.assertEqual(self.store.favorite_count('team', '11'), 1)
+        for _ in range(USER_WRITE_ATTEMPTS - 1):
+            self.store.flush()
+        self.assertEqual(self.store.stats()['queued'], 0)
+        self.assertEqual(self.store.stats()['dropped'], 1)
+        self.assertEqual(len(self.store.dead_letters), 1)
+
+    def test_failed_add_does_not_undo_later_remove(self):
+        apply, failures = self.store.backend.apply, [2]
+        def flaky(ops):
+            # the batch and the add on its own fail once each
+            if failures[0] and ops[0][0] == 'add':
+                failures[0] -= 1
+                raise RuntimeError('database is locked')
+            apply(ops)
+        self.store.backend.apply = flaky
+        self.store.add_favorite('u1', 'team', '10')
+        self.store.remove_favorite('u1', 'team', '10')
+        self.store.flush()
+        self.store.flush()
+        self.assertEqual(self.store.stats()['queued'], 0)
+        self.assertEqual(self.store.favorites('u1'), [])
+
+    def test_note_fields_must_be_scalars(self):
+        with self.assertRaises(ValueError):
+            self.store.add_note('u1', {'note': {'text': 'x'}})
+        with self.assertRaises(ValueError):
+            self.store.add_note('u1', {'note': 'ok', 'play_id': ['1']})
+        self.assertEqual(self.store.stats()['queued'], 0)
+
+class TestLiveGamePoller(unittest.TestCase):
+    def setUp(self):
+        self.games = MagicMock()
+        self.plays = PlayService(explanation_store=ExplanationStore(SQLiteBackend(':memory:')))
+        self.plays.fetch_json = MagicMock(return_value={'items': [{'id': 'p1'}]})
+        self.poller = LiveGamePoller(self.games, self.plays)
+
+    def test_live_game_publishes_updates(self):
+        self.games.list_games.return_value = [{'id': '1', 'status': 'STATUS_IN_PROGRESS'}]
+        self.games.get_game.return_value = {'gamepackageJSON': {'header': {'id': '1'}}}
+        sub = self.poller.broker.subscribe('1')
+        self.assertTrue(self.poller.poll_once())
+        events = [sub.get_nowait()[0], sub.get_nowait()[0]]
+        self.assertEqual(events, ['game', 'plays'])
+        self.poller.poll_once()
+        self.assertTrue(sub.empty())
+
+    def test_pregame_and_final_games_are_skipped(self):
+        self.games.list_games.return_value = [{'id': '1', 'status': 'STATUS_SCHEDULED'}, {'id': '2', 'status': 'STATUS_FINAL'}]
+        self.assertFalse(self.poller.poll_once())
+        self.games.get_game.assert_not_called()
+        self.plays.fetch_json.assert_not_called()
+
+    def test_slow_subscriber_gets_resync(self):
+        broker = Broker(max_queue=1)
+        sub = broker.subscribe('1')
+        broker.publish('1', 'plays', {})
+        broker.publish('1', 'plays', {})
+        self.assertEqual(sub.get_nowait()[0], 'resync')
+
+class TestFixtureServer(unittest.TestCase):
+    def setUp(self):
+        from fixtures import FixtureServer
+        self.now = [0.0]
+        self.stand_in = FixtureServer(replay_seconds=100, clock=lambda: self.now[0]).start()
+        self.addCleanup(self.stand_in.stop)
+
+    def test_replays_full_game_through_fetch_func(self):
+        service = PlayService(fetch_func=self.stand_in.fetch_json, explanation_store=ExplanationStore())
+        class DummyReq: args = {'limit': 1000}
+        self.now[0] = 50
+        self.assertEqual(len(service.game_plays('401547000', DummyReq())), 144)
+        games = GameService(fetch_func=self.stand_in.fetch_json)._fetch_games()
+        self.assertEqual(games[0]['status'], 'STATUS_IN_PROGRESS')
+        self.now[0] = 100
+        # explain-play pages through the core API for plays it has not seen
+        play_id = self.stand_in.fixture['plays'][-1]['id']
+        self.assertNotEqual(service.explain_play('401547000', play_id)['what_happened'], 'Play not found')
+
+    def test_benchmark_reports_each_route(self):
+        from bench_routes import compare, run_benchmark
+        results = run_benchmark(viewers=2, requests_per_viewer=2, routes=[('games', 'GET', '/api/games'), ('plays', 'GET', '/api/games/{game_id}/plays')])
+        self.assertEqual(results['routes']['plays']['requests'], 4)
+        self.assertEqual(results['routes']['plays']['errors'], 0)
+        self.assertIsNotNone(results['routes']['games']['p99_ms'])
+        slower = {'routes': {'games': dict(results['routes']['games'], p99_ms=results['routes']['games']['p99_ms'] * 10)}}
+        self.assertTrue(compare(slower, results, 0.25))
+
+class TestSeasonStore(unittest.TestCase):
+    def plays(self):
+        situation = {'team_id': 2, 'down': 3, 'distance': 8, 'yards_to_endzone': 60, 'period': 2}
+        return [dict(situation, type_text='Pass Reception')] * 24 + [dict(situation, type_text='Rush')] * 6
+
+    def test_tendency_lookup(self):
+        from season_store import SeasonStore
+        store = SeasonStore.build(self.plays())
+        tendency = store.tendency(3, 9, 55, team_id=2)
+        self.assertEqual((tendency['situation'], tendency['zone'], tendency['plays']), ('3rd & 7+', 'own territory', 30))
+        self.assertEqual((tendency['pass_rate'], tendency['run_rate']), (0.8, 0.2))
+        self.assertEqual(tendency['team']['pass_rate'], 0.8)
+        self.assertNotIn('team', store.tendency(3, 9, 55, team_id=12))
+        self.assertIsNone(store.tendency(3, 2, 55))
+        self.assertEqual(store.group_counts(('call',), {'down': 3, 'dist_bucket': '7+'}), [((0,), 24), ((1,), 6)])
+
+    def test_explain_play_obj_quotes_tendency(self):
+        from season_store import SeasonStore
+        service = PlayService(explanation_store=ExplanationStore(), season_stats=SeasonStore.build(self.plays()))
+        result = service.explain_play_obj({'start': {'down': 3, 'distance': 10, 'yardLine': 40, 'yardsToEndzone': 60}})
+        self.assertIn('teams pass 80% of the time on 3rd & 7+', result['why_the_play_happened'])
+        self.assertEqual(result['numbers_explained']['tendency']['plays'], 30)
+
+    def test_build_season_through_game_plays(self):
+        import tempfile
+        from fixtures import FixtureServer
+        from season_store import SeasonStore, build_season
+        stand_in = FixtureServer().start()
+        self.addCleanup(stand_in.stop)
+        service = PlayService(fetch_func=stand_in.fetch_json, explanation_store=ExplanationStore(), prefetch_explanations=False)
+        service.explanation_pool.submit = MagicMock()
+        with tempfile.TemporaryDirectory() as path:
+            build_season(service, stand_in.fetch_json, 2025, path, workers=2, weeks=2)
+            store = SeasonStore.open(path)
+            self.assertEqual(store.stats(), {'plays': len(stand_in.fixture['plays']), 'games': 1, 'season': 2025})
+            self.assertEqual(store.group_counts(('call',)), [((0,), store.plays)])
+            del store
+        service.explanation_pool.submit.assert_not_called()
+
+class TestAdmission(unittest.TestCase):
+    def test_lower_priorities_keep_slots_free_for_live(self):
+        from admission import AdmissionController
+        admission = AdmissionController(4, (('live', 1.0, 2, 0.05), ('explain', 0.5, 1, 0.05), ('profile', 0.25, 0, 0)))
+        self.assertIsNone(admission.acquire('profile'))
+        self.assertEqual(admission.acquire('profile'), 'queue_full')
+        self.assertIsNone(admission.acquire('explain'))
+        self.assertEqual(admission.acquire('explain'), 'timeout')
+        self.assertIsNone(admission.acquire('live'))
+        self.assertIsNone(admission.acquire('live'))
+        self.assertEqual(admission.acquire('live'), 'timeout')
+        admission.release('profile')
+        self.assertIsNone(admission.acquire('live'))
+        stats = admission.stats()
+        self.assertEqual(stats['in_flight'], 4)
+        self.assertEqual(stats['classes']['live']['admitted'], 3)
+        self.assertEqual(stats['classes']['explain']['shed']['timeout'], 1)
+
+    def test_waiter_is_admitted_when_a_slot_frees(self):
+        import threading
+        from admission import AdmissionController
+        admission = AdmissionController(1, (('live', 1.0, 4, 2.0),))
+        admission.acquire('live')
+        threading.Timer(0.05, admission.release, ('live',)).start()
+        self.assertIsNone(admission.acquire('live'))
+
+    def test_client_buckets_limit_each_client_separately(self):
+        from admission import ClientBuckets
+        buckets = ClientBuckets(rate=0.5, burst=2, max_clients=2)
+        self.assertEqual([buckets.take('a'), buckets.take('a')], [0, 0])
+        self.assertEqual(buckets.take('a'), 2)
+        self.assertEqual(buckets.take('b'), 0)
+        buckets.take('c')
+        self.assertEqual(buckets.take('a'), 0)  # forgotten, so a full bucket again
+        self.assertEqual(buckets.stats(), {'clients': 2, 'limited': 1})
+
 class TestApiEdgeCases(unittest.TestCase):
     def setUp(self):
-        from server import app
-        self.client = app.test_client()
+        import server
+        self.client = server.app.test_client()
+        # keep explanations out of the server's explanations.sqlite3
+        self.previous_play_service = server.play_service
+        server.play_service = PlayService(
+            explanation_store=ExplanationStore(SQLiteBackend(':memory:')), team_catalog=server.team_service.catalog,
+            season_stats=server.season_store,
+        )
+
+    def tearDown(self):
+        import server
+        server.play_service = self.previous_play_service
+
+    def test_health_reports_cache(self):
+        resp = self.client.get('/api/health')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('hits', resp.get_json()['cache'])
+
+    def test_metrics_reports_routes_and_upstreams(self):
+        import common
+        common.upstream_stats.start('api.groq.com')
+        common.upstream_stats.usage('api.groq.com', 120, 40)
+        common.upstream_stats.finish('api.groq.com', 0.3, False)
+        self.client.get('/api')
+        text = self.client.get('/api/metrics').data.decode()
+        self.assertIn('rookieplay_http_requests_total{method="GET",route="/api",status="200"}', text)
+        self.assertIn('rookieplay_upstream_calls_total{host="api.groq.com"}', text)
+        self.assertIn('rookieplay_llm_tokens_total{host="api.groq.com",kind="prompt"}', text)
+        self.assertIn('rookieplay_http_requests_seconds_bucket{method="GET",route="/api",le="+Inf"}', text)
+
+    def test_explain_play_stream_reports_first_token(self):
+        import server
+        server.play_service.play_store.game('1').ingest([{'id': 'p1', 'text': 'Pass complete'}])
+        server.play_service._stream_ai_explanation = MagicMock(return_value=iter(['Nice ', 'catch.']))
+        resp = self.client.get('/api/games/1/explain-play?play_id=p1&stream=1')
+        body = resp.get_data(as_text=True)
+        self.assertEqual(resp.mimetype, 'text/event-stream')
+        self.assertTrue(body.startswith('event: explanation\n'))
+        self.assertIn('event: token\ndata: {"text":"Nice "}', body)
+        self.assertIn('rookieplay_explain_first_token_seconds_count 1', self.client.get('/api/metrics').data.decode())
+
+    def test_explain_play_stream_tells_viewer_to_discard_on_error(self):
+        import server
+        def failing(game_id, play_id):
+            yield 'explanation', {'what_happened': 'Pass complete'}
+            yield 'token', {'text': 'Nice '}
+            raise RuntimeError('connection reset')
+        server.play_service.stream_explain_play = failing
+        body = self.client.get('/api/games/1/explain-play?play_id=p1&stream=1').get_data(as_text=True)
+        self.assertIn('event: token\ndata: {"text":"Nice "}', body)
+        self.assertTrue(body.endswith('event: done\ndata: {"ai_explanation":null,"ai_status":"unavailable","discard_tokens":true}\n\n'))
+
+    def test_streamed_explanation_holds_its_slot_until_sent(self):
+        import server
+        from admission import AdmissionController
+        previous, server.admission = server.admission, AdmissionController()
+        server.play_service.play_store.game('1').ingest([{'id': 'p1', 'text': 'Pass complete'}])
+        server.play_service._stream_ai_explanation = MagicMock(return_value=iter(['Nice ', 'catch.']))
+        try:
+            resp = self.client.get('/api/games/1/explain-play?play_id=p1&stream=1', buffered=False)
+            self.assertEqual(server.admission.stats()['classes']['explain']['in_flight'], 1)
+            resp.get_data()
+            resp.close()
+            self.assertEqual(server.admission.stats()['classes']['explain']['in_flight'], 0)
+        finally:
+            server.admission = previous
+
+    def test_live_games_revalidates_with_etag(self):
+        import server
+        previous = server.game_service
+        server.game_service = GameService(fetch_func=MagicMock(return_value={'events': [{'id': '1', 'competitions': [{'competitors': []}]}]}))
+        try:
+            first = self.client.get('/api/games/live')
+            second = self.client.get('/api/games/live', headers={'If-None-Match': first.headers['ETag']})
+        finally:
+            server.game_service = previous
+        self.assertEqual(first.get_json()['games'][0]['id'], '1')
+        self.assertEqual(second.status_code, 304)
+
+    def test_shed_requests_get_503_or_cached_answer(self):
+        import server
+        from admission import AdmissionController, ClientBuckets
+        previous = server.admission, server.client_buckets
+        server.admission = AdmissionController(1, (('live', 1.0, 0, 0), ('explain', 1.0, 0, 0), ('profile', 1.0, 0, 0)))
+        server.client_buckets = ClientBuckets(rate=0.5, burst=2)
+        server.admission.acquire('live')
+        game_id = '1'
+        try:
+            busy = self.client.get(f'/api/games/{game_id}/plays')
+            self.assertEqual(busy.status_code, 503)
+            self.assertEqual(busy.headers['Retry-After'], '2')
+            server.play_service.play_store.game(game_id).ingest([{'id': 'p1', 'text': 'Pass complete'}])
+            plays = self.client.get(f'/api/games/{game_id}/plays?tail=5')
+            self.assertEqual(plays.headers['X-Degraded'], '1')
+            self.assertEqual([p['id'] for p in plays.get_json()['plays']], ['p1'])
+            explained = self.client.get(f'/api/games/{game_id}/explain-play?play_id=p1')
+            self.assertEqual(explained.status_code, 200)
+            self.assertEqual(explained.get_json()['explanation']['ai_status'], 'deferred')
+            self.client.get(f'/api/games/{game_id}/explain-play?play_id=p1')
+            limited = self.client.get(f'/api/games/{game_id}/explain-play?play_id=p1')
+            self.assertEqual(limited.status_code, 429)
+            self.assertIn('Retry-After', limited.headers)
+            text = self.client.get('/api/metrics').data.decode()
+            self.assertIn('rookieplay_admission_shed_total{class="live",reason="queue_full"} 2', text)
+            self.assertIn('rookieplay_admission_degraded_total{class="explain"} 2', text)
+            self.assertIn('rookieplay_admission_shed_total{class="explain",reason="rate_limited"} 1', text)
+        finally:
+            server.admission, server.client_buckets = previous
+
+    def test_client_limit_ignores_forwarded_for(self):
+        import server
+        from admission import ClientBuckets
+        previous = server.client_buckets
+        server.client_buckets = ClientBuckets(rate=0.001, burst=1)
+        try:
+            self.client.get('/api/games/1/explain-play?play_id=x', headers={'X-Forwarded-For': '10.0.0.1'})
+            resp = self.client.get('/api/games/1/explain-play?play_id=x', headers={'X-Forwarded-For': '10.0.0.2'})
+        finally:
+            server.client_buckets = previous
+        self.assertEqual(resp.status_code, 429)
+
+    def test_bulk_players_requires_ids(self):
+        self.assertEqual(self.client.get('/api/players').status_code, 400)
+        self.assertEqual(self.client.get('/api/players?ids=' + ','.join(map(str, range(101)))).status_code, 400)
+
+    def test_unchanged_response_returns_304(self):
+        first = self.client.get('/api')
+        etag = first.headers['ETag']
+        second = self.client.get('/api', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+        third = self.client.get('/api', headers={'If-None-Match': '"other"'})
+        self.assertEqual(third.status_code, 200)
+
+    def test_upstream_revalidation_reuses_body(self):
+        import common
+        previous = common.CachedResponse({'events': [1]}, etag='"abc"', size=4096)
+        resp = MagicMock(status_code=304, content=b'')
+        original = common.session.get
+        common.session.get = MagicMock(return_value=resp)
+        try:
+            cached, size = common._get('https://example.com/x', {}, previous)
+            self.assertIs(cached, previous)
+            self.assertEqual(size, 4096)
+            self.assertEqual(common.session.get.call_args.kwargs['headers'], {'If-None-Match': '"abc"'})
+        finally:
+            common.session.get = original
+
+    def test_large_response_is_gzipped(self):
+        import gzip
+        import server
+        game = {'plays': [{'id': str(i), 'text': 'Pass complete for 5 yards'} for i in range(200)]}
+        original = server.game_service.get_game
+        server.game_service.get_game = MagicMock(return_value=game)
+        try:
+            first = self.client.get('/api/games/1', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(gzip.decompress(first.data)), {'game': game})
+            self.assertTrue(first.headers['ETag'].endswith('-gzip"'))
+            second = self.client.get('/api/games/1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+            self.assertEqual(second.status_code, 304)
+            plain = self.client.get('/api/games/1', headers={'Accept-Encoding': 'identity'})
+            self.assertNotIn('Content-Encoding', plain.headers)
+        finally:
+            server.game_service.get_game = original
+
+    def test_bad_games_date(self):
+        resp = self.client.get('/api/games?date=tomorrow')
+        self.assertEqual(resp.status_code, 400)
 
     def test_invalid_game_id(self):
         resp = self.client.get('/api/games/invalid')
@@ -152,9 +1154,32 @@ class TestApiEdgeCases(unittest.TestCase):
         resp = self.client.post('/api/users/testuser/notes', json={})
         self.assertEqual(resp.status_code, 400)
 
+    def test_plays_bad_tail_is_400(self):
+        self.assertEqual(self.client.get('/api/games/1/plays?tail=five').status_code, 400)
+
+    def test_note_with_object_body_is_rejected(self):
+        resp = self.client.post('/api/users/testuser/notes', json={'note': {'text': 'x'}})
+        self.assertEqual(resp.status_code, 400)
+
     def test_invalid_favorites_post(self):
         resp = self.client.post('/api/users/testuser/favorites', json={})
         self.assertIn(resp.status_code, (400, 422, 500))
 
+    def test_favorites_expand_with_cached_summaries(self):
+        import server
+        from user_store import SQLiteUserBackend, UserStore
+        original, catalog_fetch = server.user_store, server.team_service.catalog.fetch_json
+        server.user_store = UserStore(SQLiteUserBackend(':memory:'))
+        server.team_service.catalog.fetch_json = MagicMock(return_value={'sports': [{'leagues': [{'teams': [{'team': {'id': '10', 'displayName': 'Packers'}}]}]}]})
+        try:
+            server.team_service.catalog.load()
+            self.assertEqual(self.client.post('/api/users/u1/favorites', json={'type': 'team', 'id': '10'}).status_code, 201)
+            self.assertEqual(self.client.post('/api/users/u1/favorites', json={'type': 'bogus', 'id': '1'}).status_code, 400)
+            favorites = self.client.get('/api/users/u1/favorites?expand=1').get_json()['favorites']
+            self.assertEqual(favorites, [{'type': 'team', 'id': '10', 'summary': {'id': '10', 'name': 'Packers', 'abbr': None, 'logo': None}}])
+        finally:
+            server.user_store = original
+            server.team_service.catalog.fetch_json = catalog_fetch
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
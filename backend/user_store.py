@@ -0,0 +1,249 @@
+import atexit
+import collections
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+USER_DB_PATH = os.environ.get('USER_DB_PATH', 'user_data.sqlite3')
+# Write-behind: flush once this many writes are queued or this many seconds pass
+USER_WRITE_BATCH = int(os.environ.get('USER_WRITE_BATCH', 200))
+USER_WRITE_INTERVAL = float(os.environ.get('USER_WRITE_INTERVAL', 0.5))
+# Flushes a write may fail on its own before it is dropped to the dead letters
+USER_WRITE_ATTEMPTS = 5
+FAVORITE_TYPES = ('team', 'player', 'game')
+
+
+def _op_key(op) -> tuple:
+    """What a queued write changes: the favorite's (uid, type, id) or the note's id."""
+    return ('note', op[1]['id']) if op[0] == 'note' else op[1:]
+
+
+class SQLiteUserBackend:
+    """Favorites and notes persisted in a SQLite file.
+
+    Favorites are keyed by (uid, type, item_id) with a second index on
+    (type, item_id); notes are indexed by uid. Any object with the same
+    apply/favorites/notes/favorite_count methods can be used instead.
+    """
+
+    def __init__(self, path: str = USER_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(
+                'CREATE TABLE IF NOT EXISTS favorites ('
+                ' uid TEXT NOT NULL, type TEXT NOT NULL, item_id TEXT NOT NULL,'
+                " created_at INTEGER DEFAULT (strftime('%s', 'now')),"
+                ' PRIMARY KEY (uid, type, item_id));'
+                'CREATE INDEX IF NOT EXISTS favorites_by_item ON favorites (type, item_id);'
+                'CREATE TABLE IF NOT EXISTS notes ('
+                ' id TEXT PRIMARY KEY, uid TEXT NOT NULL, game_id TEXT, play_id TEXT, note TEXT NOT NULL,'
+                ' created_at REAL NOT NULL);'
+                'CREATE INDEX IF NOT EXISTS notes_by_uid ON notes (uid, created_at);'
+            )
+            self._conn.commit()
+
+    def apply(self, ops: list):
+        """Apply queued writes in one transaction.
+
+        ops are ('add', uid, type, id), ('remove', uid, type, id) or ('note', note_dict).
+        """
+        with self._lock, self._conn:
+            for op in ops:
+                if op[0] == 'add':
+                    self._conn.execute('INSERT OR IGNORE INTO favorites (uid, type, item_id) VALUES (?, ?, ?)', op[1:])
+                elif op[0] == 'remove':
+                    self._conn.execute('DELETE FROM favorites WHERE uid = ? AND type = ? AND item_id = ?', op[1:])
+                else:
+                    note = op[1]
+                    self._conn.execute(
+                        'INSERT OR IGNORE INTO notes (id, uid, game_id, play_id, note, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                        (note['id'], note['uid'], note.get('game_id'), note.get('play_id'), note['note'], note['created_at']),
+                    )
+
+    def favorites(self, uid: str) -> list:
+        with self._lock:
+            rows = self._conn.execute('SELECT type, item_id FROM favorites WHERE uid = ? ORDER BY created_at, rowid', (uid,)).fetchall()
+        return [{'type': t, 'id': i} for t, i in rows]
+
+    def notes(self, uid: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, uid, game_id, play_id, note, created_at FROM notes WHERE uid = ? ORDER BY created_at', (uid,)
+            ).fetchall()
+        return [dict(zip(('id', 'uid', 'game_id', 'play_id', 'note', 'created_at'), row)) for row in rows]
+
+    def favorite_count(self, item_type: str, item_id: str) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM favorites WHERE type = ? AND item_id = ?', (item_type, item_id)).fetchone()[0]
+
+
+class UserStore:
+    """Favorites and notes with a write-behind queue in front of a backend.
+
+    Writes are queued and a background thread applies them in batches, so a
+    kickoff burst of favorites costs a few transactions instead of one per
+    request. Reads overlay the writes that are still queued, so users always
+    see their own changes.
+
+    When a batch fails its writes are retried one at a time, so one bad write
+    cannot hold back the others; a write that keeps failing is moved to
+    dead_letters after USER_WRITE_ATTEMPTS flushes. A failed write is dropped
+    once a later write to the same favorite has been queued.
+    """
+
+    def __init__(self, backend=None, batch_size: int = USER_WRITE_BATCH, interval: float = USER_WRITE_INTERVAL):
+        self.backend = backend if backend is not None else SQLiteUserBackend()
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = []
+        self._writing = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._attempts = {}
+        self.dead_letters = collections.deque(maxlen=1000)
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def add_favorite(self, uid: str, item_type: str, item_id: str):
+        self._queue(('add', str(uid), item_type, str(item_id)))
+
+    def remove_favorite(self, uid: str, item_type: str, item_id: str):
+        self._queue(('remove', str(uid), item_type, str(item_id)))
+
+    def add_note(self, uid: str, body: dict) -> dict:
+        """Queue a note. Raises ValueError unless note is a non-empty string and game_id/play_id are scalars."""
+        if not isinstance(body.get('note'), str) or not body['note'].strip():
+            raise ValueError('note must be a non-empty string')
+        for field in ('game_id', 'play_id'):
+            if body.get(field) is not None and (isinstance(body[field], bool) or not isinstance(body[field], (str, int))):
+                raise ValueError(f'{field} must be a string or number')
+        note = {
+            'id': uuid.uuid4().hex, 'uid': str(uid), 'game_id': body.get('game_id'),
+            'play_id': body.get('play_id'), 'note': body['note'], 'created_at': time.time(),
+        }
+        self._queue(('note', note))
+        return note
+
+    def favorites(self, uid: str) -> list:
+        uid = str(uid)
+        # snapshot the queue first: a write committed in between then shows up in the backend read
+        queued = self._queued(uid)
+        favorites = {(f['type'], f['id']): f for f in self.backend.favorites(uid)}
+        for op in queued:
+            if op[0] == 'add':
+                favorites.setdefault((op[2], op[3]), {'type': op[2], 'id': op[3]})
+            elif op[0] == 'remove':
+                favorites.pop((op[2], op[3]), None)
+        return list(favorites.values())
+
+    def notes(self, uid: str) -> list:
+        uid = str(uid)
+        queued = self._queued(uid)
+        notes = {n['id']: n for n in self.backend.notes(uid)}
+        for op in queued:
+            if op[0] == 'note':
+                notes.setdefault(op[1]['id'], op[1])
+        return sorted(notes.values(), key=lambda n: n['created_at'])
+
+    def favorite_count(self, item_type: str, item_id: str) -> int:
+        """Users who have favorited an item (written favorites only)."""
+        return self.backend.favorite_count(item_type, str(item_id))
+
+    def flush(self):
+        """Apply every queued write now."""
+        with self._flush_lock:
+            with self._lock:
+                self._writing, self._pending = self._pending, []
+                batch = self._writing
+            if not batch:
+                return
+            failed = []
+            try:
+                self.backend.apply(batch)
+            except Exception as e:
+                print(f"Error writing user store batch, retrying writes one at a time: {e}")
+                failed = self._apply_each(batch)
+            with self._lock:
+                self.batches += 1
+                self.written += len(batch) - len(failed)
+                self.failed += bool(failed)
+                failed_ids = {id(op) for op in failed}
+                # a failed write is only retried if no later write touches the same key,
+                # so a retried add cannot bring back a favorite removed after it
+                newer = {_op_key(op) for op in self._pending}
+                retry = []
+                for op in reversed(batch):
+                    key = _op_key(op)
+                    superseded = key in newer
+                    newer.add(key)
+                    if id(op) not in failed_ids or superseded:
+                        self._attempts.pop(id(op), None)
+                        continue
+                    attempts = self._attempts.pop(id(op), 0) + 1
+                    if attempts >= USER_WRITE_ATTEMPTS:
+                        print(f"Dropping user store write after {attempts} attempts: {op}")
+                        self.dead_letters.append(op)
+                        self.dropped += 1
+                    else:
+                        self._attempts[id(op)] = attempts
+                        retry.append(op)
+                retry.reverse()
+                # keep the writes that may still succeed for the next flush
+                self._pending[:0] = retry
+                self._writing = []
+
+    def start(self):
+        """Start the background writer if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='user-store-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queued': len(self._pending), 'batches': self.batches, 'written': self.written,
+                'failed': self.failed, 'dropped': self.dropped,
+            }
+
+    def _apply_each(self, batch: list) -> list:
+        """Apply writes one transaction each; returns the ones that failed."""
+        failed = []
+        for op in batch:
+            try:
+                self.backend.apply([op])
+            except Exception as e:
+                print(f"Error writing user store op {op[0]}: {e}")
+                failed.append(op)
+        return failed
+
+    def _queue(self, op):
+        with self._lock:
+            self._pending.append(op)
+            full = len(self._pending) >= self.batch_size
+        self.start()
+        if full:
+            self._wake.set()
+
+    def _queued(self, uid: str) -> list:
+        with self._lock:
+            ops = self._writing + self._pending
+        return [op for op in ops if (op[1]['uid'] if op[0] == 'note' else op[1]) == uid]
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
@@ -21,30 +21,57 @@ export default function PlayCard({ play, gameId, index, totalPlays, user }) {
   }
 
   useEffect(() => {
+    let retryTimer = null
+    let attempts = 0
+    let cancelled = false
+
+    const retry = (delay) => {
+      if (cancelled || attempts >= 10) return false
+      retryTimer = setTimeout(fetchExplanation, delay)
+      return true
+    }
+
     const fetchExplanation = async () => {
       if (!playId || !user) return
       
-      setLoadingExplanation(true)
+      if (attempts === 0) setLoadingExplanation(true)
+      attempts += 1
+      let waiting = false
       try {
         const url = buildApiUrl(API_ENDPOINTS.EXPLAIN_PLAY(gameId))
         const params = new URLSearchParams({ play_id: playId })
         const response = await fetch(`${url}?${params}`)
-        
+
+        // Rate limited or shed under load: wait as told and keep what is already shown
+        if (response.status === 429 || response.status === 503) {
+          const retryAfter = Number(response.headers.get('Retry-After')) || 2 ** attempts
+          waiting = retry(retryAfter * 1000)
+          return
+        }
         if (!response.ok) {
           throw new Error('Failed to fetch explanation')
         }
         
         const data = await response.json()
+        if (cancelled) return
         setExplanation(data.explanation)
+        // The AI text is generated in the background (or deferred under load); ask again until it is ready
+        if (['pending', 'deferred'].includes(data.explanation?.ai_status)) {
+          retry(2000)
+        }
       } catch (error) {
         console.error('Error fetching play explanation:', error)
-        setExplanation(null)
       } finally {
-        setLoadingExplanation(false)
+        // a first request that is being retried keeps its spinner
+        if (!cancelled && !waiting) setLoadingExplanation(false)
       }
     }
 
     fetchExplanation()
+    return () => {
+      cancelled = true
+      clearTimeout(retryTimer)
+    }
   }, [playId, gameId, user])
 
   return (
@@ -74,13 +101,18 @@ export default function PlayCard({ play, gameId, index, totalPlays, user }) {
           </div>
         ) : explanation ? (
           <div className="play-explanation">
-            {explanation.ai_explanation && (
+            {explanation.ai_explanation ? (
               <div className="explanation-section ai-analysis">
                 <div className="explanation-content">
                   <h5>🤖 AI Analysis</h5>
                   <p>{explanation.ai_explanation}</p>
                 </div>
               </div>
+            ) : ['pending', 'deferred'].includes(explanation.ai_status) && (
+              <div className="loading-explanation">
+                <div className="loading-spinner-small"></div>
+                <p>Generating AI analysis...</p>
+              </div>
             )}
 
             {explanation.why_the_play_happened && (
@@ -19,6 +19,7 @@ export const API_ENDPOINTS = {
   GAMES: '/api/games',
   GAME_BY_ID: (id) => `/api/games/${id}`,
   GAME_PLAYS: (gameId) => `/api/games/${gameId}/plays`,
+  GAME_STREAM: (gameId) => `/api/games/${gameId}/stream`,
   EXPLAIN_PLAY: (gameId) => `/api/games/${gameId}/explain-play`,
   TEAMS: '/api/teams',
   PLAYER: (playerId) => `/api/players/${playerId}`,
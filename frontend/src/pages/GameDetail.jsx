@@ -46,11 +46,10 @@ export default function GameDetail() {
 
   const fetchPlays = useCallback(async () => {
     try {
+      const params = new URLSearchParams({ tail: 5 })
       const playsUrl = buildApiUrl(API_ENDPOINTS.GAME_PLAYS(gameId))
-      const playsData = await doFetchJson(playsUrl)
-      const allPlays = playsData.plays || []
-      
-      const recentPlays = allPlays.slice(-5).reverse()
+      const playsData = await doFetchJson(`${playsUrl}?${params}`)
+      const recentPlays = (playsData.plays || []).slice().reverse()
       
       setPlays(recentPlays)
     } catch (err) {
@@ -72,17 +71,32 @@ export default function GameDetail() {
     return () => clearInterval(interval)
   }, [fetchGameDetails])
 
+  const hasGame = Boolean(game)
+  const gameStatus = game?.gamepackageJSON?.header?.competitions?.[0]?.status?.type?.name
+
   useEffect(() => {
-    if (game) {
+    if (hasGame) {
       fetchPlays()
-      const status = game.gamepackageJSON?.header?.competitions?.[0]?.status
-      const statusType = status?.type?.name
-      if (statusType === 'STATUS_IN_PROGRESS') {
-        const playsInterval = setInterval(fetchPlays, 30000)
-        return () => clearInterval(playsInterval)
+      if (gameStatus === 'STATUS_IN_PROGRESS') {
+        // Live updates are pushed by the backend poller instead of polled per tab
+        const source = new EventSource(buildApiUrl(API_ENDPOINTS.GAME_STREAM(gameId)))
+        source.addEventListener('game', (e) => {
+          const { header } = JSON.parse(e.data)
+          setGame(prev => ({ ...prev, gamepackageJSON: { ...prev?.gamepackageJSON, header } }))
+        })
+        source.addEventListener('plays', (e) => {
+          const delta = JSON.parse(e.data)
+          setPlays(prev => {
+            const byId = new Map(delta.reset ? [] : prev.slice().reverse().map(p => [p.id, p]))
+            delta.plays.forEach(p => byId.set(p.id, p))
+            return Array.from(byId.values()).slice(-5).reverse()
+          })
+        })
+        source.addEventListener('resync', fetchPlays)
+        return () => source.close()
       }
     }
-  }, [game, fetchPlays])
+  }, [hasGame, gameStatus, gameId, fetchPlays])
 
   const handleBackToGames = () => {
     navigate('/')